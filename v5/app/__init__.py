@@ -1,10 +1,11 @@
 # Flask App Factory & DB Connection Pool
 from flask import Flask, jsonify
 from werkzeug.exceptions import HTTPException
-import psycopg2.pool
 import os
 import logging
 from dotenv import load_dotenv
+from app.db_pool import BlockingConnectionPool
+from app.db_statements import PreparedConnection
 
 # Load .env variables
 load_dotenv()
@@ -18,11 +19,18 @@ def create_app():
     # Configure Logging
     logging.basicConfig(level=logging.INFO)
     
-    # Initialize DB Pool (Min 1, Max 10)
+    # Initialize DB Pool (thread-safe; waits up to DB_POOL_TIMEOUT for a free connection)
     global db_pool
     try:
-        db_pool = psycopg2.pool.SimpleConnectionPool(
-            1, 10,
+        db_pool = BlockingConnectionPool(
+            int(os.getenv("DB_POOL_MIN", "1")),
+            int(os.getenv("DB_POOL_MAX", "10")),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+            validate_after=float(os.getenv("DB_POOL_VALIDATE_AFTER", "10")),
+            # Read by pg_trgm's % operator; set once per connection instead of set_limit() per query
+            session_params={"pg_trgm.similarity_threshold": "0.4"},
+            # Tracks the statements PREPAREd on each connection (app/db_statements.py)
+            connection_factory=PreparedConnection,
             user=os.getenv("DB_USER", "postgres"),
             password=os.getenv("DB_PASS", "password"),
             host=os.getenv("DB_HOST", "localhost"),
@@ -33,6 +41,35 @@ def create_app():
     except Exception as e:
         app.logger.error(f"Error creating DB pool: {e}")
 
+    # Optional in-memory resolver (GEO_RESOLVER_BACKEND=memory)
+    from app.services.geo_service import GeoService
+    if db_pool and GeoService.BACKEND == "memory":
+        GeoService.load_gazetteer()
+
+    # Optional in-process nearest-neighbour indexes (SPATIAL_BACKEND=memory)
+    if db_pool and GeoService.SPATIAL_BACKEND == "memory":
+        from app.services.route_service import RouteService
+        GeoService.load_city_index()
+        RouteService.load_airport_index()
+
+    # Persistent LLM analysis / summary stores (SQLite, warm-loaded once)
+    from app.services.nlp_service import NLPService, NLP_ROUTING
+    NLPService.load_stores()
+
+    # Finished rainfall days per grid cell (SQLite)
+    from app.services.weather_service import WeatherService
+    WeatherService.load_rainfall_store()
+
+    # Offline NLP fallback: gazetteer extractor (reuses the in-memory gazetteer
+    # when loaded) and optional background warm-up of the spaCy model.
+    # The extractor defaults to on only where it is used: tiered / local routing
+    # or no LLM configured.
+    extractor_default = NLP_ROUTING in ("tiered", "local") or not NLPService.HAS_LLM
+    if db_pool and os.getenv("LOCATION_EXTRACTOR", "true" if extractor_default else "false").lower() in ("1", "true", "yes"):
+        NLPService.load_extractor(GeoService.gazetteer)
+    if os.getenv("SPACY_PRELOAD", "false").lower() in ("1", "true", "yes"):
+        NLPService.preload_spacy()
+
     # Register Routes
     from app.routes import main_bp
     app.register_blueprint(main_bp)
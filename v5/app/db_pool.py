@@ -0,0 +1,193 @@
+# Thread-safe, blocking PostgreSQL connection pool
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """No connection became available within the checkout timeout."""
+
+
+class BlockingConnectionPool:
+    """
+    Connection pool safe to share between request threads.
+
+    - getconn() waits (up to `timeout` seconds) for a free connection instead
+      of failing as soon as `maxconn` are checked out.
+    - Connections idle for longer than `validate_after` seconds are pinged on
+      checkout; dead ones (e.g. after a DB restart) are replaced transparently.
+    - `session_params` are SET once per new connection, not per query.
+    - putconn() rolls back any open transaction so the next user starts clean.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=5.0, validate_after=10.0,
+                 session_params=None, connection_factory=None, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self.session_params = session_params or {}
+        self.connection_factory = connection_factory
+        self.connect_kwargs = connect_kwargs
+
+        self._idle = []          # [(conn, returned_at)], most recently returned last
+        self._in_use = set()
+        self._opening = 0        # connections being opened outside the lock
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+
+    # --- CONNECTIONS ---
+
+    def _connect(self):
+        kwargs = dict(self.connect_kwargs)
+        if self.connection_factory is not None:
+            kwargs["connection_factory"] = self.connection_factory
+        conn = psycopg2.connect(**kwargs)
+        if self.session_params:
+            with conn.cursor() as cursor:
+                for name, value in self.session_params.items():
+                    cursor.execute("SELECT set_config(%s, %s, false)", (name, str(value)))
+            conn.commit()
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _is_alive(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # --- CHECKOUT / RETURN ---
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("connection pool is closed")
+                while not self._idle and len(self._in_use) + self._opening >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"no connection available within {timeout:.1f}s "
+                                          f"({self.maxconn} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                    fresh = False
+                else:
+                    conn, returned_at = None, None
+                    self._opening += 1
+                    fresh = True
+
+            if fresh:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+            elif not self._is_alive(conn, time.monotonic() - returned_at):
+                # Stale connection (e.g. DB restarted): drop it and try again
+                with self._cond:
+                    self._in_use.discard(conn)
+                    self._cond.notify()
+                self._discard(conn)
+                continue
+
+            wait = time.monotonic() - start
+            with self._cond:
+                self.checkouts += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                if waited:
+                    self.waits += 1
+            return conn
+
+    def putconn(self, conn, close=False):
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                close = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            keep = not (close or conn.closed or self._closed)
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if not keep:
+            self._discard(conn)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    # --- INSTRUMENTATION ---
+
+    def stats(self):
+        with self._cond:
+            in_use = len(self._in_use)
+            return {
+                "max": self.maxconn,
+                "open": in_use + len(self._idle),
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "utilization": round(in_use / self.maxconn, 4) if self.maxconn else 0.0,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "created": self.created,
+                "discarded": self.discarded,
+            }
@@ -0,0 +1,167 @@
+# Server-side prepared statements for the hot queries
+import json
+import os
+import re
+import threading
+import time
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+
+# Set DB_PREPARED_STATEMENTS=false behind transaction-pooling proxies (pgbouncer),
+# where a session's prepared statements are not guaranteed to be there
+PREPARED_ENABLED = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s|%%")
+
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Connection that remembers which registry statements are prepared on it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class Statement:
+    def __init__(self, name, sql, types=None):
+        self.name = name
+        self.sql = sql
+        self.args = []
+        types = types or {}
+
+        def to_positional(match):
+            if match.group(0) == "%%":
+                return "%"
+            arg = match.group(1)
+            if arg not in self.args:
+                self.args.append(arg)
+            return f"${self.args.index(arg) + 1}"
+
+        body = _PLACEHOLDER_RE.sub(to_positional, sql)
+        signature = ""
+        if self.args:
+            # Explicit types: PostgreSQL would otherwise infer e.g. `$5 * 1000` as integer
+            signature = "(" + ", ".join(types.get(arg, "unknown") for arg in self.args) + ")"
+        self.prepare_sql = f"PREPARE {name} {signature} AS {body}"
+        self.execute_sql = f"EXECUTE {name}" + ("(" + ", ".join(["%s"] * len(self.args)) + ")" if self.args else "")
+
+        self.calls = 0
+        self.prepares = 0
+        self.reprepares = 0
+        self.prepare_time = 0.0     # PREPARE round trips (parse + analyze)
+        self.execute_time = 0.0     # EXECUTE (or plain SQL) round trips
+
+    def values(self, params):
+        return [params[arg] for arg in self.args]
+
+
+class StatementRegistry:
+    """
+    Named SQL statements, PREPAREd lazily once per pooled connection and then
+    run with EXECUTE, so PostgreSQL parses and plans them once per session
+    instead of on every call.
+
+    Statements are written with psycopg2 %(name)s placeholders. Connections
+    without a `prepared` set (not created through PreparedConnection) and
+    DB_PREPARED_STATEMENTS=false fall back to sending the plain SQL.
+    """
+
+    def __init__(self, enabled=PREPARED_ENABLED):
+        self.enabled = enabled
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, sql, types=None):
+        statement = Statement(name, sql, types)
+        self._statements[name] = statement
+        return statement
+
+    def execute(self, cursor, name, params):
+        """Runs statement `name` on the cursor; read results with fetchone() / fetchall()."""
+        statement = self._statements[name]
+        conn = cursor.connection
+        prepared = getattr(conn, "prepared", None)
+
+        if not self.enabled or prepared is None:
+            start = time.perf_counter()
+            cursor.execute(statement.sql, params)
+        else:
+            values = statement.values(params)
+            if name not in prepared:
+                self._prepare(cursor, statement, prepared)
+            # PREPARE is timed by _prepare, so execute_time is EXECUTE only
+            start = time.perf_counter()
+            try:
+                cursor.execute(statement.execute_sql, values)
+            except psycopg2.errors.InvalidSqlStatementName:
+                # Session state was lost (DISCARD ALL, proxy reassigned the backend...)
+                conn.rollback()
+                prepared.clear()
+                self._prepare(cursor, statement, prepared, again=True)
+                start = time.perf_counter()
+                cursor.execute(statement.execute_sql, values)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            statement.calls += 1
+            statement.execute_time += elapsed
+
+    def _prepare(self, cursor, statement, prepared, again=False):
+        start = time.perf_counter()
+        try:
+            cursor.execute(statement.prepare_sql)
+        except psycopg2.errors.DuplicatePreparedStatement:
+            cursor.connection.rollback()
+        elapsed = time.perf_counter() - start
+        prepared.add(statement.name)
+        with self._lock:
+            statement.prepares += 1
+            statement.prepare_time += elapsed
+            if again:
+                statement.reprepares += 1
+
+    def explain(self, cursor, name, params):
+        """
+        EXPLAIN ANALYZE of one execution: planning and execution time reported
+        separately (for a prepared statement, planning reflects the plan cache).
+        """
+        statement = self._statements[name]
+        prepared = getattr(cursor.connection, "prepared", None)
+        if self.enabled and prepared is not None:
+            if name not in prepared:
+                self._prepare(cursor, statement, prepared)
+            cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement.execute_sql, statement.values(params))
+        else:
+            cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement.sql, params)
+        row = cursor.fetchone()
+        report = row["QUERY PLAN"] if isinstance(row, dict) else row[0]
+        if isinstance(report, str):
+            report = json.loads(report)
+        report = report[0]
+        return {
+            "planning_ms": report.get("Planning Time", 0.0),
+            "execution_ms": report.get("Execution Time", 0.0),
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "statements": {
+                    s.name: {
+                        "calls": s.calls,
+                        "prepares": s.prepares,
+                        "reprepares": s.reprepares,
+                        # Per PREPARE (once per connection) vs per call
+                        "prepare_ms": round(s.prepare_time / s.prepares * 1000, 3) if s.prepares else 0.0,
+                        "execute_avg_ms": round(s.execute_time / s.calls * 1000, 3) if s.calls else 0.0,
+                    }
+                    for s in self._statements.values()
+                },
+            }
+
+
+# Shared by the services; statements are registered next to the code that runs them
+statements = StatementRegistry()
@@ -1,61 +1,195 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, Response, render_template, request, jsonify, stream_with_context
+import os
+import re
+import io
+import csv
+import json
+import math
 import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.services.nlp_service import NLPService
 from app.services.geo_service import GeoService
 from app.services.weather_service import WeatherService
+from app.services.cache_service import QueryCache, TieredCache, create_l2_backend
+from app.services.singleflight import SingleFlight
 
 main_bp = Blueprint('main', __name__)
 
-# Query cache: {query_key: {"result": data, "timestamp": time}}
-query_cache = {}
+# Query cache: bounded LRU + TTL, shared by all request threads of this worker
 CACHE_TTL_SECONDS = 600  # 10 minutes
+query_cache = QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=CACHE_TTL_SECONDS
+)
+
+# Two-tier cache: query_cache as L1, optional shared L2 (CACHE_L2_BACKEND) so that
+# NLP analyses, geo resolutions and responses are reused across worker processes
+shared_cache = TieredCache(query_cache, create_l2_backend(), ttls={
+    "nlp": 3600,
+    "geo": 3600,
+    "response": CACHE_TTL_SECONDS,
+    "summary": 3600,
+})
+
+# Identical concurrent work (whole /api/resolve pipelines, NLP, geo and nearby
+# lookups) runs once per worker; the other requests wait for its result
+inflight = SingleFlight()
+
+# Deferred AI summaries: generated after /api/resolve has returned and polled via
+# /api/summaries/<job_id>. Job state lives in shared_cache, so any worker can answer.
+_summary_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SUMMARY_WORKERS", "4")), thread_name_prefix="summary"
+)
+_summary_running = set()
+_summary_lock = threading.Lock()
+
+# A pending marker left by a worker that died expires quickly; the worker
+# running the job renews it when the job leaves the queue
+SUMMARY_PENDING_TTL = 120
+
+def _summary_state(job_id):
+    # Always read through to L2: another worker may have finished the job since
+    state = shared_cache.get("summary", job_id, l1=False)
+    if state is None:
+        with _summary_lock:
+            if job_id in _summary_running:
+                # Queued or running here, but the marker expired meanwhile
+                return {"status": "pending"}
+    return state
+
+def _set_summary_state(job_id, state, ttl=None):
+    shared_cache.set("summary", job_id, state, ttl=ttl, l1=False)
+
+def _summary_job_id(user_query, places):
+    raw = user_query.lower().strip() + "|" + "|".join(p["city_name"] for p in places)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+def _run_summary_job(job_id, user_query, places):
+    try:
+        _set_summary_state(job_id, {"status": "pending"}, ttl=SUMMARY_PENDING_TTL)
+        summaries = NLPService.summarize_locations(user_query, places)
+        if summaries is None:
+            _set_summary_state(job_id, {"status": "error"}, ttl=60)
+        else:
+            _set_summary_state(job_id, {"status": "done", "summaries": summaries})
+    except Exception as e:
+        print(f"[ERROR] Summary job {job_id} failed: {e}")
+        _set_summary_state(job_id, {"status": "error"}, ttl=60)
+    finally:
+        with _summary_lock:
+            _summary_running.discard(job_id)
+
+def _start_summary_job(job_id, user_query, places):
+    """Schedules the summary stage unless it is already running or finished."""
+    with _summary_lock:
+        if job_id in _summary_running:
+            return
+        _summary_running.add(job_id)
+    _set_summary_state(job_id, {"status": "pending"}, ttl=SUMMARY_PENDING_TTL)
+    _summary_executor.submit(_run_summary_job, job_id, user_query, places)
+
+def _rainfall_days(user_query):
+    """Rainfall window asked for in the query: "last 30 days", "past month", ... (default 5)."""
+    text = user_query.lower()
+    match = re.search(r"(\d+)\s*days?", text)
+    if match:
+        return int(match.group(1))
+    if "month" in text:
+        return 30
+    if "week" in text:
+        return 7
+    return 5
+
+def _cache_set(namespace, key, value, ttl=None, l1=True):
+    """
+    Writes to shared_cache. Bulk callers pass l1=False so one-off terms never
+    evict the hot entries: they go to L2 only, or nowhere when there is no L2
+    (reads with l1=False still see L1 in that case).
+    """
+    if l1 or shared_cache.l2 is not None:
+        shared_cache.set(namespace, key, value, ttl=ttl, l1=l1)
+
+def _resolve_locations(terms, context_country=None, l1=True):
+    """GeoService.resolve_many behind the shared cache; only misses hit the DB."""
+    def key(term):
+        return f"{(context_country or '').lower()}|{term.strip().lower()}"
+
+    resolved = {}
+    misses = []
+    for term in terms:
+        cached = shared_cache.get("geo", key(term), l1=l1)
+        if cached is not None:
+            resolved[term] = cached["meta"]
+        else:
+            misses.append(term)
+
+    if misses:
+        fresh = inflight.do(
+            ("geo", (context_country or '').lower(), tuple(sorted(misses))),
+            GeoService.resolve_many, misses, context_country=context_country
+        )
+        for term, meta in fresh.items():
+            # Wrapped so a cached "not found" is distinguishable from a miss; misses
+            # are kept briefly so a DB hiccup does not pin them for the full TTL
+            _cache_set("geo", key(term), {"meta": meta}, ttl=None if meta else 60, l1=l1)
+            resolved[term] = meta
+    return resolved
 
 @main_bp.route('/')
 def home():
     return render_template('index.html')
 
-@main_bp.route('/api/resolve', methods=['POST'])
-def resolve_query():
-    data = request.json
-    user_query = data.get('query', '')
-    
-    # Check cache first
-    cache_key = user_query.lower().strip()
-    current_time = time.time()
-    
-    if cache_key in query_cache:
-        cached_entry = query_cache[cache_key]
-        if current_time - cached_entry["timestamp"] < CACHE_TTL_SECONDS:
-            print(f"[CACHE HIT] Returning cached result for: {user_query}")
-            return jsonify(cached_entry["result"])
-        else:
-            del query_cache[cache_key]
-    
-    # 1. NLP LAYER
+# --- RESOLVE PIPELINE STAGES (shared by /api/resolve and /api/resolve/stream) ---
+
+def _analyze(user_query, cache_key, l1=True):
+    """1. NLP LAYER"""
+    analysis = shared_cache.get("nlp", cache_key, l1=l1)
+    if analysis is None:
+        analysis = inflight.do(("nlp", cache_key), _analyze_uncached, user_query, cache_key, l1)
+    return analysis
+
+def _analyze_uncached(user_query, cache_key, l1=True):
     analysis = NLPService.analyze_query(user_query)
-    
-    intent = analysis.get('intent', 'INFO')
+    _cache_set("nlp", cache_key, analysis, l1=l1)
+    return analysis
+
+def _context_country(locations, resolved):
+    """The first location that resolved to a country sets the context for the others."""
+    for loc in locations:
+        meta = resolved.get(loc)
+        if meta and meta['type'] == 'country':
+            return meta['city_name']
+    return None
+
+def _resolve_places(analysis):
+    """2. DB LAYER: one result object per extracted location, in order. Returns (results, primary_city)."""
+    corrected_locations = analysis.get('locations', [])
+
+    # Context Detection (one batched round trip)
+    resolved = _resolve_locations(corrected_locations)
+    context_country = _context_country(corrected_locations, resolved)
+
+    # Re-rank with the context country (only needed when one was found)
+    if context_country:
+        resolved = _resolve_locations(corrected_locations, context_country=context_country)
+    return _build_results(analysis, resolved)
+
+def _build_results(analysis, resolved):
+    """Result objects for the analysis' locations from {term: metadata}. Returns (results, primary_city)."""
     corrected_locations = analysis.get('locations', [])
     location_details = analysis.get('location_details', {})
-    params = analysis.get('params', {})
-    
+
     resolved_data = []
-    
-    # 2. DB LAYER - Context Detection
-    context_country = None
-    for loc in corrected_locations:
-        meta = GeoService.get_location_metadata(loc)
-        if meta and meta['type'] == 'country':
-            context_country = meta['city_name']
-            break
-            
     primary_city = None
     for place in corrected_locations:
-        meta = GeoService.get_location_metadata(place, context_country=context_country)
+        meta = resolved.get(place)
         
         obj = {}
         if meta:
-            obj = meta
+            obj = dict(meta)  # Cached metadata is shared; never mutate it
             if not primary_city and meta['type'] == 'city': primary_city = meta
         else:
             obj = {
@@ -68,37 +202,123 @@ def resolve_query():
         obj['ai_summary'] = details.get('summary', '')
         obj['ai_answer'] = details.get('answer', '')
         
-        # WEATHER & RAINFALL INTEGRATION
-        if obj.get('lat') and obj.get('lon'):
-            # Current Weather
-            if intent == 'WEATHER':
-                weather = WeatherService.get_current_weather(obj['lat'], obj['lon'])
-                if weather: obj['weather'] = weather
-            
-            # Rainfall History (Keyword check)
-            if "rain" in user_query.lower() or "precipitation" in user_query.lower():
-                rain_data = WeatherService.get_rainfall_history(obj['lat'], obj['lon'])
-                if rain_data: obj['rainfall_history'] = rain_data
-        
         resolved_data.append(obj)
+    return resolved_data, primary_city
 
-    # 3. SPATIAL DISCOVERY
-    if intent == 'NEARBY' and primary_city:
-        radius = params.get('radius_km', 50)
-        neighbors = GeoService.find_nearby_cities(
-            primary_city['lat'], primary_city['lon'], radius_km=radius
-        )
-        resolved_data.extend(neighbors)
-        
-        # Deduplicate
-        seen = set()
-        unique_data = []
-        for item in resolved_data:
-            name = item.get('city_name')
-            if name not in seen:
-                unique_data.append(item)
-                seen.add(name)
-        resolved_data = unique_data
+def _schedule_summaries(user_query, resolved_data):
+    """
+    DEFERRED SUMMARIES: finished ones are inlined into resolved_data; otherwise
+    a job is started. Returns the job id, or None when nothing is pending.
+    """
+    pending = [obj for obj in resolved_data if not obj['ai_summary'] and not obj['ai_answer']]
+    if not pending or not NLPService.HAS_LLM:
+        return None
+
+    summary_job = _summary_job_id(user_query, pending)
+    state = _summary_state(summary_job)
+    if state and state["status"] == "done":
+        for obj in pending:
+            details = state["summaries"].get(obj['city_name'], {})
+            obj['ai_summary'] = details.get('summary', '')
+            obj['ai_answer'] = details.get('answer', '')
+        return None
+    if not state or state["status"] == "error":
+        places = [{k: obj.get(k) for k in ("city_name", "type", "parent_country")} for obj in pending]
+        _start_summary_job(summary_job, user_query, places)
+    return summary_job
+
+def _attach_weather(user_query, intent, resolved_data):
+    """
+    WEATHER & RAINFALL INTEGRATION (all fetches of the request fanned out together).
+    Returns the indices of the objects that received data.
+    """
+    want_weather = intent == 'WEATHER'
+    want_rain = "rain" in user_query.lower() or "precipitation" in user_query.lower()
+    if not (want_weather or want_rain):
+        return []
+
+    located = [i for i, obj in enumerate(resolved_data) if obj.get('lat') and obj.get('lon')]
+    fetched = WeatherService.fetch_many(
+        [(resolved_data[i]['lat'], resolved_data[i]['lon']) for i in located],
+        current=want_weather, rainfall=want_rain,
+        rainfall_days=_rainfall_days(user_query)
+    )
+    updated = []
+    for i, extra in zip(located, fetched):
+        obj = resolved_data[i]
+        if extra.get('weather'): obj['weather'] = extra['weather']
+        if extra.get('rainfall_history'): obj['rainfall_history'] = extra['rainfall_history']
+        if extra.get('weather') or extra.get('rainfall_history'):
+            updated.append(i)
+    return updated
+
+def _param(params, name, cast, default):
+    """params[name] (LLM output: may be a string, null or junk) as a finite number >= 0, else `default`."""
+    try:
+        value = cast(float(params.get(name)))
+    except (TypeError, ValueError, OverflowError):
+        return default
+    return value if math.isfinite(value) and value >= 0 else default
+
+def _find_neighbours(intent, params, primary_city, resolved_data):
+    """3. SPATIAL DISCOVERY: nearby cities not already in resolved_data."""
+    if intent != 'NEARBY' or not primary_city:
+        return []
+
+    radius = _param(params, 'radius_km', float, 50.0) or 50.0
+    k = _param(params, 'k', int, None) or None
+    min_population = _param(params, 'min_population', int, 0)
+    # A resolved city can be answered from its precomputed neighbourhood
+    city_id = primary_city.get('id') if primary_city.get('type') == 'city' else None
+    neighbors = inflight.do(
+        ("nearby", primary_city['lat'], primary_city['lon'], radius, k, min_population),
+        GeoService.find_nearby_cities, primary_city['lat'], primary_city['lon'],
+        radius_km=radius, k=k, min_population=min_population, city_id=city_id
+    )
+
+    # Deduplicate
+    seen = {item.get('city_name') for item in resolved_data}
+    unique = []
+    for item in neighbors:
+        name = item.get('city_name')
+        if name not in seen:
+            unique.append(item)
+            seen.add(name)
+    return unique
+
+def _wait_for_summaries(job_id, timeout=30.0, interval=0.25):
+    """Blocks until a summary job leaves "pending" (or times out); returns its state."""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = _summary_state(job_id)
+        if state is None or state["status"] != "pending" or time.monotonic() >= deadline:
+            return state
+        time.sleep(interval)
+
+@main_bp.route('/api/resolve', methods=['POST'])
+def resolve_query():
+    data = request.json
+    user_query = data.get('query', '')
+    
+    # Check cache first
+    cache_key = user_query.lower().strip()
+    cached = shared_cache.get("response", cache_key)
+    if cached is not None:
+        print(f"[CACHE HIT] Returning cached result for: {user_query}")
+        return jsonify(cached)
+
+    # Concurrent identical queries (e.g. right after a cache expiry) share one run
+    return jsonify(inflight.do(("resolve", cache_key), _run_resolve, user_query, cache_key))
+
+def _run_resolve(user_query, cache_key):
+    analysis = _analyze(user_query, cache_key)
+    intent = analysis.get('intent', 'INFO')
+    params = analysis.get('params', {})
+
+    resolved_data, primary_city = _resolve_places(analysis)
+    summary_job = _schedule_summaries(user_query, resolved_data)
+    _attach_weather(user_query, intent, resolved_data)
+    resolved_data.extend(_find_neighbours(intent, params, primary_city, resolved_data))
 
     # Prepare response (No multimodal_route)
     response_data = {
@@ -106,10 +326,417 @@ def resolve_query():
         "intent": intent,
         "results": resolved_data
     }
+    if summary_job:
+        response_data["summary_job"] = summary_job
     
-    query_cache[cache_key] = {
-        "result": response_data,
-        "timestamp": current_time
-    }
-    
-    return jsonify(response_data)
\ No newline at end of file
+    shared_cache.set("response", cache_key, response_data)
+    return response_data
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@main_bp.route('/api/resolve/stream', methods=['GET'])
+def resolve_query_stream():
+    """
+    Server-Sent Events variant of /api/resolve (GET ?query=...). Events, in order:
+    intent, location (one per place), weather (one per place with data),
+    nearby, summary, done. Failures end the stream with an error event.
+    """
+    user_query = request.args.get('query', '')
+    cache_key = user_query.lower().strip()
+
+    def generate():
+        try:
+            cached = shared_cache.get("response", cache_key)
+            if cached is not None:
+                print(f"[CACHE HIT] Streaming cached result for: {user_query}")
+                yield from _replay(cached)
+                return
+
+            analysis = _analyze(user_query, cache_key)
+            intent = analysis.get('intent', 'INFO')
+            params = analysis.get('params', {})
+            yield _sse("intent", {"intent": intent, "locations": analysis.get('locations', [])})
+
+            resolved_data, primary_city = _resolve_places(analysis)
+            summary_job = _schedule_summaries(user_query, resolved_data)
+            for index, obj in enumerate(resolved_data):
+                yield _sse("location", {"index": index, "result": obj})
+
+            for index in _attach_weather(user_query, intent, resolved_data):
+                obj = resolved_data[index]
+                yield _sse("weather", {
+                    "index": index,
+                    "weather": obj.get('weather'),
+                    "rainfall_history": obj.get('rainfall_history')
+                })
+
+            neighbours = _find_neighbours(intent, params, primary_city, resolved_data)
+            if neighbours:
+                yield _sse("nearby", {"results": neighbours})
+            resolved_data.extend(neighbours)
+
+            response_data = {"status": "success", "intent": intent, "results": resolved_data}
+            if summary_job:
+                response_data["summary_job"] = summary_job
+            shared_cache.set("response", cache_key, response_data)
+
+            if summary_job:
+                state = _wait_for_summaries(summary_job)
+                if state and state["status"] == "done":
+                    yield _sse("summary", {"summaries": state["summaries"]})
+            yield _sse("done", {"status": "success"})
+        except Exception as e:
+            print(f"[ERROR] Streaming resolve failed: {e}")
+            yield _sse("error", {"status": "error", "message": "Internal Server Error"})
+
+    def _replay(cached):
+        results = cached.get("results", [])
+        # Every cached result (nearby ones included) is replayed as a location event
+        yield _sse("intent", {"intent": cached.get("intent"), "locations": [r.get("city_name") for r in results]})
+        for index, obj in enumerate(results):
+            yield _sse("location", {"index": index, "result": obj})
+        if cached.get("summary_job"):
+            state = _wait_for_summaries(cached["summary_job"])
+            if state and state["status"] == "done":
+                yield _sse("summary", {"summaries": state["summaries"]})
+        yield _sse("done", {"status": "success"})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # let nginx pass events through unbuffered
+    })
+
+# --- BATCH RESOLVE ---
+
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100000"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))
+_batch_nlp_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BATCH_NLP_WORKERS", "8")), thread_name_prefix="batch-nlp"
+)
+
+class BatchInputError(ValueError):
+    pass
+
+def _parse_ndjson(lines):
+    queries = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise BatchInputError(f"Invalid NDJSON line: {line[:80]}")
+        queries.append(item.get('query', '') if isinstance(item, dict) else str(item))
+    return queries
+
+def _parse_csv(text):
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return []
+    # A "query" header column is used when present, otherwise the first column
+    header = [h.strip().lower() for h in rows[0]]
+    if "query" in header:
+        column = header.index("query")
+        return [row[column] if column < len(row) else '' for row in rows[1:]]
+    return [row[0] for row in rows]
+
+def _read_batch_queries():
+    """Queries from a JSON array / {"queries": [...]}, an uploaded CSV / NDJSON file, or a raw CSV / NDJSON body."""
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+        name = (upload.filename or '').lower()
+        if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (upload.mimetype or ''):
+            return _parse_ndjson(text.splitlines())
+        return _parse_csv(text)
+
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            body = body.get('queries')
+        if not isinstance(body, list):
+            raise BatchInputError("Expected a JSON array of queries or {\"queries\": [...]}")
+        return [q if isinstance(q, str) else str(q) for q in body]
+
+    text = request.get_data(as_text=True)
+    if 'ndjson' in (request.mimetype or '') or 'jsonl' in (request.mimetype or ''):
+        return _parse_ndjson(text.splitlines())
+    if 'csv' in (request.mimetype or ''):
+        return _parse_csv(text)
+    raise BatchInputError("Send JSON, an uploaded 'file' (CSV / NDJSON) or a text/csv / application/x-ndjson body")
+
+def _split_qualifier(term):
+    """"Springfield, USA" -> ("Springfield", "USA"); unqualified terms -> (term, None)."""
+    name, sep, qualifier = term.rpartition(",")
+    if not sep or not name.strip() or not qualifier.strip():
+        return term.strip(), None
+    return name.strip(), qualifier.strip()
+
+def _geocode_chunk(queries):
+    """
+    Geocode mode: every query is one location string. Unique terms are resolved
+    with set-based lookups, one per context country; a trailing ", <country>"
+    qualifier becomes the context for the name before it.
+    """
+    split = {q: _split_qualifier(q) for q in set(queries) if q.strip()}
+    qualifiers = _resolve_locations(sorted({qual for _, qual in split.values() if qual}), l1=False)
+
+    groups = {}  # context country -> {query: name}
+    for query, (name, qualifier) in split.items():
+        meta = qualifiers.get(qualifier) if qualifier else None
+        if qualifier and not (meta and meta['type'] == 'country'):
+            continue  # Same as the single resolver: unknown qualifiers are not guessed
+        groups.setdefault(meta['city_name'] if meta else None, {})[query] = name
+
+    results = {}
+    for context, names in groups.items():
+        resolved = _resolve_locations(sorted(set(names.values())), context_country=context, l1=False)
+        for query, name in names.items():
+            results[query] = resolved.get(name)
+
+    return results
+
+def _resolve_chunk(queries):
+    """
+    Full mode: NLP per unique query (response cache first), then every location
+    term of the chunk resolved in one set-based pass, plus one per context country.
+    Weather, nearby search and summaries are not part of batch results.
+    Cache traffic skips L1 (l1=False) so a large batch cannot flush the hot set.
+    Returns {cache key: response}.
+    """
+    responses = {}
+    pending = {}  # cache key -> first query text with that key
+    for query in queries:
+        key = query.lower().strip()
+        if key in responses or key in pending:
+            continue
+        cached = shared_cache.get("response", key, l1=False)
+        if cached is not None:
+            responses[key] = cached
+        else:
+            pending[key] = query
+
+    analyses = dict(zip(pending, _batch_nlp_executor.map(lambda item: _analyze(item[1], item[0], l1=False),
+                                                         pending.items())))
+
+    terms = sorted({loc for a in analyses.values() for loc in a.get('locations', [])})
+    plain = _resolve_locations(terms, l1=False)
+
+    contexts = {}  # context country -> keys of the queries that need it
+    for key, analysis in analyses.items():
+        context = _context_country(analysis.get('locations', []), plain)
+        if context:
+            contexts.setdefault(context, []).append(key)
+
+    with_context = {}
+    for context, context_keys in contexts.items():
+        context_terms = sorted({loc for k in context_keys for loc in analyses[k].get('locations', [])})
+        resolved = _resolve_locations(context_terms, context_country=context, l1=False)
+        for k in context_keys:
+            with_context[k] = resolved
+
+    for key, analysis in analyses.items():
+        results, _ = _build_results(analysis, with_context.get(key, plain))
+        responses[key] = {
+            "status": "success",
+            "intent": analysis.get('intent', 'INFO'),
+            "results": results
+        }
+    return responses
+
+@main_bp.route('/api/resolve/batch', methods=['POST'])
+def resolve_batch():
+    """
+    Bulk resolution. Streams NDJSON, one line per input query in input order:
+    - mode=geocode (default): each query is a location string
+      -> {"index", "query", "status": "success" | "not_found", "result"}
+    - mode=full: each query goes through NLP like /api/resolve
+      -> {"index", "query", "status", "intent", "results"}
+    Duplicates are resolved once; input is processed in chunks of BATCH_CHUNK_SIZE.
+    """
+    mode = request.args.get('mode', 'geocode').lower()
+    if mode not in ("geocode", "full"):
+        return jsonify({"status": "error", "message": "mode must be 'geocode' or 'full'"}), 400
+    try:
+        queries = _read_batch_queries()
+    except (BatchInputError, UnicodeDecodeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_QUERIES} queries per batch"}), 400
+
+    def generate():
+        for start in range(0, len(queries), BATCH_CHUNK_SIZE):
+            chunk = queries[start:start + BATCH_CHUNK_SIZE]
+            try:
+                if mode == "geocode":
+                    keys = [q.strip() for q in chunk]
+                    results = _geocode_chunk(keys)
+                    for offset, (query, key) in enumerate(zip(chunk, keys)):
+                        meta = results.get(key)
+                        line = {"index": start + offset, "query": query,
+                                "status": "success" if meta else "not_found", "result": meta}
+                        yield json.dumps(line, default=str) + "\n"
+                else:
+                    responses = _resolve_chunk(chunk)
+                    for offset, query in enumerate(chunk):
+                        line = dict(responses[query.lower().strip()], index=start + offset, query=query)
+                        yield json.dumps(line, default=str) + "\n"
+            except Exception as e:
+                print(f"[ERROR] Batch chunk at {start} failed: {e}")
+                for offset, query in enumerate(chunk):
+                    yield json.dumps({"index": start + offset, "query": query, "status": "error"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers={
+        "X-Accel-Buffering": "no",
+    })
+
+# --- REVERSE GEOCODING ---
+_reverse_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("REVERSE_WORKERS", "4")), thread_name_prefix="reverse"
+)
+
+def _parse_point(item):
+    """(lat, lon) from [lat, lon] / {"lat", "lon"}; None when missing or out of range."""
+    try:
+        if isinstance(item, dict):
+            lat, lon = float(item['lat']), float(item['lon'])
+        else:
+            lat, lon = float(item[0]), float(item[1])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+def _read_batch_points():
+    """
+    Raw point items from a JSON array / {"points": [...]}, NDJSON ({"lat", "lon"}
+    per line) or CSV with lat / lon columns (upload or body). Parsed by _parse_point.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+        name = (upload.filename or '').lower()
+        ndjson = name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (upload.mimetype or '')
+    elif request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            body = body.get('points')
+        if not isinstance(body, list):
+            raise BatchInputError("Expected a JSON array of points or {\"points\": [...]}")
+        return body
+    else:
+        text = request.get_data(as_text=True)
+        mimetype = request.mimetype or ''
+        ndjson = 'ndjson' in mimetype or 'jsonl' in mimetype
+        if not ndjson and 'csv' not in mimetype:
+            raise BatchInputError("Send JSON, an uploaded 'file' (CSV / NDJSON) or a text/csv / application/x-ndjson body")
+
+    if ndjson:
+        items = []
+        for line in text.splitlines():
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    raise BatchInputError(f"Invalid NDJSON line: {line.strip()[:80]}")
+        return items
+
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    header = [h.strip().lower() for h in rows[0]] if rows else []
+    if "lat" in header and "lon" in header:
+        lat_col, lon_col = header.index("lat"), header.index("lon")
+        return [[row[lat_col], row[lon_col]] if max(lat_col, lon_col) < len(row) else None for row in rows[1:]]
+    return rows
+
+@main_bp.route('/api/reverse', methods=['GET'])
+def reverse_geocode():
+    """Country, state and nearest city at ?lat=&lon=."""
+    point = _parse_point({"lat": request.args.get('lat'), "lon": request.args.get('lon')})
+    if point is None:
+        return jsonify({"status": "error", "message": "lat and lon are required (-90..90, -180..180)"}), 400
+    result = GeoService.reverse_geocode(*point)
+    if result is None:
+        return jsonify({"status": "error", "message": "Reverse geocoding unavailable"}), 503
+    return jsonify(dict(result, status="success"))
+
+@main_bp.route('/api/reverse/batch', methods=['POST'])
+def reverse_geocode_batch():
+    """
+    Bulk reverse geocoding. Streams NDJSON, one line per input point in input order:
+    {"index", "lat", "lon", "status": "success" | "invalid" | "error", "country", "state", "city"}.
+    Chunks of BATCH_CHUNK_SIZE points are one query each, run on REVERSE_WORKERS threads.
+    """
+    try:
+        items = _read_batch_points()
+    except (BatchInputError, UnicodeDecodeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if len(items) > BATCH_MAX_QUERIES:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_QUERIES} points per batch"}), 400
+
+    points = [_parse_point(item) for item in items]
+    chunks = [list(range(start, min(start + BATCH_CHUNK_SIZE, len(points))))
+              for start in range(0, len(points), BATCH_CHUNK_SIZE)]
+
+    def run_chunk(indices):
+        valid = [i for i in indices if points[i] is not None]
+        try:
+            return dict(zip(valid, GeoService.reverse_geocode_many([points[i] for i in valid]) or []))
+        except Exception as e:
+            print(f"[ERROR] Reverse batch chunk at {indices[0]} failed: {e}")
+            return {}
+
+    def generate():
+        for indices, results in zip(chunks, _reverse_executor.map(run_chunk, chunks)):
+            for i in indices:
+                if points[i] is None:
+                    yield json.dumps({"index": i, "status": "invalid", "input": items[i]}, default=str) + "\n"
+                elif i in results:
+                    yield json.dumps(dict(results[i], index=i, status="success"), default=str) + "\n"
+                else:
+                    lat, lon = points[i]
+                    yield json.dumps({"index": i, "lat": lat, "lon": lon, "status": "error"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers={
+        "X-Accel-Buffering": "no",
+    })
+
+@main_bp.route('/api/summaries/<job_id>', methods=['GET'])
+def get_summaries(job_id):
+    """Polled by the dashboard: {"status": "pending" | "done" | "error", "summaries": {...}}."""
+    state = _summary_state(job_id)
+    if state is None:
+        return jsonify({"status": "error", "message": "Unknown or expired summary job"}), 404
+    return jsonify(dict(state, job_id=job_id))
+
+@main_bp.route('/api/nlp/stats', methods=['GET'])
+def nlp_stats():
+    return jsonify(NLPService.stats())
+
+@main_bp.route('/api/db/stats', methods=['GET'])
+def db_stats():
+    from app import db_pool
+    if db_pool is None:
+        return jsonify({"status": "error", "message": "Database pool unavailable"}), 503
+    from app.db_statements import statements
+    return jsonify(dict(db_pool.stats(), prepared=statements.stats()))
+
+@main_bp.route('/api/spatial/stats', methods=['GET'])
+def spatial_stats():
+    from app.services.route_service import RouteService
+    return jsonify({
+        "backend": GeoService.SPATIAL_BACKEND,
+        "cities": GeoService.city_index.stats() if GeoService.city_index is not None else None,
+        "airports": RouteService.airport_index.stats() if RouteService.airport_index is not None else None,
+    })
+
+@main_bp.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = shared_cache.stats()
+    stats["nlp_store"] = NLPService.store.stats() if NLPService.store else None
+    stats["weather"] = WeatherService.cache.stats()
+    stats["rainfall_store"] = WeatherService.rainfall_store.stats() if WeatherService.rainfall_store else None
+    stats["singleflight"] = {"routes": inflight.stats(), "weather": WeatherService._flights.stats()}
+    return jsonify(stats)
\ No newline at end of file
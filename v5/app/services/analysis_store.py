@@ -0,0 +1,186 @@
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Folds case, punctuation and whitespace: 'Weather in  Chennai?' -> 'weather in chennai'."""
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class AnalysisStore:
+    """
+    Disk-backed store of LLM analyses, keyed by (prompt version, normalized query).
+
+    A SQLite file survives restarts and deploys; the most recently used rows are
+    warm-loaded into a bounded in-memory LRU at startup. Rows beyond
+    `max_entries` are evicted by last use, which also retires analyses from
+    older prompt versions. Hits only note their last use in memory; the
+    timestamps are written in one batch every `touch_every` hits and before
+    each eviction, so reads never wait on a SQLite commit.
+    """
+
+    def __init__(self, path, prompt_version, max_entries=50000, warm_entries=2000, evict_every=200,
+                 touch_every=100):
+        self.path = path
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.warm_entries = warm_entries
+        self.evict_every = evict_every
+        self.touch_every = touch_every
+
+        self._memory = OrderedDict()  # normalized query -> result
+        self._touched = {}            # normalized query -> last use not yet written
+        self._unflushed_hits = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                prompt_version TEXT NOT NULL,
+                query_norm TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (prompt_version, query_norm)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_last_used ON analyses(last_used)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def warm_load(self):
+        """Loads the most recently used analyses into memory; returns how many."""
+        rows = self._conn().execute(
+            "SELECT query_norm, result FROM analyses WHERE prompt_version = ? ORDER BY last_used DESC LIMIT ?",
+            (self.prompt_version, self.warm_entries)
+        ).fetchall()
+        with self._lock:
+            for query_norm, result in reversed(rows):
+                self._memory[query_norm] = json.loads(result)
+        return len(rows)
+
+    def _remember(self, query_norm, result):
+        with self._lock:
+            self._memory[query_norm] = result
+            self._memory.move_to_end(query_norm)
+            while len(self._memory) > self.warm_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, text):
+        query_norm = normalize_query(text)
+        if not query_norm:
+            return None
+
+        with self._lock:
+            result = self._memory.get(query_norm)
+            if result is not None:
+                self._memory.move_to_end(query_norm)
+
+        if result is None:
+            row = self._conn().execute(
+                "SELECT result FROM analyses WHERE prompt_version = ? AND query_norm = ?",
+                (self.prompt_version, query_norm)
+            ).fetchone()
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            result = json.loads(row[0])
+            self._remember(query_norm, result)
+
+        with self._lock:
+            self.hits += 1
+            self._touched[query_norm] = time.time()
+            self._unflushed_hits += 1
+            flush = self._unflushed_hits >= self.touch_every
+        if flush:
+            self.flush()
+        # Callers may mutate the analysis; hand out a private copy
+        return copy.deepcopy(result)
+
+    def flush(self):
+        """Writes the pending last-use timestamps in one transaction; returns how many."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._unflushed_hits = 0
+        if touched:
+            conn = self._conn()
+            conn.executemany(
+                "UPDATE analyses SET last_used = ? WHERE prompt_version = ? AND query_norm = ?",
+                [(used, self.prompt_version, query_norm) for query_norm, used in touched.items()]
+            )
+            conn.commit()
+        return len(touched)
+
+    def put(self, text, result):
+        query_norm = normalize_query(text)
+        if not query_norm:
+            return
+
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO analyses (prompt_version, query_norm, result, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (self.prompt_version, query_norm, json.dumps(result), now, now)
+        )
+        conn.commit()
+        self._remember(query_norm, copy.deepcopy(result))
+
+        with self._lock:
+            self._touched.pop(query_norm, None)  # Just written with last_used = now
+            self._writes += 1
+            evict = self._writes % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        self.flush()
+        conn = self._conn()
+        conn.execute("""
+            DELETE FROM analyses WHERE rowid IN (
+                SELECT rowid FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        conn.commit()
+
+    def stats(self):
+        count = self._conn().execute("SELECT count(*) FROM analyses").fetchone()[0]
+        with self._lock:
+            warm = len(self._memory)
+            hits, misses = self.hits, self.misses
+        return {
+            "path": self.path,
+            "prompt_version": self.prompt_version,
+            "entries": count,
+            "in_memory": warm,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+        }
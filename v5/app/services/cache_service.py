@@ -0,0 +1,387 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Bounded, thread-safe in-process cache.
+    Evicts least-recently-used entries once either the entry count or the
+    approximate byte budget is exceeded; expired entries are dropped on read
+    and by a periodic sweep, so memory stays flat under many unique keys.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=32 * 1024 * 1024, ttl_seconds=600, sweep_interval=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        self._entries = OrderedDict()   # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _sizeof(value):
+        """Approximate footprint: size of the JSON payload we would send anyway."""
+        try:
+            return len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        size = self._sizeof(value)
+        now = time.monotonic()
+        ttl = self.ttl_seconds if ttl is None else ttl
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            # A single oversized value would flush the whole cache; skip it instead
+            if size > self.max_bytes:
+                self.rejected += 1
+                return False
+
+            self._entries[key] = (value, now + ttl, size)
+            self._bytes += size
+
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _sweep(self, now):
+        expired = [k for k, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        self._last_sweep = now
+        return len(expired)
+
+    def sweep(self):
+        """Drops every expired entry; returns how many were removed."""
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+            }
+
+
+# --- SHARED (L2) BACKENDS ---
+# Values cross process boundaries, so L2 stores JSON text and returns it as-is.
+# get() returns (payload, seconds left to live) so a promoted L1 copy never
+# outlives the shared entry.
+
+class MemoryCacheBackend:
+    """Process-local stand-in for the shared tier (tests, single-worker dev)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                del self._data[key]
+                return None
+            return payload, remaining
+
+    def set(self, key, payload, ttl):
+        with self._lock:
+            self._data[key] = (payload, time.time() + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": self.name, "entries": len(self._data)}
+
+
+class SQLiteCacheBackend:
+    """
+    Shared tier for several workers on one box: a WAL-mode SQLite file that
+    every process opens. Row count is bounded; expired and oldest rows are
+    purged every `purge_every` writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path, max_rows=100000, purge_every=500):
+        self.path = path
+        self.max_rows = max_rows
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_stored ON cache(stored_at)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections are not shareable across threads: one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return (row[0], row[1] - now) if row else None
+
+    def set(self, key, payload, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+            (key, payload, now + ttl, now)
+        )
+        conn.commit()
+
+        with self._writes_lock:
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purge()
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def purge(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute("""
+            DELETE FROM cache WHERE key IN (
+                SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_rows,))
+        conn.commit()
+
+    def stats(self):
+        count = self._conn().execute("SELECT count(*) FROM cache").fetchone()[0]
+        return {"backend": self.name, "path": self.path, "entries": count, "max_rows": self.max_rows}
+
+
+class RedisCacheBackend:
+    """Shared tier over any Redis-protocol server (Redis, Valkey, KeyDB...)."""
+
+    name = "redis"
+
+    def __init__(self, url):
+        import redis  # Optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.url = url
+
+    def get(self, key):
+        pipe = self._client.pipeline()
+        pipe.get(key)
+        pipe.pttl(key)
+        value, pttl = pipe.execute()
+        if value is None:
+            return None
+        # PTTL is -1 for keys without expiry (never written by set(), but be safe)
+        remaining = pttl / 1000 if pttl and pttl > 0 else float("inf")
+        return value.decode("utf-8"), remaining
+
+    def set(self, key, payload, ttl):
+        self._client.setex(key, max(1, int(ttl)), payload)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def stats(self):
+        return {"backend": self.name, "entries": self._client.dbsize()}
+
+
+def create_l2_backend(kind=None):
+    """
+    Builds the shared tier from CACHE_L2_BACKEND: "none" (default), "memory",
+    "sqlite" (CACHE_L2_PATH) or "redis" (REDIS_URL). Falls back to no L2 on error.
+    """
+    kind = (kind or os.getenv("CACHE_L2_BACKEND", "none")).lower()
+    try:
+        if kind == "memory":
+            return MemoryCacheBackend()
+        if kind == "sqlite":
+            return SQLiteCacheBackend(
+                os.getenv("CACHE_L2_PATH", "/tmp/geospatial_cache.sqlite3"),
+                max_rows=int(os.getenv("CACHE_L2_MAX_ROWS", "100000"))
+            )
+        if kind == "redis":
+            return RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    except Exception as e:
+        print(f"[ERROR] Shared cache backend '{kind}' unavailable: {e}")
+    return None
+
+
+class TieredCache:
+    """
+    L1 (per-process QueryCache) in front of an optional shared L2 backend.
+    Keys are namespaced ("nlp", "geo", "response"); L2 hits are promoted to L1
+    for the shorter of the namespace TTL and the time the L2 entry has left.
+    L2 failures are logged and treated as misses so a broken backend never
+    fails a request.
+
+    `l1=False` bypasses L1 whenever an L2 is configured: for state another
+    worker may change (summary jobs) and for one-off bulk traffic that would
+    only evict the hot entries.
+    """
+
+    def __init__(self, l1, l2=None, ttls=None):
+        self.l1 = l1
+        self.l2 = l2
+        self.ttls = ttls or {}
+        # L2 counters are guarded by the lock that guards L1's (request threads
+        # and the background refreshers update them concurrently)
+        self._lock = l1._lock
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _ttl(self, namespace, ttl):
+        if ttl is not None:
+            return ttl
+        return self.ttls.get(namespace, self.l1.ttl_seconds)
+
+    def get(self, namespace, key, l1=True):
+        full_key = f"{namespace}:{key}"
+        if self.l2 is None:
+            return self.l1.get(full_key)
+        if l1:
+            value = self.l1.get(full_key)
+            if value is not None:
+                return value
+
+        try:
+            entry = self.l2.get(full_key)
+        except Exception as e:
+            self._count("l2_errors")
+            print(f"[WARNING] Shared cache read failed: {e}")
+            return None
+
+        if entry is None:
+            self._count("l2_misses")
+            return None
+
+        self._count("l2_hits")
+        payload, remaining = entry
+        value = json.loads(payload)
+        if l1:
+            self.l1.set(full_key, value, ttl=min(remaining, self._ttl(namespace, None)))
+        return value
+
+    def set(self, namespace, key, value, ttl=None, l1=True):
+        full_key = f"{namespace}:{key}"
+        ttl = self._ttl(namespace, ttl)
+        if l1 or self.l2 is None:
+            self.l1.set(full_key, value, ttl=ttl)
+        if self.l2 is None:
+            return
+        try:
+            self.l2.set(full_key, json.dumps(value, default=str), ttl)
+        except Exception as e:
+            self._count("l2_errors")
+            print(f"[WARNING] Shared cache write failed: {e}")
+
+    def stats(self):
+        l2 = None
+        if self.l2 is not None:
+            try:
+                l2 = self.l2.stats()
+            except Exception as e:
+                l2 = {"backend": self.l2.name, "error": str(e)}
+            with self._lock:
+                l2.update({"hits": self.l2_hits, "misses": self.l2_misses, "errors": self.l2_errors})
+        return {"l1": self.l1.stats(), "l2": l2}
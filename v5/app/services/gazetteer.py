@@ -0,0 +1,255 @@
+import re
+import sys
+from array import array
+
+import psycopg2.extras
+
+# Entry kinds (stored in a bytearray, one byte per entry)
+COUNTRY, STATE, CITY = 0, 1, 2
+KIND_NAMES = ("country", "state", "city")
+
+SIMILARITY_THRESHOLD = 0.4
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(text):
+    """
+    Python port of pg_trgm's show_trgm(): lower-cased words, each padded
+    with two leading blanks and one trailing blank.
+    """
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def normalize_alias(text):
+    """Python twin of the SQL alias_norm: lower(regexp_replace(btrim(x), '\\s+', ' ', 'g'))."""
+    return " ".join(text.lower().split())
+
+
+class _TrigramIndex:
+    """
+    Inverted index from trigram ids to item ids; lookups only touch items that
+    can pass the similarity threshold (prefix filtering on the rarest query
+    trigrams).
+    """
+
+    def __init__(self):
+        # Trigram ids per item, flattened: item i owns gram_ids[offsets[i]:offsets[i + 1]]
+        self.gram_ids = array("I")
+        self.offsets = array("I", [0])
+        self._gram_lookup = {}      # trigram -> trigram id
+        self._postings = []         # trigram id -> array of item ids
+
+    def add(self, text):
+        """Indexes `text` as the next item id."""
+        idx = len(self.offsets) - 1
+        for gram in trigrams(text):
+            gid = self._gram_lookup.get(gram)
+            if gid is None:
+                gid = len(self._postings)
+                self._gram_lookup[gram] = gid
+                self._postings.append(array("I"))
+            self._postings[gid].append(idx)
+            self.gram_ids.append(gid)
+        self.offsets.append(len(self.gram_ids))
+        return idx
+
+    def similar(self, term, threshold=SIMILARITY_THRESHOLD):
+        """Returns {item id: similarity} for items with similarity(item, term) > threshold."""
+        query_ids = set()
+        for gram in trigrams(term):
+            gid = self._gram_lookup.get(gram)
+            # Unknown trigrams still count towards the union, so keep a unique placeholder
+            query_ids.add(gid if gid is not None else ("?", gram))
+
+        n_query = len(query_ids)
+        if not n_query:
+            return {}
+
+        # similarity <= common / n_query, so a match needs more than threshold * n_query shared
+        # trigrams; any such item must appear in one of the rarest (n_query - min_common + 1) lists.
+        min_common = int(threshold * n_query) + 1
+        known = sorted((gid for gid in query_ids if isinstance(gid, int)), key=lambda g: len(self._postings[g]))
+        probe_count = len(known) - min_common + 1
+        if probe_count <= 0:
+            return {}
+
+        candidates = set()
+        for gid in known[:probe_count]:
+            candidates.update(self._postings[gid])
+
+        known = frozenset(known)
+        offsets, gram_ids = self.offsets, self.gram_ids
+        scores = {}
+        for idx in candidates:
+            start, end = offsets[idx], offsets[idx + 1]
+            common = len(known.intersection(gram_ids[start:end]))
+            sim = common / (n_query + (end - start) - common)
+            if sim > threshold:
+                scores[idx] = sim
+        return scores
+
+
+class Gazetteer:
+    """
+    In-process copy of countries, states and cities for name resolution.
+
+    Entries live in parallel arrays. Names and (normalized) city aliases each
+    have a trigram index, mirroring the SQL resolver's similarity() / % tests.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.kinds = bytearray()
+        self.ids = array("q")
+        self.populations = array("q")
+        self.lats = array("d")
+        self.lons = array("d")
+        self.parents = []
+
+        self._names = _TrigramIndex()     # item id == entry id
+        self._alias_index = _TrigramIndex()
+        self._alias_keys = []             # alias item id -> normalized alias
+        self._aliases = {}                # normalized alias -> [entry id] (cities only)
+        self._codes = {}                  # lower(iso_code / state_code) -> [entry id]
+
+    def __len__(self):
+        return len(self.names)
+
+    # --- BUILD ---
+
+    def add(self, kind, source_id, name, population, lat, lon, parent_country, code=None, aliases=()):
+        if not name:
+            return
+        idx = len(self.names)
+        self.names.append(name)
+        self.kinds.append(kind)
+        self.ids.append(source_id or 0)
+        self.populations.append(int(population or 0))
+        self.lats.append(lat if lat is not None else float("nan"))
+        self.lons.append(lon if lon is not None else float("nan"))
+        self.parents.append(sys.intern(parent_country) if parent_country else None)
+
+        self._names.add(name)
+
+        if code:
+            self._codes.setdefault(code.lower(), []).append(idx)
+        for alias in aliases or ():
+            key = normalize_alias(alias) if alias else ""
+            if not key:
+                continue
+            bucket = self._aliases.get(key)
+            if bucket is None:
+                bucket = self._aliases[key] = []
+                self._alias_keys.append(key)
+                self._alias_index.add(key)
+            if not bucket or bucket[-1] != idx:
+                bucket.append(idx)
+
+    @classmethod
+    def from_db(cls, conn):
+        """Loads every country, state and city row through server-side cursors."""
+        gaz = cls()
+
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT country_id, country_name, iso_code, population,
+                       centroid_lat as lat, centroid_lon as lon
+                FROM countries
+            """)
+            for row in cursor:
+                gaz.add(COUNTRY, row['country_id'], row['country_name'], row['population'],
+                        row['lat'], row['lon'], row['country_name'], code=row['iso_code'])
+
+        with conn.cursor(name="gazetteer_states", cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.itersize = 5000
+            cursor.execute("""
+                SELECT state_id, state_name, state_code,
+                       centroid_lat as lat, centroid_lon as lon, parent_country_name as parent_country
+                FROM states
+            """)
+            for row in cursor:
+                gaz.add(STATE, row['state_id'], row['state_name'], 0,
+                        row['lat'], row['lon'], row['parent_country'], code=row['state_code'])
+
+        with conn.cursor(name="gazetteer_cities", cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.itersize = 20000
+            cursor.execute("""
+                SELECT city_id, city_name, alt_names, population,
+                       centroid_lat as lat, centroid_lon as lon, parent_country_name as parent_country
+                FROM cities
+            """)
+            for row in cursor:
+                gaz.add(CITY, row['city_id'], row['city_name'], row['population'],
+                        row['lat'], row['lon'], row['parent_country'], aliases=row['alt_names'])
+
+        conn.rollback()  # Named cursors leave a transaction open
+        return gaz
+
+    # --- LOOKUP ---
+
+    def _similar(self, term, threshold=SIMILARITY_THRESHOLD):
+        """Returns {entry id: similarity} for entries with similarity(name, term) > threshold."""
+        return self._names.similar(term, threshold)
+
+    def lookup(self, term, context_country=None):
+        """
+        Mirrors the ranking of GeoService's SQL resolver:
+        context-country preference, then similarity, then population.
+        """
+        term_lower = term.lower()
+        scores = self._similar(term)
+
+        # Exact code hits (iso_code / state_code ILIKE term) qualify with their plain similarity
+        for idx in self._codes.get(term_lower, ()):
+            if idx not in scores:
+                scores[idx] = self._score(idx, term)
+
+        # Aliases, as in the SQL alias branch: on the normalized term, exact hits
+        # score 1.0, fuzzy (%) hits their similarity; a city keeps its best score
+        term_norm = normalize_alias(term)
+        for alias_id, sim in self._alias_index.similar(term_norm).items():
+            for idx in self._aliases[self._alias_keys[alias_id]]:
+                if sim > scores.get(idx, 0.0):
+                    scores[idx] = sim
+        for idx in self._aliases.get(term_norm, ()):
+            scores[idx] = 1.0
+
+        if not scores:
+            return None
+
+        context_lower = context_country.lower() if context_country else None
+
+        def rank(idx):
+            parent = self.parents[idx]
+            in_context = 1 if context_lower and parent and parent.lower() == context_lower else 0
+            return (in_context, scores[idx], self.populations[idx])
+
+        best = max(scores, key=rank)
+        return self._row(best, scores[best])
+
+    def _score(self, idx, term):
+        query = trigrams(term)
+        name = trigrams(self.names[idx])
+        if not query and not name:
+            return 0.0
+        common = len(query & name)
+        return common / (len(query) + len(name) - common)
+
+    def _row(self, idx, score):
+        lat, lon = self.lats[idx], self.lons[idx]
+        return {
+            "city_name": self.names[idx],
+            "type": KIND_NAMES[self.kinds[idx]],
+            "id": self.ids[idx],
+            "population": self.populations[idx],
+            "sim_score": score,
+            "lat": lat if lat == lat else None,  # NaN marks a missing centroid
+            "lon": lon if lon == lon else None,
+            "parent_country": self.parents[idx],
+        }
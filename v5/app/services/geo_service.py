@@ -3,15 +3,331 @@ if __name__ == "__main__":
     import os
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
+import os
+import time
 from app import get_db_connection, release_db_connection
+from app.db_statements import statements
+from app.services.gazetteer import Gazetteer
+import psycopg2.errors
 import psycopg2.extras
 
+# --- RESOLVER SQL ---
+# Candidate searches per DB mode. {term} is a bind parameter for single lookups
+# and the unnested column for batch lookups.
+
+# "db": three-way UNION ALL over the source tables. Centroids and parent country
+# names are read from the columns materialized by the seed scripts.
+_DB_CANDIDATES = """
+    -- 1. COUNTRIES
+    SELECT country_name as name, 'country' as type, population, centroid_lat as lat, centroid_lon as lon,
+           similarity(country_name, {term}) as sim_score,
+           country_name as parent_country, country_id as id
+    FROM countries
+    WHERE similarity(country_name, {term}) > 0.4 OR iso_code ILIKE {term}
+
+    UNION ALL
+
+    -- 2. STATES
+    SELECT state_name as name, 'state' as type, 0 as population, centroid_lat, centroid_lon,
+           similarity(state_name, {term}) as sim_score,
+           parent_country_name, state_id
+    FROM states
+    WHERE similarity(state_name, {term}) > 0.4 OR state_code ILIKE {term}
+
+    UNION ALL
+
+    -- 3. CITIES
+    SELECT city_name as name, 'city' as type, population, centroid_lat, centroid_lon,
+           similarity(city_name, {term}) as sim_score,
+           parent_country_name, city_id
+    FROM cities
+    WHERE similarity(city_name, {term}) > 0.4
+
+    UNION ALL
+
+    -- 4. CITY ALIASES (btree probe for exact hits = 1.0, trigram index for fuzzy hits)
+    SELECT c.city_name, 'city', c.population, c.centroid_lat, c.centroid_lon, a.sim_score,
+           c.parent_country_name, c.city_id
+    FROM (
+        SELECT city_id,
+               max(CASE WHEN alias_norm = {norm} THEN 1.0 ELSE similarity(alias_norm, {norm}) END) as sim_score
+        FROM city_aliases
+        WHERE alias_norm = {norm} OR alias_norm %% {norm}
+        GROUP BY city_id
+    ) a
+    JOIN cities c ON c.city_id = a.city_id
+"""
+
+# Alias normalization; scripts/seed_cities.py applies the same expression at load time
+_ALIAS_NORM = "lower(regexp_replace(btrim({term}), '\\s+', ' ', 'g'))"
+
+# "places": unified table from scripts/migrate_places.sql. Exact names/aliases and
+# codes come from btree probes; fuzzy hits from the GiST trigram index (% + <-> KNN).
+PLACES_KNN_LIMIT = 50
+
+_PLACES_CANDIDATES = """
+    -- 1. EXACT NAMES & ALIASES
+    SELECT canonical_name as name, place_type as type, population, lat, lon, parent_country,
+           CASE WHEN is_alias THEN 1.0 ELSE similarity(name, {term}) END as sim_score, source_id as id
+    FROM places
+    WHERE lower(name) = lower({term})
+
+    UNION ALL
+
+    -- 2. ISO / STATE CODES
+    SELECT canonical_name, place_type, population, lat, lon, parent_country,
+           similarity(canonical_name, {term}), source_id
+    FROM places
+    WHERE lower(code) = lower({term})
+
+    UNION ALL
+
+    -- 3. FUZZY (index-driven KNN)
+    (SELECT canonical_name, place_type, population, lat, lon, parent_country,
+            similarity(name, {term}), source_id
+     FROM places
+     WHERE name %% {term}
+     ORDER BY name <-> {term}
+     LIMIT %(knn_limit)s)
+"""
+
+_RESOLVER_MODES = {
+    "db": _DB_CANDIDATES,
+    "places": _PLACES_CANDIDATES,
+}
+
+
+def resolver_sql(mode, term_ref="%(term)s"):
+    """Top-1 resolver query for a DB mode; params: term, context, knn_limit."""
+    candidates = _RESOLVER_MODES[mode]
+    return f"""
+        SELECT name as city_name, type, id, population, sim_score, lat, lon, parent_country
+        FROM ({candidates.format(term=term_ref, norm=_ALIAS_NORM.format(term=term_ref))}) all_matches
+        ORDER BY (CASE WHEN parent_country ILIKE %(context)s THEN 1 ELSE 0 END) DESC, sim_score DESC, population DESC
+        LIMIT 1
+    """
+
+
+def resolver_many_sql(mode):
+    """Batch resolver: one row per matched input term; params: terms, context, knn_limit."""
+    return f"""
+        SELECT q.term, m.*
+        FROM unnest(%(terms)s::text[]) AS q(term)
+        CROSS JOIN LATERAL ({resolver_sql(mode, term_ref="q.term")}) m
+    """
+
+
+def resolver_params(context_country, **params):
+    params["context"] = context_country if context_country else "NON_EXISTENT_COUNTRY"
+    params["knn_limit"] = PLACES_KNN_LIMIT
+    return params
+
+
+# --- NEARBY SEARCH ---
+# "geog":  stored, GiST-indexed geography column (scripts/migrate_city_geog.sql);
+#          ST_DWithin and the <-> KNN ordering both run off idx_cities_geog.
+# "bbox":  no migration needed; a degree-expanded envelope prefilters through
+#          idx_cities_geom, the exact geodesic check runs on the survivors only.
+# "cast":  original query (geom::geography on every row, full scan).
+NEARBY_MODES = ("geog", "bbox", "cast")
+
+_NEARBY_POINT = "ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)"
+
+NEARBY_SQL = {
+    "geog": f"""
+        SELECT city_id, city_name, population, lat, lon,
+               ST_Distance(geog, {_NEARBY_POINT}::geography) / 1000 as dist_km
+        FROM cities
+        WHERE ST_DWithin(geog, {_NEARBY_POINT}::geography, %(radius_km)s * 1000)
+          AND population >= %(min_population)s
+        ORDER BY geog <-> {_NEARBY_POINT}::geography
+        LIMIT %(k)s
+    """,
+    # Envelope prefilter over idx_cities_geom, exact check after. Its longitude
+    # half-width is asin(sin(r) / cos(lat)); when the circle reaches a pole the
+    # box is the whole latitude band, and when it crosses +-180 it is split in two
+    # (`wrapped` is NULL otherwise). The radius is padded 1% for the spheroid.
+    "bbox": f"""
+        WITH span AS (
+            SELECT %(lat)s - degrees(r) AS lat0, %(lat)s + degrees(r) AS lat1,
+                   sin(r) / greatest(cos(radians(%(lat)s)), 1e-12) AS s
+            FROM (SELECT %(radius_km)s * 1.01 / 6371.0088 AS r) radius
+        ),
+        box AS (
+            SELECT lat0, lat1, lat0 <= -90 OR lat1 >= 90 OR s >= 1 AS polar,
+                   %(lon)s - degrees(asin(least(s, 1))) AS lon0,
+                   %(lon)s + degrees(asin(least(s, 1))) AS lon1
+            FROM span
+        ),
+        envelopes AS (
+            SELECT CASE WHEN polar THEN ST_MakeEnvelope(-180, greatest(lat0, -90), 180, least(lat1, 90), 4326)
+                        ELSE ST_MakeEnvelope(greatest(lon0, -180), lat0, least(lon1, 180), lat1, 4326)
+                   END AS main,
+                   CASE WHEN polar THEN NULL
+                        WHEN lon0 < -180 THEN ST_MakeEnvelope(lon0 + 360, lat0, 180, lat1, 4326)
+                        WHEN lon1 > 180 THEN ST_MakeEnvelope(-180, lat0, lon1 - 360, lat1, 4326)
+                   END AS wrapped
+            FROM box
+        )
+        SELECT city_id, city_name, population, lat, lon,
+               ST_Distance(geom::geography, {_NEARBY_POINT}::geography) / 1000 as dist_km
+        FROM cities
+        WHERE (geom && (SELECT main FROM envelopes) OR geom && (SELECT wrapped FROM envelopes))
+          AND ST_DWithin(geom::geography, {_NEARBY_POINT}::geography, %(radius_km)s * 1000)
+          AND population >= %(min_population)s
+        ORDER BY dist_km ASC
+        LIMIT %(k)s
+    """,
+    "cast": f"""
+        SELECT city_id, city_name, population, lat, lon,
+               ST_Distance(geom::geography, {_NEARBY_POINT}::geography) / 1000 as dist_km
+        FROM cities
+        WHERE ST_DWithin(geom::geography, {_NEARBY_POINT}::geography, %(radius_km)s * 1000)
+          AND population >= %(min_population)s
+        ORDER BY dist_km ASC
+        LIMIT %(k)s
+    """,
+}
+
+# Precomputed neighbourhoods (scripts/build_city_neighbours.py): the row of the
+# largest population tier <= min_population, expanded to city rows in rank order.
+# Rows are keyed by GeoNames id, which survives reloads that renumber city_id.
+NEIGHBOURS_SQL = """
+    SELECT n.reach_km, u.dist_km, c.city_id, c.city_name, c.population, c.lat, c.lon
+    FROM cities origin
+    CROSS JOIN LATERAL (
+        SELECT neighbour_ids, dist_km, reach_km
+        FROM city_neighbours
+        WHERE geonameid = origin.geonameid AND min_population <= %(min_population)s
+        ORDER BY min_population DESC
+        LIMIT 1
+    ) n
+    LEFT JOIN LATERAL unnest(n.neighbour_ids, n.dist_km) WITH ORDINALITY AS u(neighbour_id, dist_km, ord) ON TRUE
+    LEFT JOIN cities c ON c.geonameid = u.neighbour_id
+    WHERE origin.city_id = %(city_id)s
+    ORDER BY u.ord
+"""
+
+# --- REVERSE GEOCODING ---
+# Point-in-polygon over the ST_Subdivide'd boundaries (scripts/build_admin_subdivided.sql)
+# for a whole batch of points in one statement; results come back in input order.
+_REVERSE_SQL = """
+    SELECT q.idx, co.country_id, co.country_name, co.iso_code,
+           st.state_id, st.state_name, st.state_code{city_columns}
+    FROM unnest(%(lats)s::float8[], %(lons)s::float8[]) WITH ORDINALITY AS q(lat, lon, idx)
+    CROSS JOIN LATERAL (SELECT ST_SetSRID(ST_MakePoint(q.lon, q.lat), 4326) AS pt) p
+    LEFT JOIN LATERAL (
+        SELECT c.country_id, c.country_name, c.iso_code
+        FROM countries_subdivided s
+        JOIN countries c ON c.country_id = s.country_id
+        WHERE ST_Intersects(s.geom, p.pt)
+        LIMIT 1
+    ) co ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT st.state_id, st.state_name, st.state_code
+        FROM states_subdivided s
+        JOIN states st ON st.state_id = s.state_id
+        WHERE ST_Intersects(s.geom, p.pt)
+        LIMIT 1
+    ) st ON TRUE{city_join}
+    ORDER BY q.idx
+"""
+
+# Nearest city: planar KNN on idx_cities_geom, re-ranked by geodesic distance
+_REVERSE_CITY_JOIN = """
+    LEFT JOIN LATERAL (
+        SELECT near.city_id, near.city_name, near.population, near.lat, near.lon,
+               ST_Distance(near.geom::geography, p.pt::geography) / 1000 as dist_km
+        FROM (SELECT * FROM cities ORDER BY geom <-> p.pt LIMIT 8) near
+        ORDER BY dist_km
+        LIMIT 1
+    ) ci ON TRUE"""
+
+REVERSE_SQL = _REVERSE_SQL.format(
+    city_columns=",\n           ci.city_id, ci.city_name, ci.population, ci.lat as city_lat, ci.lon as city_lon, ci.dist_km",
+    city_join=_REVERSE_CITY_JOIN,
+)
+# Without the city lookup, for when the in-process city index answers it
+REVERSE_ADMIN_SQL = _REVERSE_SQL.format(city_columns="", city_join="")
+
+# --- PREPARED STATEMENTS (parsed & planned once per pooled connection) ---
+_STATEMENT_TYPES = {
+    "term": "text", "terms": "text[]", "context": "text", "knn_limit": "integer",
+    "lat": "float8", "lon": "float8", "radius_km": "float8", "k": "integer", "min_population": "bigint",
+    "city_id": "integer", "lats": "float8[]", "lons": "float8[]",
+}
+for _mode in _RESOLVER_MODES:
+    statements.register(f"resolve_{_mode}", resolver_sql(_mode), types=_STATEMENT_TYPES)
+    statements.register(f"resolve_many_{_mode}", resolver_many_sql(_mode), types=_STATEMENT_TYPES)
+for _mode in NEARBY_MODES:
+    statements.register(f"nearby_{_mode}", NEARBY_SQL[_mode], types=_STATEMENT_TYPES)
+statements.register("nearby_precomputed", NEIGHBOURS_SQL, types=_STATEMENT_TYPES)
+statements.register("reverse", REVERSE_SQL, types=_STATEMENT_TYPES)
+statements.register("reverse_admin", REVERSE_ADMIN_SQL, types=_STATEMENT_TYPES)
+
+
 class GeoService:
-    
+    # Resolver backend: "db" (trigram query over the source tables), "places"
+    # (unified places table, index-driven) or "memory" (in-process gazetteer)
+    BACKEND = os.getenv("GEO_RESOLVER_BACKEND", "db").lower()
+    gazetteer = None
+
+    # Nearby search: "geog" (needs scripts/migrate_city_geog.sql), "bbox" or "cast"
+    NEARBY_MODE = os.getenv("NEARBY_MODE", "geog").lower()
+    NEARBY_K = int(os.getenv("NEARBY_K", "10"))
+    # Answer NEARBY around a resolved city from city_neighbours when the radius fits
+    NEARBY_PRECOMPUTED = os.getenv("NEARBY_PRECOMPUTED", "true").lower() in ("1", "true", "yes")
+
+    # SPATIAL_BACKEND=memory: nearby search from an in-process KD-tree (app/services/spatial_index.py)
+    SPATIAL_BACKEND = os.getenv("SPATIAL_BACKEND", "db").lower()
+    city_index = None
+
+    @staticmethod
+    def load_gazetteer():
+        """
+        Builds the in-memory gazetteer from the database. Called once at startup
+        when GEO_RESOLVER_BACKEND=memory (or on demand for comparisons).
+        """
+        conn = get_db_connection()
+        try:
+            start = time.time()
+            GeoService.gazetteer = Gazetteer.from_db(conn)
+            print(f"[INFO] Gazetteer loaded: {len(GeoService.gazetteer)} places in {time.time() - start:.1f}s")
+        except Exception as e:
+            print(f"[ERROR] Gazetteer load failed, using DB resolver: {e}")
+            GeoService.gazetteer = None
+        finally:
+            release_db_connection(conn)
+        return GeoService.gazetteer
+
+    @staticmethod
+    def load_city_index():
+        """Builds the in-process nearby-search index over cities (SPATIAL_BACKEND=memory)."""
+        from app.services.spatial_index import SpatialIndex, CITY_POINTS_SQL
+        conn = get_db_connection()
+        try:
+            GeoService.city_index = SpatialIndex.from_query(
+                conn, CITY_POINTS_SQL, leaf_size=int(os.getenv("SPATIAL_LEAF_SIZE", "32"))
+            )
+            print(f"[INFO] City spatial index loaded: {len(GeoService.city_index)} cities "
+                  f"in {GeoService.city_index.build_seconds:.1f}s")
+        except Exception as e:
+            print(f"[ERROR] City spatial index load failed, using DB nearby search: {e}")
+            GeoService.city_index = None
+        finally:
+            release_db_connection(conn)
+        return GeoService.city_index
+
     @staticmethod
-    def get_location_metadata(search_query, context_country=None):
+    def _db_mode(backend):
+        # "memory" without a loaded gazetteer degrades to the plain DB query
+        return "places" if backend == "places" else "db"
+
+    @staticmethod
+    def get_location_metadata(search_query, context_country=None, backend=None):
         """
         Unified Resolver with Context Awareness.
+        `backend` overrides GEO_RESOLVER_BACKEND for a single call ("db" / "places" / "memory").
         """
         term = search_query.strip()
         
@@ -19,61 +335,20 @@ class GeoService:
         if "," in term:
             return None
 
+        backend = (backend or GeoService.BACKEND).lower()
+        if backend == "memory" and GeoService.gazetteer is not None:
+            result = GeoService.gazetteer.lookup(term, context_country)
+            return GeoService._apply_context_fallback(result, context_country)
+
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         
         try:
-            cursor.execute("SELECT set_limit(0.4);")
-
-            query = """
-                WITH all_matches AS (
-                    -- 1. COUNTRIES
-                    SELECT country_name as name, 'country' as type, population, geom,
-                           similarity(country_name, %s) as sim_score,
-                           country_name as parent_country
-                    FROM countries
-                    WHERE similarity(country_name, %s) > 0.4 OR iso_code ILIKE %s
-
-                    UNION ALL
-
-                    -- 2. STATES
-                    SELECT state_name as name, 'state' as type, 0 as population, geom,
-                           similarity(state_name, %s) as sim_score,
-                           (SELECT country_name FROM countries WHERE countries.iso_code = states.country_code LIMIT 1) as parent_country
-                    FROM states
-                    WHERE similarity(state_name, %s) > 0.4 OR state_code ILIKE %s
-
-                    UNION ALL
-
-                    -- 3. CITIES
-                    SELECT city_name as name, 'city' as type, population, geom,
-                           CASE WHEN %s ILIKE ANY(alt_names) THEN 1.0 ELSE similarity(city_name, %s) END as sim_score,
-                           (SELECT country_name FROM countries WHERE countries.iso_code = cities.country_code LIMIT 1) as parent_country
-                    FROM cities
-                    WHERE similarity(city_name, %s) > 0.4 OR %s ILIKE ANY(alt_names)
-                )
-                SELECT name as city_name, type, population, sim_score,
-                       ST_Y(ST_Centroid(geom)) as lat, ST_X(ST_Centroid(geom)) as lon,
-                       parent_country
-                FROM all_matches
-                ORDER BY (CASE WHEN parent_country ILIKE %s THEN 1 ELSE 0 END) DESC, sim_score DESC, population DESC
-                LIMIT 1;
-            """
-            
-            query_params = [term] * 10
-            context_val = context_country if context_country else "NON_EXISTENT_COUNTRY"
-            query_params.append(context_val)
-            
-            cursor.execute(query, tuple(query_params))
+            statement = f"resolve_{GeoService._db_mode(backend)}"
+            statements.execute(cursor, statement, resolver_params(context_country, term=term))
             result = cursor.fetchone()
-            
-            # Fallback Logic
-            if result and context_country:
-                if result['parent_country'] and context_country.lower() not in result['parent_country'].lower():
-                     if result['sim_score'] < 0.9:
-                         return None
 
-            return result
+            return GeoService._apply_context_fallback(result, context_country)
 
         except Exception as e:
             print(f"[ERROR] Geo Lookup failed: {e}")
@@ -83,27 +358,195 @@ class GeoService:
             release_db_connection(conn)
 
     @staticmethod
-    def find_nearby_cities(lat, lon, radius_km=50):
+    def resolve_many(terms, context_country=None, backend=None):
+        """
+        Batch version of get_location_metadata.
+        Resolves every term in ONE statement (unnest + LATERAL candidate search)
+        and returns {input term: result or None}.
+        """
+        results = {t: None for t in terms}
+        # Same rules as the single resolver: strip, and skip comma-qualified terms
+        lookup = {}
+        for t in terms:
+            term = t.strip()
+            if term and "," not in term:
+                lookup.setdefault(term, []).append(t)
+        if not lookup:
+            return results
+
+        backend = (backend or GeoService.BACKEND).lower()
+        if backend == "memory" and GeoService.gazetteer is not None:
+            for term, originals in lookup.items():
+                res = GeoService._apply_context_fallback(GeoService.gazetteer.lookup(term, context_country), context_country)
+                for t in originals:
+                    results[t] = res
+            return results
+
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+        try:
+            # The % operator's threshold is a session parameter set by the pool
+            statement = f"resolve_many_{GeoService._db_mode(backend)}"
+            statements.execute(cursor, statement, resolver_params(context_country, terms=list(lookup)))
+
+            for row in cursor.fetchall():
+                row = dict(row)
+                term = row.pop('term')
+                res = GeoService._apply_context_fallback(row, context_country)
+                for t in lookup.get(term, ()):
+                    results[t] = res
+            return results
+
+        except Exception as e:
+            print(f"[ERROR] Batch Geo Lookup failed: {e}")
+            return results
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    @staticmethod
+    def _apply_context_fallback(result, context_country):
+        """Drops weak matches that fall outside the requested context country."""
+        if result and context_country:
+            if result['parent_country'] and context_country.lower() not in result['parent_country'].lower():
+                 if result['sim_score'] < 0.9:
+                     return None
+        return result
+
+    @staticmethod
+    def reverse_geocode(lat, lon):
+        """Country, state and nearest city at (lat, lon); see reverse_geocode_many."""
+        results = GeoService.reverse_geocode_many([(lat, lon)])
+        return results[0] if results else None
+
+    @staticmethod
+    def reverse_geocode_many(points):
+        """
+        Reverse geocodes a list of (lat, lon) in one query. Returns one dict per
+        point, in input order: {"lat", "lon", "country", "state", "city"}, each
+        part None when nothing matches (e.g. a point at sea has no country).
+        Returns None when the query fails.
+        """
+        if not points:
+            return []
+        index = GeoService.city_index
+        params = {"lats": [float(lat) for lat, _ in points], "lons": [float(lon) for _, lon in points]}
+
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        try:
+            statements.execute(cursor, "reverse_admin" if index is not None else "reverse", params)
+            rows = cursor.fetchall()
+        except Exception as e:
+            print(f"[ERROR] Reverse geocoding failed: {e}")
+            return None
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+        # One vectorized k-NN pass for the whole chunk
+        nearest = index.knn_many(points, k=1) if index is not None else None
+
+        results = []
+        for i, ((lat, lon), row) in enumerate(zip(points, rows)):
+            if nearest is not None:
+                city = nearest[i][0] if nearest[i] else None
+            elif row["city_id"] is not None:
+                city = {
+                    "city_id": row["city_id"], "city_name": row["city_name"], "population": row["population"],
+                    "lat": row["city_lat"], "lon": row["city_lon"], "dist_km": row["dist_km"],
+                }
+            else:
+                city = None
+            results.append({
+                "lat": lat,
+                "lon": lon,
+                "country": {"id": row["country_id"], "name": row["country_name"], "iso_code": row["iso_code"]}
+                           if row["country_id"] is not None else None,
+                "state": {"id": row["state_id"], "name": row["state_name"], "code": row["state_code"]}
+                         if row["state_id"] is not None else None,
+                "city": city,
+            })
+        return results
+
+    @staticmethod
+    def _precomputed_neighbours(city_id, radius_km, k=None, min_population=0):
+        """
+        Nearby cities from city_neighbours, or None when the city has no row
+        or `radius_km` reaches past its stored neighbourhood.
+        """
+        min_population = min_population or 0
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        try:
+            statements.execute(cursor, "nearby_precomputed", {"city_id": city_id, "min_population": min_population})
+            rows = cursor.fetchall()
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.UndefinedColumn):
+            conn.rollback()
+            print("[WARNING] city_neighbours / cities.geonameid missing (run scripts/build_city_neighbours.py); "
+                  "using live nearby search")
+            GeoService.NEARBY_PRECOMPUTED = False
+            return None
+        except Exception as e:
+            print(f"[ERROR] Precomputed nearby lookup failed: {e}")
+            return None
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+        # reach_km is NULL when the row already lists every city of its tier
+        if not rows or (rows[0]["reach_km"] is not None and radius_km >= rows[0]["reach_km"]):
+            return None
+        results = [
+            {key: row[key] for key in ("city_id", "city_name", "population", "lat", "lon", "dist_km")}
+            for row in rows
+            if row["city_id"] is not None and row["dist_km"] <= radius_km
+            and (row["population"] or 0) >= min_population
+        ]
+        return results[:k or GeoService.NEARBY_K]
+
+    @staticmethod
+    def find_nearby_cities(lat, lon, radius_km=50, k=None, min_population=0, mode=None, city_id=None):
+        """
+        Up to `k` cities within `radius_km` of (lat, lon) with at least
+        `min_population` inhabitants, nearest first.
+        `mode` overrides NEARBY_MODE for a single call ("geog" / "bbox" / "cast").
+        `city_id` (the city at lat/lon) enables the precomputed neighbourhood lookup.
+        """
+        if mode is None and GeoService.city_index is not None:
+            return GeoService.city_index.radius(
+                lat, lon, radius_km, k=k or GeoService.NEARBY_K, min_population=min_population or 0
+            )
+        if mode is None and city_id is not None and GeoService.NEARBY_PRECOMPUTED:
+            neighbours = GeoService._precomputed_neighbours(city_id, radius_km, k, min_population)
+            if neighbours is not None:
+                return neighbours
+
+        mode = (mode or GeoService.NEARBY_MODE).lower()
+        if mode not in NEARBY_MODES:
+            mode = "geog"
+        params = {
+            "lat": lat, "lon": lon, "radius_km": radius_km,
+            "k": k or GeoService.NEARBY_K, "min_population": min_population or 0,
+        }
+
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         try:
-            query = """
-                SELECT city_name, population, lat, lon,
-                       ST_Distance(
-                           geom::geography, 
-                           ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography
-                       ) / 1000 as dist_km
-                FROM cities
-                WHERE ST_DWithin(
-                    geom::geography, 
-                    ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, 
-                    %s * 1000
-                )
-                ORDER BY dist_km ASC
-                LIMIT 10;
-            """
-            cursor.execute(query, (lon, lat, lon, lat, radius_km))
+            statements.execute(cursor, f"nearby_{mode}", params)
             return cursor.fetchall()
+        except psycopg2.errors.UndefinedColumn:
+            # cities.geog not migrated yet: keep serving through the bbox prefilter
+            conn.rollback()
+            print("[WARNING] cities.geog missing (run scripts/migrate_city_geog.sql); NEARBY_MODE falls back to bbox")
+            GeoService.NEARBY_MODE = "bbox"
+            try:
+                statements.execute(cursor, "nearby_bbox", params)
+                return cursor.fetchall()
+            except Exception as e:
+                print(f"[ERROR] Spatial Query failed: {e}")
+                return []
         except Exception as e:
             print(f"[ERROR] Spatial Query failed: {e}")
             return []
@@ -0,0 +1,154 @@
+import re
+
+from app.services.gazetteer import COUNTRY, STATE, CITY, KIND_NAMES
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Words that are also place names somewhere ("Of", "Weather", "Best"...) but are
+# far more likely to be part of the question. Only single-token matches are
+# filtered, together with one- and two-letter names.
+STOPWORDS = frozenset("""
+    a about all and any are as at be best between by can city close compare
+    country day days distance do does drive east far fly for from get go good
+    how i in is it its journey last me month my near nearby new north now of on
+    or past place rain rainfall route show south state tell temperature the there
+    this to today tomorrow travel trip via was weather week west what when where
+    which who why will with you climate forecast precipitation around
+    hot cold warm sunny
+""".split())
+
+# Real places that are also everyday words ("nice weather", "reading list"):
+# matched on their own only when capitalized mid-sentence ("is Nice sunny")
+# or right after a word that introduces a place ("weather in nice").
+AMBIGUOUS = frozenset("nice reading mobile split bath".split())
+PLACE_MARKERS = frozenset("in at near from to via".split())
+
+_END = None  # trie key holding the entry for a complete name
+
+
+class LocationExtractor:
+    """
+    Token trie over every country, state, city and alias name.
+
+    `extract` scans a query once, left to right, taking the longest gazetteer
+    name that starts at each token and skipping past it, so matches never
+    overlap. Case-insensitive, so "weather in hosur" works as well as "Hosur".
+    """
+
+    def __init__(self):
+        self._root = {}
+        self.size = 0
+
+    @staticmethod
+    def tokenize(text):
+        return [(m.group().lower(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+    def add(self, name, kind, source_id, canonical_name, population=0):
+        tokens = [t for t, _, _ in self.tokenize(name)]
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+
+        # Homonyms keep one entry: countries first, then the most populous place
+        entry = (kind, source_id, canonical_name, population)
+        current = node.get(_END)
+        if current is None:
+            self.size += 1
+        if current is None or self._rank(entry) > self._rank(current):
+            node[_END] = entry
+
+    @staticmethod
+    def _rank(entry):
+        kind, _, _, population = entry
+        return (kind == COUNTRY, population)
+
+    @classmethod
+    def from_gazetteer(cls, gaz):
+        extractor = cls()
+        for idx, name in enumerate(gaz.names):
+            extractor.add(name, gaz.kinds[idx], gaz.ids[idx], name, gaz.populations[idx])
+        for alias, indices in gaz._aliases.items():
+            for idx in indices:
+                extractor.add(alias, gaz.kinds[idx], gaz.ids[idx], gaz.names[idx], gaz.populations[idx])
+        return extractor
+
+    @classmethod
+    def from_db(cls, conn):
+        """
+        Streams only names and aliases into the trie; none of the Gazetteer's
+        coordinates or trigram index are built for it.
+        """
+        extractor = cls()
+        queries = (
+            ("extractor_countries", COUNTRY, """
+                SELECT country_id, country_name, country_name, population FROM countries
+                WHERE country_name IS NOT NULL
+            """),
+            ("extractor_states", STATE, """
+                SELECT state_id, state_name, state_name, 0 FROM states
+                WHERE state_name IS NOT NULL
+            """),
+            ("extractor_cities", CITY, """
+                SELECT city_id, city_name, city_name, population FROM cities
+                WHERE city_name IS NOT NULL
+            """),
+            ("extractor_aliases", CITY, """
+                SELECT c.city_id, a.alias, c.city_name, c.population
+                FROM city_aliases a
+                JOIN cities c ON c.city_id = a.city_id
+                WHERE c.city_name IS NOT NULL
+            """),
+        )
+        for cursor_name, kind, sql in queries:
+            with conn.cursor(name=cursor_name) as cursor:
+                cursor.itersize = 20000
+                cursor.execute(sql)
+                for source_id, name, canonical_name, population in cursor:
+                    extractor.add(name, kind, source_id, canonical_name, population or 0)
+        conn.rollback()  # Named cursors leave a transaction open
+        return extractor
+
+    def extract(self, text):
+        """
+        Returns the longest non-overlapping matches in query order:
+        [{"text", "name", "type", "id", "start", "end"}], where "text" is the
+        span as typed and "name" the canonical place name.
+        """
+        tokens = self.tokenize(text)
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            best = None
+            j = i
+            while j < len(tokens):
+                node = node.get(tokens[j][0])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    best = (j, node[_END])
+
+            single = best is not None and best[0] == i + 1
+            if best is None or (single and (tokens[i][0] in STOPWORDS or len(tokens[i][0]) < 3)):
+                i += 1
+                continue
+            if single and tokens[i][0] in AMBIGUOUS and not (
+                    i > 0 and (text[tokens[i][1]].isupper() or tokens[i - 1][0] in PLACE_MARKERS)):
+                i += 1
+                continue
+
+            end, (kind, source_id, canonical_name, _) = best
+            start_char, end_char = tokens[i][1], tokens[end - 1][2]
+            matches.append({
+                "text": text[start_char:end_char],
+                "name": canonical_name,
+                "type": KIND_NAMES[kind],
+                "id": source_id,
+                "start": start_char,
+                "end": end_char,
+            })
+            i = end
+        return matches
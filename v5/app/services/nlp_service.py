@@ -6,26 +6,121 @@ if __name__ == "__main__":
 import os
 import json
 import re
-import spacy
+import hashlib
+import threading
+import time
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
+from app.services.analysis_store import AnalysisStore
+from app.services.location_extractor import LocationExtractor, STOPWORDS
 
 load_dotenv()
 
+LLM_MODEL = "gemini-2.0-flash"
+
+# spaCy is only the offline fallback: it is imported and loaded on first use
+# (or in a background thread when SPACY_PRELOAD is set), never at import time.
+# SPACY_MODEL lists the models to try in order; SPACY_DISABLE names pipeline
+# components that are not loaded at all (only NER is needed for GPEs).
+SPACY_MODELS = [m.strip() for m in os.getenv("SPACY_MODEL", "en_core_web_trf,en_core_web_sm").split(",") if m.strip()]
+SPACY_DISABLE = [c.strip() for c in os.getenv(
+    "SPACY_DISABLE", "parser,tagger,attribute_ruler,lemmatizer,morphologizer,senter"
+).split(",") if c.strip()]
+
+# --- MASTER PROMPT ---
+# Extraction only: summaries are generated later by SUMMARY_PROMPT, after the
+# geo results have been returned
+MASTER_PROMPT = """
+    You are a Geospatial Assistant.
+    User Input: "{text}"
+    
+    Tasks:
+    1. Identify INTENT: "WEATHER", "ROUTE", "NEARBY", or "INFO" (General query).
+    
+    2. Extract Locations & Perform Autocorrect:
+       - Fix typos: "Banglore" -> "Bengaluru"
+       - Resolve Aliases: "Bombay" -> "Mumbai"
+    
+    3. CONTEXT FUSION (Critical):
+       - If a city is followed by a Region/State/Country, MERGE them into one string with a comma.
+       - Apply context ONLY to the specific city it belongs to.
+       - Example: "Paris in Texas" -> ["Paris, Texas"]
+       - Example: "Bangalore and Madurai and Paris in Texas" -> ["Bengaluru", "Madurai", "Paris, Texas"]
+    
+    4. ROUTE ORDERING:
+       - Preserve sequence: "From A to B via C" -> ["A", "C", "B"]
+    
+    Output JSON:
+    {{
+      "intent": "string",
+      "locations": ["Loc1", "Loc2"],
+      "params": {{ "radius_km": 50 }}
+    }}
+    
+    Return ONLY valid JSON.
+"""
+
+# --- SUMMARY PROMPT ---
+SUMMARY_PROMPT = """
+    You are a Geospatial Assistant.
+    User Input: "{text}"
+    
+    Resolved Locations:
+{places}
+    
+    For EACH location listed above:
+       - Provide a "summary" (3-4 sentences covering key facts like capital, population, and significance).
+       - If the user asked a specific question (e.g. "Who founded X?"), put the answer in the "answer" field for that location.
+    
+    Output JSON (keys are the location names exactly as listed):
+    {{
+      "Loc1": {{ "summary": "Fact about Loc1", "answer": "Specific answer if relevant" }},
+      "Loc2": {{ "summary": "Fact about Loc2", "answer": "" }}
+    }}
+    
+    Return ONLY valid JSON.
+"""
+
+# --- RULE-FIRST ROUTING ---
+# "tiered": local rules first, the LLM only for low-confidence extractions
+# (answers to free-form questions come from the summary stage);
+# "llm": always ask the LLM (when configured); "local": never ask it
+NLP_ROUTING = os.getenv("NLP_ROUTING", "tiered").lower()
+NLP_LOCAL_CONFIDENCE = float(os.getenv("NLP_LOCAL_CONFIDENCE", "0.8"))
+
+INTENT_KEYWORDS = (
+    ("WEATHER", ("weather", "temperature", "climate", "forecast")),
+    ("ROUTE", ("route", "drive", "fly", "from", "to", "travel", "journey")),
+    ("NEARBY", ("nearby", "near", "around", "close to")),
+)
+# Words that carry no location and never lower the local confidence
+_FILLER_WORDS = STOPWORDS | {w for _, keywords in INTENT_KEYWORDS for k in keywords for w in k.split()} | {
+    "km", "kms", "kilometers", "kilometres", "miles", "radius", "within", "please", "cities", "towns"
+}
+_RADIUS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:km|kms|kilomet)", re.IGNORECASE)
+# Route roles by the keyword preceding a place: origin, stop, destination
+_ROUTE_ROLES = {"from": 0, "via": 1, "through": 1, "to": 2}
+
+# Cached analyses are only valid for the prompt + model that produced them
+PROMPT_VERSION = hashlib.sha256((LLM_MODEL + MASTER_PROMPT).encode("utf-8")).hexdigest()[:12]
+SUMMARY_PROMPT_VERSION = hashlib.sha256((LLM_MODEL + SUMMARY_PROMPT).encode("utf-8")).hexdigest()[:12]
+
 class NLPService:
     client = None
     HAS_LLM = False
     
-    # Load Spacy (Backup only)
-    try:
-        nlp = spacy.load("en_core_web_trf")
-    except:
-        try:
-            nlp = spacy.load("en_core_web_sm")
-        except:
-            print("[WARNING] Spacy not found.")
-            nlp = None
+    # Spacy (Backup only, loaded lazily by get_nlp)
+    nlp = None
+    _nlp_loaded = False
+    _nlp_lock = threading.Lock()
+
+    # Gazetteer token trie for the fallback (built by load_extractor at startup)
+    extractor = None
+
+    # Which tier answered each analyze_query call
+    _tier_counts = {"local": 0, "cache": 0, "llm": 0, "fallback": 0}
+    _tier_lock = threading.Lock()
 
     # Connect to Gemini
     try:
@@ -36,97 +131,346 @@ class NLPService:
     except Exception as e:
         print(f"[ERROR] Gemini Init Failed: {e}")
 
+    # Persistent LLM analysis + summary caches (survive restarts). Opened and
+    # warm-loaded by load_stores() from create_app, not at import.
+    store = None
+    summary_store = None
+
     @staticmethod
-    def analyze_query(text):
+    def load_stores():
+        """Opens the analysis and summary stores; both live in one file, told apart by their prompt versions."""
+        if NLPService.store is not None:
+            return NLPService.store
+        try:
+            cache_path = os.getenv("NLP_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "instance", "nlp_cache.sqlite3"))
+            store = AnalysisStore(
+                cache_path,
+                PROMPT_VERSION,
+                max_entries=int(os.getenv("NLP_CACHE_MAX_ENTRIES", "50000")),
+                warm_entries=int(os.getenv("NLP_CACHE_WARM_ENTRIES", "2000"))
+            )
+            summary_store = AnalysisStore(
+                cache_path,
+                SUMMARY_PROMPT_VERSION,
+                max_entries=int(os.getenv("NLP_CACHE_MAX_ENTRIES", "50000")),
+                warm_entries=int(os.getenv("NLP_CACHE_WARM_ENTRIES", "2000"))
+            )
+            print(f"[INFO] NLP cache warm-loaded {store.warm_load()} analyses, {summary_store.warm_load()} summaries.")
+            NLPService.store, NLPService.summary_store = store, summary_store
+        except Exception as e:
+            print(f"[WARNING] NLP cache disabled: {e}")
+        return NLPService.store
+
+    @staticmethod
+    def get_nlp():
+        """Returns the spaCy pipeline, loading it on first call (None if unavailable)."""
+        if not NLPService._nlp_loaded:
+            with NLPService._nlp_lock:
+                if not NLPService._nlp_loaded:
+                    NLPService.nlp = NLPService._load_spacy()
+                    NLPService._nlp_loaded = True
+        return NLPService.nlp
+
+    @staticmethod
+    def _load_spacy():
+        try:
+            import spacy
+        except ImportError:
+            print("[WARNING] Spacy not found.")
+            return None
+
+        for name in SPACY_MODELS:
+            try:
+                start = time.perf_counter()
+                nlp = spacy.load(name, exclude=SPACY_DISABLE)
+                print(f"[INFO] Spacy model '{name}' loaded in {time.perf_counter() - start:.1f}s (pipes: {nlp.pipe_names}).")
+                return nlp
+            except Exception as e:
+                print(f"[WARNING] Spacy model '{name}' unavailable: {e}")
+        print("[WARNING] Spacy not found.")
+        return None
+
+    @staticmethod
+    def preload_spacy():
+        """Loads the fallback model in a daemon thread so startup does not wait for it."""
+        threading.Thread(target=NLPService.get_nlp, name="spacy-preload", daemon=True).start()
+
+    @staticmethod
+    def load_extractor(gazetteer=None):
         """
-        Uses LLM to:
-        1. Identify Intent (WEATHER, ROUTE, INFO)
-        2. Extract & Autocorrect Locations
-        3. Handle Context & Mixed Lists
-        4. Generate Answer & Summary PER LOCATION
+        Builds the location extractor in a daemon thread, from an already loaded
+        Gazetteer when given, otherwise from the database. Until it is ready the
+        fallback uses spaCy / regex only.
         """
-        result = {
-            "intent": "INFO", 
-            "locations": [], 
-            "location_details": {}, # Stores info for each place: { "PlaceName": { "summary": "...", "answer": "..." } }
-            "params": {}
+        def build():
+            try:
+                start = time.perf_counter()
+                if gazetteer is not None:
+                    extractor = LocationExtractor.from_gazetteer(gazetteer)
+                else:
+                    from app import get_db_connection, release_db_connection
+                    conn = get_db_connection()
+                    try:
+                        extractor = LocationExtractor.from_db(conn)
+                    finally:
+                        release_db_connection(conn)
+                NLPService.extractor = extractor
+                print(f"[INFO] Location extractor ready: {extractor.size} names in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                print(f"[ERROR] Location extractor build failed: {e}")
+
+        threading.Thread(target=build, name="location-extractor", daemon=True).start()
+
+    @staticmethod
+    def _count(tier):
+        with NLPService._tier_lock:
+            NLPService._tier_counts[tier] += 1
+
+    @staticmethod
+    def stats():
+        with NLPService._tier_lock:
+            counts = dict(NLPService._tier_counts)
+        total = sum(counts.values())
+        return {
+            "routing": NLP_ROUTING,
+            "local_confidence": NLP_LOCAL_CONFIDENCE,
+            "has_llm": NLPService.HAS_LLM,
+            "extractor_ready": NLPService.extractor is not None,
+            "total": total,
+            "tiers": counts,
+            "rates": {tier: round(n / total, 4) if total else 0.0 for tier, n in counts.items()},
         }
 
-        if NLPService.HAS_LLM:
+    @staticmethod
+    def analyze_query(text):
+        """
+        Tiered analysis:
+        1. Local rules (keyword intent + gazetteer extraction) with a confidence score
+        2. Persistent analysis cache
+        3. LLM: Intent, autocorrected locations, context fusion, route ordering
+        The LLM is only asked when the local result is not confident enough
+        (see NLP_ROUTING). Summaries and answers come from summarize_locations.
+        """
+        if NLP_ROUTING != "llm" or not NLPService.HAS_LLM:
+            local, confidence = NLPService._rule_stage(text)
+            if confidence >= NLP_LOCAL_CONFIDENCE:
+                NLPService._count("local")
+                return local
+
+        if not NLPService.HAS_LLM or NLP_ROUTING == "local":
+            NLPService._count("fallback")
+            return NLPService._local_fallback(text)
+
+        # Repeated / near-identical queries skip the LLM call entirely
+        if NLPService.store:
             try:
-                # --- MASTER PROMPT ---
-                prompt = f"""
-                You are a Geospatial Assistant.
-                User Input: "{text}"
-                
-                Tasks:
-                1. Identify INTENT: "WEATHER", "ROUTE", "NEARBY", or "INFO" (General query).
-                
-                2. Extract Locations & Perform Autocorrect:
-                   - Fix typos: "Banglore" -> "Bengaluru"
-                   - Resolve Aliases: "Bombay" -> "Mumbai"
-                
-                3. CONTEXT FUSION (Critical):
-                   - If a city is followed by a Region/State/Country, MERGE them into one string with a comma.
-                   - Apply context ONLY to the specific city it belongs to.
-                   - Example: "Paris in Texas" -> ["Paris, Texas"]
-                   - Example: "Bangalore and Madurai and Paris in Texas" -> ["Bengaluru", "Madurai", "Paris, Texas"]
-                
-                4. ROUTE ORDERING:
-                   - Preserve sequence: "From A to B via C" -> ["A", "C", "B"]
-                
-                5. GENERATE CONTENT (Per Location):
-                   - For EACH location found, provide a "summary" (3-4 sentences covering key facts like capital, population, and significance).
-                   - If the user asked a specific question (e.g. "Who founded X?"), put the answer in the "answer" field for that location.
-                
-                Output JSON:
-                {{
-                  "intent": "string",
-                  "locations": ["Loc1", "Loc2"],
-                  "location_details": {{
-                      "Loc1": {{ "summary": "Fact about Loc1", "answer": "Specific answer if relevant" }},
-                      "Loc2": {{ "summary": "Fact about Loc2", "answer": "" }}
-                  }},
-                  "params": {{ "radius_km": 50 }}
-                }}
-                
-                Return ONLY valid JSON.
-                """
-                
-                response = NLPService.client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.3, 
-                        response_mime_type="application/json"
-                    )
-                )
-                
-                if response.text:
-                    result = json.loads(response.text)
-                    return result
+                cached = NLPService.store.get(text)
+                if cached is not None:
+                    NLPService._count("cache")
+                    return cached
             except Exception as e:
-                # Check if it's a rate limit error (429 or ResourceExhausted)
-                error_str = str(e).lower()
-                if "429" in error_str or "resource" in error_str or "quota" in error_str or "rate" in error_str:
-                    print(f"[WARNING] LLM Quota Exceeded, switching to fallback mode")
-                else:
-                    print(f"[ERROR] LLM Failed: {e}")
-                
-                # Trigger fallback
-                return NLPService._local_fallback(text)
+                print(f"[WARNING] NLP cache read failed: {e}")
 
-        # If LLM is not available, use fallback
-        if not NLPService.HAS_LLM:
-            return NLPService._local_fallback(text)
+        try:
+            # --- MASTER PROMPT ---
+            prompt = MASTER_PROMPT.format(text=text)
             
-        return result
+            response = NLPService.client.models.generate_content(
+                model=LLM_MODEL,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=0.3, 
+                    response_mime_type="application/json"
+                )
+            )
+            
+            if response.text:
+                result = json.loads(response.text)
+                if NLPService.store:
+                    try:
+                        NLPService.store.put(text, result)
+                    except Exception as e:
+                        print(f"[WARNING] NLP cache write failed: {e}")
+                NLPService._count("llm")
+                return result
+            print("[WARNING] LLM returned an empty response, switching to fallback mode")
+        except Exception as e:
+            # Check if it's a rate limit error (429 or ResourceExhausted)
+            error_str = str(e).lower()
+            if "429" in error_str or "resource" in error_str or "quota" in error_str or "rate" in error_str:
+                print(f"[WARNING] LLM Quota Exceeded, switching to fallback mode")
+            else:
+                print(f"[ERROR] LLM Failed: {e}")
+        
+        # Trigger fallback
+        NLPService._count("fallback")
+        return NLPService._local_fallback(text)
+
+    # --- SUMMARY STAGE ---
+
+    @staticmethod
+    def summarize_locations(text, places):
+        """
+        Generates a summary (and an answer, for questions) per resolved place.
+        `places` are dicts with "city_name", "type" and "parent_country".
+        Returns {city_name: {"summary", "answer"}}, or None when the LLM fails.
+        """
+        names = [p["city_name"] for p in places]
+        if not names or not NLPService.HAS_LLM:
+            return {}
+
+        store_key = f"{text} | {' ; '.join(names)}"
+        if NLPService.summary_store:
+            try:
+                cached = NLPService.summary_store.get(store_key)
+                if cached is not None:
+                    return cached
+            except Exception as e:
+                print(f"[WARNING] Summary cache read failed: {e}")
+
+        lines = []
+        for p in places:
+            context = ", ".join(str(v) for v in (p.get("type"), p.get("parent_country")) if v)
+            lines.append(f"    - {p['city_name']}" + (f" ({context})" if context else ""))
+
+        try:
+            response = NLPService.client.models.generate_content(
+                model=LLM_MODEL,
+                contents=SUMMARY_PROMPT.format(text=text, places="\n".join(lines)),
+                config=types.GenerateContentConfig(
+                    temperature=0.3,
+                    response_mime_type="application/json"
+                )
+            )
+            details = json.loads(response.text) if response.text else {}
+        except Exception as e:
+            print(f"[ERROR] Summary generation failed: {e}")
+            return None
+
+        summaries = {}
+        for name in names:
+            entry = details.get(name) or {}
+            summaries[name] = {"summary": entry.get("summary", ""), "answer": entry.get("answer", "")}
+
+        if NLPService.summary_store:
+            try:
+                NLPService.summary_store.put(store_key, summaries)
+            except Exception as e:
+                print(f"[WARNING] Summary cache write failed: {e}")
+        return summaries
+
+    # --- LOCAL RULES ---
+
+    @staticmethod
+    def _detect_intent(text):
+        """Keyword intent on whole words ("Toronto" is not a ROUTE because of "to")."""
+        padded = " " + " ".join(t for t, _, _ in LocationExtractor.tokenize(text)) + " "
+        for intent, keywords in INTENT_KEYWORDS:
+            if any(f" {keyword} " in padded for keyword in keywords):
+                return intent
+        return "INFO"
+
+    @staticmethod
+    def _rule_stage(text):
+        """
+        Keyword intent + gazetteer extraction. Returns (result, confidence), where
+        confidence is the share of content words covered by place names: an
+        unmatched word is likely a misspelt or unknown place the LLM should fix.
+        """
+        result = {
+            "intent": NLPService._detect_intent(text),
+            "locations": [],
+            "location_details": {},
+            "params": {}
+        }
+        if result["intent"] == "NEARBY":
+            radius = _RADIUS_RE.search(text)
+            result["params"]["radius_km"] = float(radius.group(1)) if radius else 50
+
+        if NLPService.extractor is None:
+            return result, 0.0
+        matches = NLPService.extractor.extract(text)
+        if not matches:
+            return result, 0.0
+
+        covered = set()
+        for m in matches:
+            covered.update(range(m["start"], m["end"]))
+        content = [(t, start) for t, start, _ in LocationExtractor.tokenize(text)
+                   if t not in _FILLER_WORDS and not t.replace(".", "").isdigit()]
+        unmatched = sum(1 for _, start in content if start not in covered)
+        confidence = 1.0 - unmatched / len(content) if content else 1.0
+        if result["intent"] == "ROUTE" and len(matches) < 2:
+            confidence *= 0.5
+
+        locations = NLPService._fuse_context(text, matches)
+        if result["intent"] == "ROUTE":
+            locations = NLPService._order_route(text, locations)
+
+        seen = set()
+        for name, _ in locations:
+            if name not in seen:
+                seen.add(name)
+                result["locations"].append(name)
+                result["location_details"][name] = {"summary": "", "answer": ""}
+        return result, confidence
+
+    @staticmethod
+    def _fuse_context(text, matches):
+        """
+        "Paris in Texas" / "Paris, Texas" -> "Paris, Texas" (same format as the LLM).
+        Returns [(location string, start offset)].
+        """
+        locations = []
+        i = 0
+        while i < len(matches):
+            m = matches[i]
+            nxt = matches[i + 1] if i + 1 < len(matches) else None
+            if (nxt and m["type"] == "city" and nxt["type"] in ("state", "country")
+                    and text[m["end"]:nxt["start"]].strip().lower() in ("", ",", "in")):
+                locations.append((f"{m['name']}, {nxt['name']}", m["start"]))
+                i += 2
+                continue
+            locations.append((m["name"], m["start"]))
+            i += 1
+        return locations
+
+    @staticmethod
+    def _order_route(text, locations):
+        """
+        Orders places as origin, stops, destination using from / via / to.
+        Places after no keyword fill the role the others leave open:
+        "How far is Delhi from Mumbai" -> Mumbai, Delhi.
+        """
+        tokens = LocationExtractor.tokenize(text)
+
+        def role(start):
+            keyword = None
+            for t, token_start, _ in tokens:
+                if token_start >= start:
+                    break
+                if t in _ROUTE_ROLES:
+                    keyword = t
+            return _ROUTE_ROLES.get(keyword)
+
+        roles = [role(start) for _, start in locations]
+        has_origin = _ROUTE_ROLES["from"] in roles
+        has_destination = _ROUTE_ROLES["to"] in roles
+        if has_origin and has_destination:
+            unmarked = _ROUTE_ROLES["via"]
+        elif has_origin:
+            unmarked = _ROUTE_ROLES["to"]
+        else:
+            unmarked = _ROUTE_ROLES["from"]
+        order = sorted(range(len(locations)), key=lambda i: unmarked if roles[i] is None else roles[i])
+        return [locations[i] for i in order]
 
     @staticmethod
     def _local_fallback(text):
         """
         Local rule-based extraction when LLM is unavailable.
-        Uses keyword matching for intent and regex/spacy for locations.
+        Uses keyword matching for intent; locations come from the gazetteer
+        extractor when it is loaded, otherwise from spacy / regex.
         """
         result = {
             "intent": "INFO",
@@ -138,26 +482,30 @@ class NLPService:
         text_lower = text.lower()
         
         # --- INTENT DETECTION ---
-        if any(keyword in text_lower for keyword in ["weather", "temperature", "climate", "forecast"]):
-            result["intent"] = "WEATHER"
-        elif any(keyword in text_lower for keyword in ["route", "drive", "fly", "from", "to", "travel", "journey"]):
-            result["intent"] = "ROUTE"
-        elif any(keyword in text_lower for keyword in ["nearby", "near", "around", "close to"]):
-            result["intent"] = "NEARBY"
+        result["intent"] = NLPService._detect_intent(text)
+        if result["intent"] == "NEARBY":
             result["params"]["radius_km"] = 50
         
         # --- LOCATION EXTRACTION ---
         locations = []
         
-        # Method 1: Use Spacy if available
-        if NLPService.nlp:
+        # Method 1: Gazetteer matches (case-insensitive, no model needed)
+        if NLPService.extractor:
+            try:
+                locations = [m["name"] for m in NLPService.extractor.extract(text)]
+            except Exception as e:
+                print(f"[WARNING] Location extractor failed: {e}")
+
+        # Method 2: Use Spacy if available
+        nlp = NLPService.get_nlp() if not locations else None
+        if nlp:
             try:
-                doc = NLPService.nlp(text)
+                doc = nlp(text)
                 locations = [ent.text for ent in doc.ents if ent.label_ == "GPE"]
             except Exception as e:
                 print(f"[WARNING] Spacy extraction failed: {e}")
         
-        # Method 2: Regex fallback (extract capitalized words)
+        # Method 3: Regex fallback (extract capitalized words)
         if not locations:
             # Pattern: Capitalized words (possibly multi-word like "New York")
             pattern = r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b'
@@ -175,9 +523,9 @@ class NLPService:
             parts = text.split(" and ")
             locations = []
             for part in parts:
-                if NLPService.nlp:
+                if nlp:
                     try:
-                        doc = NLPService.nlp(part)
+                        doc = nlp(part)
                         locs = [ent.text for ent in doc.ents if ent.label_ == "GPE"]
                         locations.extend(locs)
                     except:
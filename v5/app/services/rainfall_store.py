@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import threading
+
+
+class RainfallStore:
+    """
+    Local daily precipitation series, keyed by (lat/lon grid cell, date).
+
+    Only finished days are stored: past days never change, so once a cell has
+    them they are answered locally and upstream requests shrink to the days
+    still missing plus the forecast.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.days_served = 0
+        self.days_fetched = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rainfall_daily (
+                cell_lat INTEGER NOT NULL,
+                cell_lon INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                precipitation_mm REAL NOT NULL,
+                PRIMARY KEY (cell_lat, cell_lon, day)
+            ) WITHOUT ROWID
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def days(self, cell, start, end):
+        """Returns {ISO date: mm} for the stored days of `cell` in [start, end]."""
+        rows = self._conn().execute(
+            "SELECT day, precipitation_mm FROM rainfall_daily "
+            "WHERE cell_lat = ? AND cell_lon = ? AND day BETWEEN ? AND ?",
+            (cell[0], cell[1], start.isoformat(), end.isoformat())
+        ).fetchall()
+        with self._lock:
+            self.days_served += len(rows)
+        return dict(rows)
+
+    def put(self, cell, days):
+        """Stores an iterable of (ISO date, mm); days without a value are skipped."""
+        rows = [(cell[0], cell[1], day, mm) for day, mm in days if mm is not None]
+        if not rows:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO rainfall_daily (cell_lat, cell_lon, day, precipitation_mm) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        with self._lock:
+            self.days_fetched += len(rows)
+
+    def stats(self):
+        conn = self._conn()
+        count, cells = conn.execute(
+            "SELECT count(*), count(DISTINCT cell_lat || ',' || cell_lon) FROM rainfall_daily"
+        ).fetchone()
+        with self._lock:
+            return {
+                "path": self.path,
+                "days": count,
+                "cells": cells,
+                "days_served": self.days_served,
+                "days_fetched": self.days_fetched,
+            }
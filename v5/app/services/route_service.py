@@ -1,9 +1,51 @@
 import math
+import os
 from app import get_db_connection, release_db_connection
+from app.db_statements import statements
 import psycopg2.extras
 
+NEAREST_AIRPORT_SQL = """
+    SELECT iata_code, name, city_name, 
+           ST_Y(geom::geometry) as lat, 
+           ST_X(geom::geometry) as lon,
+           ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)::geography) / 1000.0 as dist_km
+    FROM airports
+    WHERE iata_code IS NOT NULL
+    ORDER BY geom <-> ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)
+    LIMIT 1
+"""
+
+FLIGHT_SQL = """
+    SELECT airline_code 
+    FROM flight_routes 
+    WHERE source_iata = %(origin)s AND dest_iata = %(dest)s
+    LIMIT 1
+"""
+
+statements.register("nearest_airport", NEAREST_AIRPORT_SQL, types={"lat": "float8", "lon": "float8"})
+statements.register("find_flight", FLIGHT_SQL, types={"origin": "text", "dest": "text"})
+
 class RouteService:
-    
+    # SPATIAL_BACKEND=memory: nearest airports from an in-process KD-tree
+    airport_index = None
+
+    @staticmethod
+    def load_airport_index():
+        """Builds the in-process nearest-airport index (SPATIAL_BACKEND=memory)."""
+        from app.services.spatial_index import SpatialIndex, AIRPORT_POINTS_SQL
+        conn = get_db_connection()
+        try:
+            RouteService.airport_index = SpatialIndex.from_query(
+                conn, AIRPORT_POINTS_SQL, leaf_size=int(os.getenv("SPATIAL_LEAF_SIZE", "32"))
+            )
+            print(f"[INFO] Airport spatial index loaded: {len(RouteService.airport_index)} airports")
+        except Exception as e:
+            print(f"[ERROR] Airport spatial index load failed, using DB lookup: {e}")
+            RouteService.airport_index = None
+        finally:
+            release_db_connection(conn)
+        return RouteService.airport_index
+
     @staticmethod
     def get_multimodal_route(start_lat, start_lon, end_lat, end_lon):
         """
@@ -92,26 +134,13 @@ class RouteService:
 
     @staticmethod
     def _find_nearest_airport(cursor, lat, lon):
-        query = """
-            SELECT iata_code, name, city_name, 
-                   ST_Y(geom::geometry) as lat, 
-                   ST_X(geom::geometry) as lon,
-                   ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography) / 1000.0 as dist_km
-            FROM airports
-            WHERE iata_code IS NOT NULL
-            ORDER BY geom <-> ST_SetSRID(ST_MakePoint(%s, %s), 4326)
-            LIMIT 1;
-        """
-        cursor.execute(query, (lon, lat, lon, lat))
+        if RouteService.airport_index is not None:
+            nearest = RouteService.airport_index.knn(lat, lon, k=1)
+            return nearest[0] if nearest else None
+        statements.execute(cursor, "nearest_airport", {"lat": lat, "lon": lon})
         return cursor.fetchone()
 
     @staticmethod
     def _find_flight(cursor, origin_iata, dest_iata):
-        query = """
-            SELECT airline_code 
-            FROM flight_routes 
-            WHERE source_iata = %s AND dest_iata = %s
-            LIMIT 1;
-        """
-        cursor.execute(query, (origin_iata, dest_iata))
+        statements.execute(cursor, "find_flight", {"origin": origin_iata, "dest": dest_iata})
         return cursor.fetchone()
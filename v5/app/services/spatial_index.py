@@ -0,0 +1,343 @@
+import heapq
+import math
+import time
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def unit_vectors(lats, lons):
+    """(n, 3) unit-sphere coordinates: straight-line (chord) distance grows with great-circle distance."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point (or an array of points, pairwise) to arrays of points, in km."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _chord(km):
+    # Chord length on the unit sphere for a great-circle distance
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class SpatialIndex:
+    """
+    Static KD-tree over unit-sphere 3D coordinates, held in NumPy arrays.
+
+    Points are reordered at build time so every leaf is a contiguous slice;
+    a query walks the nodes best-first (by distance to each node's bounding
+    box) and scores whole leaves with one vectorized operation. Nodes also
+    keep their largest population, so `min_population` prunes entire
+    subtrees. The index is never mutated after build, so any number of
+    threads can query it without locks.
+
+    knn_many / radius_many run the same search for a whole batch at once:
+    the tree walk advances every query one level per NumPy step, and leaves
+    are scored for all (query, leaf) pairs together, so the Python overhead
+    is per tree level and batch chunk rather than per point.
+    """
+
+    # Query points per vectorized pass (bounds the (pairs, leaf_size) distance matrix)
+    BATCH_CHUNK = 2048
+
+    def __init__(self, rows, leaf_size=32):
+        """`rows`: dicts with at least "lat" and "lon" (and "population" for min_population)."""
+        start = time.time()
+        self.leaf_size = max(1, leaf_size)
+
+        lats = np.array([r["lat"] for r in rows], dtype=np.float64)
+        lons = np.array([r["lon"] for r in rows], dtype=np.float64)
+        pops = np.array([r.get("population") or 0 for r in rows], dtype=np.int64)
+        xyz = unit_vectors(lats, lons) if rows else np.empty((0, 3))
+
+        # Node arrays (plain lists: per-node box tests are cheaper in Python than in NumPy)
+        self._lo, self._hi = [], []
+        self._start, self._end = [], []
+        self._left, self._right = [], []
+        self._max_pop = []
+
+        order = np.arange(len(rows))
+        if len(rows):
+            self._build(xyz, pops, order, 0, len(rows))
+
+        self.xyz = np.ascontiguousarray(xyz[order])
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.populations = pops[order]
+        self.rows = [rows[i] for i in order]
+        self._build_batch_arrays()
+        self.build_seconds = time.time() - start
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _build(self, xyz, pops, order, start, end):
+        node = len(self._start)
+        idx = order[start:end]
+        pts = xyz[idx]
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        self._lo.append(tuple(lo))
+        self._hi.append(tuple(hi))
+        self._start.append(start)
+        self._end.append(end)
+        self._max_pop.append(int(pops[idx].max()))
+        self._left.append(-1)
+        self._right.append(-1)
+
+        if end - start > self.leaf_size:
+            # Split at the median of the widest dimension
+            dim = int(np.argmax(hi - lo))
+            mid = (start + end) // 2
+            order[start:end] = idx[np.argpartition(pts[:, dim], mid - start)]
+            self._left[node] = self._build(xyz, pops, order, start, mid)
+            self._right[node] = self._build(xyz, pops, order, mid, end)
+        return node
+
+    def _build_batch_arrays(self):
+        """NumPy copies of the node arrays plus leaves padded to leaf_size, for the batch queries."""
+        n_nodes = len(self._start)
+        self._lo_np = np.array(self._lo, dtype=np.float64).reshape(n_nodes, 3)
+        self._hi_np = np.array(self._hi, dtype=np.float64).reshape(n_nodes, 3)
+        self._left_np = np.array(self._left, dtype=np.int64)
+        self._right_np = np.array(self._right, dtype=np.int64)
+        self._start_np = np.array(self._start, dtype=np.int64)
+        self._end_np = np.array(self._end, dtype=np.int64)
+        self._max_pop_np = np.array(self._max_pop, dtype=np.int64)
+        self._parent_np = np.full(n_nodes, -1, dtype=np.int64)
+        internal = np.flatnonzero(self._left_np >= 0)
+        self._parent_np[self._left_np[internal]] = internal
+        self._parent_np[self._right_np[internal]] = internal
+
+        # Leaf point slots; padding has position -1, population -1 and lies far off the sphere
+        leaves = np.flatnonzero(self._left_np < 0)
+        self._leaf_of = np.full(n_nodes, -1, dtype=np.int64)
+        self._leaf_of[leaves] = np.arange(len(leaves))
+        slots = self._start_np[leaves][:, None] + np.arange(self.leaf_size)
+        valid = slots < self._end_np[leaves][:, None]
+        self._leaf_pos = np.where(valid, slots, -1)
+        safe = np.where(valid, slots, 0)
+        self._leaf_xyz = np.where(valid[:, :, None], self.xyz[safe] if len(self.xyz) else 0.0, 10.0)
+        self._leaf_pop = np.where(valid, self.populations[safe] if len(self.xyz) else -1, -1)
+
+    def _box_distance(self, node, q):
+        lo, hi = self._lo[node], self._hi[node]
+        total = 0.0
+        for i in range(3):
+            if q[i] < lo[i]:
+                total += (lo[i] - q[i]) ** 2
+            elif q[i] > hi[i]:
+                total += (q[i] - hi[i]) ** 2
+        return math.sqrt(total)
+
+    def _search(self, lat, lon, k, max_km, min_population):
+        """Returns (point positions, chord distances) sorted nearest first."""
+        if not self.rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        q = tuple(unit_vectors([lat], [lon])[0])
+        qa = np.array(q)
+        bound = _chord(max_km) if max_km is not None else 2.0
+
+        found_idx = np.empty(0, dtype=np.int64)
+        found_dist = np.empty(0)
+        heap = [(0.0, 0)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > bound:
+                break
+            left = self._left[node]
+            if left >= 0:
+                for child in (left, self._right[node]):
+                    if self._max_pop[child] < min_population:
+                        continue
+                    cd = self._box_distance(child, q)
+                    if cd <= bound:
+                        heapq.heappush(heap, (cd, child))
+                continue
+
+            s, e = self._start[node], self._end[node]
+            diff = self.xyz[s:e] - qa
+            dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            mask = dist <= bound
+            if min_population:
+                mask &= self.populations[s:e] >= min_population
+            hits = np.flatnonzero(mask)
+            if not len(hits):
+                continue
+            found_idx = np.concatenate((found_idx, hits + s))
+            found_dist = np.concatenate((found_dist, dist[hits]))
+            if k is not None and len(found_idx) >= k:
+                keep = np.argpartition(found_dist, k - 1)[:k]
+                found_idx, found_dist = found_idx[keep], found_dist[keep]
+                bound = float(found_dist.max())
+
+        order = np.argsort(found_dist, kind="stable")
+        return found_idx[order], found_dist[order]
+
+    def _box_distances(self, nodes, q):
+        """Distances from query points `q` (m, 3) to the boxes of `nodes` (m,), pairwise."""
+        gap = np.maximum(self._lo_np[nodes] - q, 0.0) + np.maximum(q - self._hi_np[nodes], 0.0)
+        return np.sqrt(np.einsum("ij,ij->i", gap, gap))
+
+    def _knn_bounds(self, q, k, min_population):
+        """
+        Per query, a distance the k-th nearest eligible point cannot exceed:
+        the exact k-th distance within the query's home leaf when that leaf has
+        k eligible points, else the far corner of the lowest ancestor that does.
+        """
+        m = len(q)
+        eligible = np.concatenate(([0], np.cumsum(self.populations >= min_population)))
+
+        # Descend to a home leaf, taking the nearer child that can hold eligible points
+        node = np.zeros(m, dtype=np.int64)
+        while True:
+            inner = np.flatnonzero(self._left_np[node] >= 0)
+            if not len(inner):
+                break
+            left, right = self._left_np[node[inner]], self._right_np[node[inner]]
+            dl = np.where(self._max_pop_np[left] >= min_population, self._box_distances(left, q[inner]), np.inf)
+            dr = np.where(self._max_pop_np[right] >= min_population, self._box_distances(right, q[inner]), np.inf)
+            node[inner] = np.where(dl <= dr, left, right)
+
+        bounds = np.full(m, 2.0)
+        if k <= self.leaf_size:
+            leaf = self._leaf_of[node]
+            diff = self._leaf_xyz[leaf] - q[:, None, :]
+            dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+            dist[self._leaf_pop[leaf] < min_population] = np.inf
+            bounds = np.minimum(bounds, np.partition(dist, k - 1, axis=1)[:, k - 1])
+
+        # Climb until the subtree holds k eligible points; every one of them is
+        # within the distance to the subtree box's farthest corner
+        count = lambda n: eligible[self._end_np[n]] - eligible[self._start_np[n]]
+        while True:
+            short = np.flatnonzero((count(node) < k) & (node != 0))
+            if not len(short):
+                break
+            node[short] = self._parent_np[node[short]]
+        far = np.maximum(np.abs(q - self._lo_np[node]), np.abs(q - self._hi_np[node]))
+        corner = np.sqrt(np.einsum("ij,ij->i", far, far)) * (1 + 1e-9)
+        return np.minimum(bounds, np.where(count(node) >= k, corner, 2.0))
+
+    def _search_many(self, q, k, max_km, min_population):
+        """
+        Batched _search for query points `q` (m, 3). Returns (query ids, positions,
+        chord distances) sorted by query, then distance.
+        """
+        m = len(q)
+        bound = np.full(m, _chord(max_km) if max_km is not None else 2.0)
+        if k is not None:
+            bound = np.minimum(bound, self._knn_bounds(q, k, min_population))
+
+        # Walk the tree level by level for all queries, keeping (query, node) pairs
+        # whose box is within the query's bound
+        pair_q = np.arange(m, dtype=np.int64)
+        pair_node = np.zeros(m, dtype=np.int64)
+        keep = (self._max_pop_np[0] >= min_population) & (self._box_distances(pair_node, q) <= bound)
+        pair_q, pair_node = pair_q[keep], pair_node[keep]
+        leaf_q, leaf_ids = [], []
+        while len(pair_q):
+            is_leaf = self._left_np[pair_node] < 0
+            leaf_q.append(pair_q[is_leaf])
+            leaf_ids.append(self._leaf_of[pair_node[is_leaf]])
+            inner_q, inner = pair_q[~is_leaf], pair_node[~is_leaf]
+            pair_q = np.concatenate((inner_q, inner_q))
+            pair_node = np.concatenate((self._left_np[inner], self._right_np[inner]))
+            keep = ((self._max_pop_np[pair_node] >= min_population)
+                    & (self._box_distances(pair_node, q[pair_q]) <= bound[pair_q]))
+            pair_q, pair_node = pair_q[keep], pair_node[keep]
+
+        leaf_q = np.concatenate(leaf_q) if leaf_q else np.empty(0, dtype=np.int64)
+        leaf_ids = np.concatenate(leaf_ids) if leaf_ids else np.empty(0, dtype=np.int64)
+
+        # Score every point of every visited leaf in one go
+        diff = self._leaf_xyz[leaf_ids] - q[leaf_q][:, None, :]
+        dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        mask = (dist <= bound[leaf_q][:, None]) & (self._leaf_pop[leaf_ids] >= min_population)
+        cand_q = np.broadcast_to(leaf_q[:, None], dist.shape)[mask]
+        cand_pos = self._leaf_pos[leaf_ids][mask]
+        cand_dist = dist[mask]
+
+        order = np.lexsort((cand_pos, cand_dist, cand_q))
+        cand_q, cand_pos, cand_dist = cand_q[order], cand_pos[order], cand_dist[order]
+        if k is not None:
+            first = np.searchsorted(cand_q, np.arange(m))
+            top = np.arange(len(cand_q)) - first[cand_q] < k
+            cand_q, cand_pos, cand_dist = cand_q[top], cand_pos[top], cand_dist[top]
+        return cand_q, cand_pos, cand_dist
+
+    def _results_many(self, points, k, max_km, min_population):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        results = [[] for _ in range(len(points))]
+        if not self.rows or not len(points) or (k is not None and k < 1):
+            return results
+        for start in range(0, len(points), self.BATCH_CHUNK):
+            chunk = points[start:start + self.BATCH_CHUNK]
+            q = unit_vectors(chunk[:, 0], chunk[:, 1])
+            query_ids, positions, _ = self._search_many(q, k, max_km, min_population)
+            distances = haversine_km(chunk[query_ids, 0], chunk[query_ids, 1],
+                                     self.lats[positions], self.lons[positions])
+            for i, p, d in zip((query_ids + start).tolist(), positions.tolist(), distances.tolist()):
+                results[i].append(dict(self.rows[p], dist_km=d))
+        return results
+
+    def _results(self, lat, lon, positions):
+        distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+        return [dict(self.rows[p], dist_km=float(d)) for p, d in zip(positions, distances)]
+
+    # --- QUERIES ---
+
+    def knn(self, lat, lon, k=1, max_km=None, min_population=0):
+        """The `k` nearest rows (optionally within `max_km`), each with "dist_km", nearest first."""
+        positions, _ = self._search(lat, lon, k, max_km, min_population)
+        return self._results(lat, lon, positions)
+
+    def radius(self, lat, lon, radius_km, k=None, min_population=0):
+        """Rows within `radius_km`, nearest first; at most `k` when given."""
+        positions, _ = self._search(lat, lon, k, radius_km, min_population)
+        return self._results(lat, lon, positions)
+
+    def knn_many(self, points, k=1, max_km=None, min_population=0):
+        """`knn` for a list of (lat, lon), vectorized over the batch; results in input order."""
+        return self._results_many(points, k, max_km, min_population)
+
+    def radius_many(self, points, radius_km, k=None, min_population=0):
+        """`radius` for a list of (lat, lon), vectorized over the batch; results in input order."""
+        return self._results_many(points, k, radius_km, min_population)
+
+    def stats(self):
+        return {
+            "points": len(self.rows),
+            "nodes": len(self._start),
+            "leaf_size": self.leaf_size,
+            "build_ms": round(self.build_seconds * 1000, 1),
+        }
+
+    # --- LOADERS ---
+
+    @classmethod
+    def from_query(cls, conn, sql, leaf_size=32):
+        import psycopg2.extras
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        try:
+            cursor.execute(sql)
+            rows = [dict(r) for r in cursor.fetchall() if r["lat"] is not None and r["lon"] is not None]
+        finally:
+            cursor.close()
+        return cls(rows, leaf_size=leaf_size)
+
+
+CITY_POINTS_SQL = "SELECT city_id, city_name, population, lat, lon FROM cities"
+
+AIRPORT_POINTS_SQL = """
+    SELECT iata_code, name, city_name, ST_Y(geom::geometry) as lat, ST_X(geom::geometry) as lon
+    FROM airports
+    WHERE iata_code IS NOT NULL
+"""
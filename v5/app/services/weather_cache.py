@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+
+class WeatherCache:
+    """
+    Weather results keyed by (data kind, rounded lat/lon grid cell).
+
+    Each kind has its own TTL plus a stale grace window: inside the window the
+    old value is still served while one background refresh per cell runs, so
+    upstream traffic scales with distinct cells rather than with requests.
+    """
+
+    def __init__(self, cell_deg=0.1, ttls=None, stale_grace=None, max_entries=20000):
+        self.cell_deg = cell_deg
+        self.ttls = ttls or {}
+        self.stale_grace = stale_grace or {}
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()   # (kind, cell) -> (value, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def _family(kind):
+        # "rainfall:5" shares the TTLs configured for "rainfall"
+        return kind.split(":", 1)[0]
+
+    def cell(self, lat, lon):
+        return (round(lat / self.cell_deg), round(lon / self.cell_deg))
+
+    def lookup(self, kind, cell):
+        """Returns (value, FRESH | STALE | MISS)."""
+        family = self._family(kind)
+        ttl = self.ttls.get(family, 600)
+        grace = self.stale_grace.get(family, 0)
+
+        with self._lock:
+            entry = self._entries.get((kind, cell))
+            if entry is None:
+                self.misses += 1
+                return None, MISS
+
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                self._entries.move_to_end((kind, cell))
+                self.fresh_hits += 1
+                return value, FRESH
+            if age < ttl + grace:
+                self.stale_hits += 1
+                return value, STALE
+
+            del self._entries[(kind, cell)]
+            self.misses += 1
+            return None, MISS
+
+    def store(self, kind, cell, value):
+        with self._lock:
+            self._entries[(kind, cell)] = (value, time.time())
+            self._entries.move_to_end((kind, cell))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def begin_refresh(self, kind, cell):
+        """Claims the background refresh of a stale cell; False if one is running."""
+        with self._lock:
+            if (kind, cell) in self._refreshing:
+                return False
+            self._refreshing.add((kind, cell))
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, kind, cell):
+        with self._lock:
+            self._refreshing.discard((kind, cell))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "cell_deg": self.cell_deg,
+                "fresh_hits": self.fresh_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refreshing": len(self._refreshing),
+            }
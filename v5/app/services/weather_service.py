@@ -1,64 +1,353 @@
+import os
 import requests
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from app.services.weather_cache import WeatherCache, MISS, STALE
+from app.services.rainfall_store import RainfallStore
+from app.services.singleflight import SingleFlight
+
+MAX_WORKERS = int(os.getenv("WEATHER_MAX_WORKERS", "8"))
+
+# Rainfall windows: the forecast API serves at most 92 past days; the default
+# forecast tail (today + 6 days) is kept so charts look the same as before
+MAX_RAINFALL_DAYS = 92
+FORECAST_DAYS = 7
+# With timezone=auto a day is over everywhere once it is 2 UTC days old
+FINAL_AFTER_DAYS = 2
 
 class WeatherService:
+    BASE_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+    # "batch": one multi-coordinate call per data kind; "concurrent": one call per
+    # point, fanned out in parallel; "serial": one by one
+    FETCH_MODE = os.getenv("WEATHER_FETCH_MODE", "batch").lower()
+    BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "100"))
+
+    # Shared keep-alive session (connection pool sized to the worker pool)
+    _session = requests.Session()
+    _session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=MAX_WORKERS))
+    _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="weather")
+    # Background stale-while-revalidate refreshes never compete with live fetches
+    _refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="weather-refresh")
+
+    # Grid-cell cache: separate TTL + stale grace window per data kind (seconds)
+    cache = WeatherCache(
+        cell_deg=float(os.getenv("WEATHER_CACHE_CELL_DEG", "0.1")),
+        ttls={
+            "current": int(os.getenv("WEATHER_TTL_CURRENT", "600")),
+            "rainfall": int(os.getenv("WEATHER_TTL_RAINFALL", "3600")),
+        },
+        stale_grace={
+            "current": int(os.getenv("WEATHER_STALE_CURRENT", "300")),
+            "rainfall": int(os.getenv("WEATHER_STALE_RAINFALL", "1800")),
+        }
+    )
+
+    # Concurrent requests missing the same cells share one upstream fetch
+    _flights = SingleFlight()
+
+    # Finished rainfall days per grid cell; only missing days go upstream.
+    # Opened by load_rainfall_store() from create_app, not at import.
+    rainfall_store = None
+
+    @staticmethod
+    def load_rainfall_store():
+        """Opens the rainfall day store (without it, full windows are fetched)."""
+        if WeatherService.rainfall_store is not None:
+            return WeatherService.rainfall_store
+        try:
+            WeatherService.rainfall_store = RainfallStore(
+                os.getenv("RAINFALL_STORE_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "instance", "rainfall.sqlite3"))
+            )
+        except Exception as e:
+            print(f"[WARNING] Rainfall store unavailable, fetching full windows: {e}")
+        return WeatherService.rainfall_store
+
+    @staticmethod
+    def fetch_many(points, current=False, rainfall=False, rainfall_days=5):
+        """
+        Fetches current weather and/or rainfall history (the last `rainfall_days`
+        days plus forecast) for every (lat, lon) point.
+        Returns one {"weather": ..., "rainfall_history": ...} dict per point, in order.
+
+        "batch" mode sends one multi-coordinate request per data kind (both kinds
+        in parallel); "concurrent" fans out one request per point and kind;
+        "serial" issues them one by one.
+        """
+        results = [{} for _ in points]
+        if not points:
+            return results
+
+        if WeatherService.FETCH_MODE == "batch":
+            kinds = []
+            if current:
+                kinds.append(("weather", WeatherService.get_current_weather_many))
+            if rainfall:
+                kinds.append(("rainfall_history", lambda pts: WeatherService.get_rainfall_history_many(pts, rainfall_days)))
+            futures = [(key, WeatherService._executor.submit(fn, points)) for key, fn in kinds]
+            for key, future in futures:
+                try:
+                    values = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Weather fetch failed: {e}")
+                    values = [None] * len(points)
+                for i, value in enumerate(values):
+                    results[i][key] = value
+            return results
+
+        jobs = []
+        for i, (lat, lon) in enumerate(points):
+            if current:
+                jobs.append((i, "weather", WeatherService.get_current_weather, lat, lon))
+            if rainfall:
+                jobs.append((i, "rainfall_history", lambda la, lo: WeatherService.get_rainfall_history(la, lo, rainfall_days), lat, lon))
+
+        if WeatherService.FETCH_MODE == "serial" or len(jobs) <= 1:
+            for i, key, fn, lat, lon in jobs:
+                results[i][key] = fn(lat, lon)
+            return results
+
+        futures = [(i, key, WeatherService._executor.submit(fn, lat, lon)) for i, key, fn, lat, lon in jobs]
+        for i, key, future in futures:
+            try:
+                results[i][key] = future.result()
+            except Exception as e:
+                print(f"[ERROR] Weather fetch failed: {e}")
+                results[i][key] = None
+        return results
+
+    # --- RESPONSE PARSING ---
+
+    @staticmethod
+    def _parse_current(data):
+        if "current_weather" in data:
+            cw = data["current_weather"]
+            return {
+                "temperature": cw.get("temperature"),
+                "windspeed": cw.get("windspeed"),
+                "weathercode": cw.get("weathercode"),
+                "condition_text": WeatherService.get_condition_text(cw.get("weathercode"))
+            }
+        return None
+
+    @staticmethod
+    def _parse_rainfall(data):
+        if "daily" in data:
+            return {
+                "dates": data["daily"]["time"],
+                "values": data["daily"]["precipitation_sum"]
+            }
+        return None
+
+    # --- CACHE ---
+
+    @staticmethod
+    def _cached(kind, points, fetch):
+        """
+        Serves points from the grid-cell cache. Misses are fetched (one upstream
+        point per cell) through `fetch(points) -> values`, coalesced with any
+        identical in-flight fetch; stale cells are served as-is and refreshed
+        in the background.
+        """
+        cache = WeatherService.cache
+        results = [None] * len(points)
+        missing = OrderedDict()  # cell -> indices of points in that cell
+        stale = OrderedDict()    # cell -> representative point
+
+        for i, (lat, lon) in enumerate(points):
+            if not lat or not lon:
+                continue
+            cell = cache.cell(lat, lon)
+            value, state = cache.lookup(kind, cell)
+            if state == MISS:
+                missing.setdefault(cell, []).append(i)
+                continue
+            results[i] = value
+            if state == STALE and cell not in stale and cache.begin_refresh(kind, cell):
+                stale[cell] = (lat, lon)
+
+        if missing:
+            fetched = WeatherService._flights.do(
+                (kind, tuple(missing)), fetch, [points[indices[0]] for indices in missing.values()]
+            )
+            for (cell, indices), value in zip(missing.items(), fetched):
+                if value is not None:
+                    cache.store(kind, cell, value)
+                for i in indices:
+                    results[i] = value
+
+        if stale:
+            WeatherService._refresher.submit(WeatherService._refresh, kind, stale, fetch)
+        return results
+
+    @staticmethod
+    def _refresh(kind, stale, fetch):
+        cache = WeatherService.cache
+        try:
+            fetched = fetch(list(stale.values()))
+            for cell, value in zip(stale, fetched):
+                if value is not None:
+                    cache.store(kind, cell, value)
+        except Exception as e:
+            print(f"[ERROR] Weather refresh failed: {e}")
+        finally:
+            for cell in stale:
+                cache.end_refresh(kind, cell)
+
+    # --- SINGLE POINT ---
+
     @staticmethod
     def get_current_weather(lat, lon):
         """
-        Fetches current weather from Open-Meteo API.
+        Fetches current weather from Open-Meteo API (grid-cell cached).
         """
         if not lat or not lon:
             return None
-            
+        fetch = lambda pts: [WeatherService._fetch_current(*p) for p in pts]
+        return WeatherService._cached("current", [(lat, lon)], fetch)[0]
+
+    @staticmethod
+    def get_rainfall_history(lat, lon, past_days=5):
+        """
+        Fetches the past `past_days` days of rainfall data plus forecast (grid-cell cached).
+        """
+        past_days = max(1, min(int(past_days), MAX_RAINFALL_DAYS))
+        fetch = lambda pts: WeatherService._fetch_rainfall_many(pts, past_days, batched=False)
+        return WeatherService._cached(f"rainfall:{past_days}", [(lat, lon)], fetch)[0]
+
+    @staticmethod
+    def _fetch_current(lat, lon):
         try:
-            url = "https://api.open-meteo.com/v1/forecast"
             params = {
                 "latitude": lat,
                 "longitude": lon,
                 "current_weather": "true"
             }
             
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
-            
-            if "current_weather" in data:
-                cw = data["current_weather"]
-                return {
-                    "temperature": cw.get("temperature"),
-                    "windspeed": cw.get("windspeed"),
-                    "weathercode": cw.get("weathercode"),
-                    "condition_text": WeatherService.get_condition_text(cw.get("weathercode"))
-                }
+            response = WeatherService._session.get(WeatherService.BASE_URL, params=params, timeout=5)
+            return WeatherService._parse_current(response.json())
         except Exception as e:
             print(f"[ERROR] Weather API failed: {e}")
             return None
-        
+
+    @staticmethod
+    def _fetch_rainfall(lat, lon, params):
+        try:
+            params = dict(params, latitude=lat, longitude=lon)
+            response = WeatherService._session.get(WeatherService.BASE_URL, params=params, timeout=5)
+            return WeatherService._parse_rainfall(response.json())
+        except Exception as e:
+            print(f"[ERROR] Rainfall API failed: {e}")
         return None
 
+    # --- MULTI POINT (one HTTP call per BATCH_SIZE points) ---
+
     @staticmethod
-    def get_rainfall_history(lat, lon):
+    def _fetch_batch(points, params, parse, label):
         """
-        Fetches past 5 days of rainfall data.
+        Sends comma-separated latitude/longitude lists and splits the response
+        per point. Points without coordinates (or failed batches) yield None.
         """
-        try:
-            url = "https://api.open-meteo.com/v1/forecast"
+        results = [None] * len(points)
+        valid = [i for i, (lat, lon) in enumerate(points) if lat and lon]
+
+        for start in range(0, len(valid), WeatherService.BATCH_SIZE):
+            chunk = valid[start:start + WeatherService.BATCH_SIZE]
+            query = dict(params)
+            query["latitude"] = ",".join(str(points[i][0]) for i in chunk)
+            query["longitude"] = ",".join(str(points[i][1]) for i in chunk)
+            try:
+                response = WeatherService._session.get(WeatherService.BASE_URL, params=query, timeout=5)
+                data = response.json()
+                # Open-Meteo answers a single location with an object, several with a list
+                items = data if isinstance(data, list) else [data]
+                if len(items) != len(chunk):
+                    print(f"[ERROR] {label} API returned {len(items)} locations for {len(chunk)} points")
+                    continue
+                for i, item in zip(chunk, items):
+                    results[i] = parse(item)
+            except Exception as e:
+                print(f"[ERROR] {label} API failed: {e}")
+        return results
+
+    @staticmethod
+    def get_current_weather_many(points):
+        """Current weather for a list of (lat, lon) points; cache misses share one request."""
+        params = {"current_weather": "true"}
+        fetch = lambda pts: WeatherService._fetch_batch(pts, params, WeatherService._parse_current, "Weather")
+        return WeatherService._cached("current", points, fetch)
+
+    @staticmethod
+    def get_rainfall_history_many(points, past_days=5):
+        """Past `past_days` days of rainfall (plus forecast) for a list of (lat, lon) points."""
+        past_days = max(1, min(int(past_days), MAX_RAINFALL_DAYS))
+        fetch = lambda pts: WeatherService._fetch_rainfall_many(pts, past_days)
+        return WeatherService._cached(f"rainfall:{past_days}", points, fetch)
+
+    # --- RAINFALL HISTORY (local store + incremental fetch) ---
+
+    @staticmethod
+    def _fetch_rainfall_many(points, past_days, batched=True):
+        """
+        Answers finished days from the rainfall store and fetches only the rest:
+        each point asks upstream from its first missing day through the forecast.
+        Points sharing a start date share one batched request.
+        """
+        today = datetime.now(timezone.utc).date()
+        first = today - timedelta(days=past_days)
+        last_final = today - timedelta(days=FINAL_AFTER_DAYS)
+        end = today + timedelta(days=FORECAST_DAYS - 1)
+        store = WeatherService.rainfall_store
+
+        results = [None] * len(points)
+        stored = {}              # point index -> (cell, {day: mm})
+        groups = OrderedDict()   # upstream start date -> point indices
+
+        for i, (lat, lon) in enumerate(points):
+            if not lat or not lon:
+                continue
+            start = first
+            if store is not None:
+                cell = WeatherService.cache.cell(lat, lon)
+                try:
+                    have = store.days(cell, first, last_final)
+                except Exception as e:
+                    print(f"[WARNING] Rainfall store read failed: {e}")
+                    have = {}
+                stored[i] = (cell, have)
+                while start <= last_final and start.isoformat() in have:
+                    start += timedelta(days=1)
+            groups.setdefault(start, []).append(i)
+
+        for start, indices in groups.items():
             params = {
-                "latitude": lat,
-                "longitude": lon,
                 "daily": "precipitation_sum",
-                "past_days": 5,
-                "timezone": "auto"
+                "timezone": "auto",
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat()
             }
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
-            
-            if "daily" in data:
-                return {
-                    "dates": data["daily"]["time"],
-                    "values": data["daily"]["precipitation_sum"]
-                }
-        except Exception as e:
-            print(f"[ERROR] Rainfall API failed: {e}")
-        return None
+            group_points = [points[i] for i in indices]
+            if batched:
+                fetched = WeatherService._fetch_batch(group_points, params, WeatherService._parse_rainfall, "Rainfall")
+            else:
+                fetched = [WeatherService._fetch_rainfall(lat, lon, params) for lat, lon in group_points]
+
+            for i, series in zip(indices, fetched):
+                if series is None or i not in stored:
+                    results[i] = series
+                    continue
+                cell, have = stored[i]
+                fresh = dict(zip(series["dates"], series["values"]))
+                try:
+                    store.put(cell, [(day, mm) for day, mm in fresh.items() if day <= last_final.isoformat()])
+                except Exception as e:
+                    print(f"[WARNING] Rainfall store write failed: {e}")
+                merged = {**have, **fresh}
+                dates = sorted(merged)
+                results[i] = {"dates": dates, "values": [merged[day] for day in dates]}
+        return results
 
     @staticmethod
     def get_condition_text(code):
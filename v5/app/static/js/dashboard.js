@@ -106,6 +106,15 @@ async function performSearch() {
     btn.disabled = true;
     closeInfoCard();
 
+    // Incremental results when the browser supports Server-Sent Events
+    if (window.EventSource) {
+        streamSearch(query, () => {
+            btn.innerText = "Analyze";
+            btn.disabled = false;
+        });
+        return;
+    }
+
     try {
         const response = await fetch('/api/resolve', {
             method: 'POST',
@@ -120,22 +129,7 @@ async function performSearch() {
 
         // --- ROUTE MODE ---
         if (data.intent === 'ROUTE' && data.results.length >= 2) {
-            currentLocations = data.results.map(r => r.city_name);
-
-            // Show Standard Mode Selector (Car / Air)
-            const modeSelector = document.getElementById('mode-selector');
-            if (modeSelector) {
-                modeSelector.style.display = 'flex';
-                modeSelector.classList.remove('hidden');
-            }
-
-            // Default to Driving
-            switchModeButton('DRIVING');
-            calculateRoute(currentLocations, 'DRIVING', true);
-
-            // Show Stats
-            const stats = document.getElementById('route-stats');
-            if (stats) stats.classList.remove('hidden');
+            showRoute(data.results.map(r => r.city_name));
 
         } else {
             // --- INFO MODE ---
@@ -154,11 +148,14 @@ async function performSearch() {
             if (!results.includes(true)) {
                 showToast("No location found.", "error");
             } else {
-                renderCards(data.results);
+                renderCards(data.results, Boolean(data.summary_job));
                 if (!bounds.isEmpty()) map.fitBounds(bounds);
             }
         }
 
+        // AI summaries arrive after the map is drawn
+        if (data.summary_job) pollSummaries(data.summary_job);
+
     } catch (e) {
         console.error("Search failed:", e);
         showToast("Analysis failed. Please try again.", "error");
@@ -168,8 +165,162 @@ async function performSearch() {
     }
 }
 
+function showRoute(locations) {
+    currentLocations = locations;
+
+    // Show Standard Mode Selector (Car / Air)
+    const modeSelector = document.getElementById('mode-selector');
+    if (modeSelector) {
+        modeSelector.style.display = 'flex';
+        modeSelector.classList.remove('hidden');
+    }
+
+    // Default to Driving
+    switchModeButton('DRIVING');
+    calculateRoute(currentLocations, 'DRIVING', true);
+
+    // Show Stats
+    const stats = document.getElementById('route-stats');
+    if (stats) stats.classList.remove('hidden');
+}
+
+// --- STREAMING SEARCH (Server-Sent Events) ---
+// Events: intent -> location (per place) -> weather -> nearby -> summary -> done
+function streamSearch(query, onFinish) {
+    const source = new EventSource(`/api/resolve/stream?query=${encodeURIComponent(query)}`);
+    const bounds = new google.maps.LatLngBounds();
+    const geocodes = [];
+    let results = [];
+    let expected = 0;
+    let routeMode = false;
+    let summariesPending = true;
+    let finished = false;
+
+    const finish = () => {
+        if (finished) return;
+        finished = true;
+        source.close();
+        onFinish();
+    };
+
+    const addMarker = (loc) => {
+        geocodes.push(geocodeAndHighlight(loc.city_name, bounds).then(found => {
+            if (found && !bounds.isEmpty()) map.fitBounds(bounds);
+            return found;
+        }));
+    };
+
+    const refreshCards = () => {
+        if (!routeMode) renderCards(results.filter(Boolean), summariesPending);
+    };
+
+    clearMap();
+
+    source.addEventListener('intent', e => {
+        const data = JSON.parse(e.data);
+        expected = data.locations.length;
+        routeMode = data.intent === 'ROUTE' && expected >= 2;
+        const modeSelector = document.getElementById('mode-selector');
+        if (modeSelector && !routeMode) modeSelector.style.display = 'none';
+    });
+
+    source.addEventListener('location', e => {
+        const { index, result } = JSON.parse(e.data);
+        results[index] = result;
+        if (routeMode) {
+            // Routes need every stop before they can be drawn
+            if (results.filter(Boolean).length === expected) showRoute(results.map(r => r.city_name));
+            return;
+        }
+        addMarker(result);
+        refreshCards();
+    });
+
+    source.addEventListener('weather', e => {
+        const { index, weather, rainfall_history } = JSON.parse(e.data);
+        if (!results[index]) return;
+        if (weather) results[index].weather = weather;
+        if (rainfall_history) results[index].rainfall_history = rainfall_history;
+        refreshCards();
+    });
+
+    source.addEventListener('nearby', e => {
+        const data = JSON.parse(e.data);
+        data.results.forEach(loc => {
+            results.push(loc);
+            if (!routeMode) addMarker(loc);
+        });
+        refreshCards();
+    });
+
+    source.addEventListener('summary', e => {
+        const { summaries } = JSON.parse(e.data);
+        results.forEach(loc => {
+            const details = loc && summaries[loc.city_name];
+            if (!details) return;
+            loc.ai_summary = details.summary || '';
+            loc.ai_answer = details.answer || '';
+        });
+        summariesPending = false;
+        refreshCards();
+    });
+
+    source.addEventListener('done', () => {
+        summariesPending = false;
+        refreshCards();
+        if (!routeMode) {
+            Promise.all(geocodes).then(found => {
+                if (!found.includes(true)) showToast("No location found.", "error");
+            });
+        }
+        finish();
+    });
+
+    // Fired both for server "error" events and for dropped connections
+    source.addEventListener('error', e => {
+        if (finished) return;
+        console.error("Streaming search failed:", e);
+        showToast("Analysis failed. Please try again.", "error");
+        finish();
+    });
+}
+
+// --- DEFERRED SUMMARIES ---
+async function pollSummaries(jobId, attempts = 30) {
+    for (let i = 0; i < attempts; i++) {
+        await new Promise(r => setTimeout(r, 1000));
+        try {
+            const response = await fetch(`/api/summaries/${jobId}`);
+            if (!response.ok) break;
+            const state = await response.json();
+            if (state.status === 'pending') continue;
+            if (state.status === 'done') applySummaries(state.summaries || {});
+            break;
+        } catch (e) {
+            console.error("Summary polling failed:", e);
+            break;
+        }
+    }
+    // Anything still waiting keeps the default text
+    document.querySelectorAll('.card-content[data-pending="true"] .highlight-text').forEach(p => {
+        p.innerText = "Location identified.";
+    });
+}
+
+function applySummaries(summaries) {
+    document.querySelectorAll('.card-content[data-place]').forEach(wrapper => {
+        const details = summaries[wrapper.dataset.place];
+        if (!details) return;
+        wrapper.dataset.pending = "false";
+        wrapper.innerHTML = `
+            <p class="highlight-text">${details.answer || details.summary || "Location identified."}</p>
+            ${details.answer && details.summary ? `<p class="sub-text">${details.summary}</p>` : ''}
+        `;
+    });
+}
+
 // --- CARDS LOGIC ---
-function renderCards(results) {
+function renderCards(results, summariesPending = false) {
     const container = document.getElementById('cards-container');
     container.innerHTML = '';
 
@@ -232,8 +383,11 @@ function renderCards(results) {
 
         const contentWrapper = document.createElement('div');
         contentWrapper.className = 'card-content';
+        contentWrapper.dataset.place = loc.city_name;
+        const waiting = summariesPending && !loc.ai_answer && !loc.ai_summary;
+        contentWrapper.dataset.pending = waiting ? "true" : "false";
         contentWrapper.innerHTML = `
-            <p class="highlight-text">${loc.ai_answer || loc.ai_summary || "Location identified."}</p>
+            <p class="highlight-text">${loc.ai_answer || loc.ai_summary || (waiting ? "Loading summary..." : "Location identified.")}</p>
             ${loc.ai_answer && loc.ai_summary ? `<p class="sub-text">${loc.ai_summary}</p>` : ''}
         `;
         infoCard.appendChild(contentWrapper);
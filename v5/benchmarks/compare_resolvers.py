@@ -0,0 +1,68 @@
+import sys
+import os
+import time
+import statistics
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.services.geo_service import GeoService
+
+# (term, context_country)
+QUERIES = [
+    ("Bangalore", None), ("Bengaluru", None), ("Mumbai", None), ("Bombay", None),
+    ("Delhi", None), ("Chennai", None), ("Kolkatta", None), ("Hydrabad", None),
+    ("Hosur", None), ("Pune", None), ("Goa", None), ("Karnataka", None),
+    ("India", None), ("IND", None), ("Paris", None), ("Paris", "United States"),
+    ("Madurai", "India"), ("asdfghjkl", None),
+]
+
+ROUNDS = 20
+
+
+def time_backend(backend):
+    timings = []
+    results = {}
+    for _ in range(ROUNDS):
+        for term, context in QUERIES:
+            start = time.perf_counter()
+            res = GeoService.get_location_metadata(term, context_country=context, backend=backend)
+            timings.append((time.perf_counter() - start) * 1000)
+            results[(term, context)] = res
+    return timings, results
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        if GeoService.gazetteer is None:
+            GeoService.load_gazetteer()
+        if GeoService.gazetteer is None:
+            print("[ERROR] Gazetteer unavailable, nothing to compare.")
+            return
+
+        db_times, db_results = time_backend("db")
+        mem_times, mem_results = time_backend("memory")
+
+        print(f"\n{'BACKEND':<8} | {'MEDIAN ms':>10} | {'P95 ms':>10}")
+        print("-" * 36)
+        for label, times in (("db", db_times), ("memory", mem_times)):
+            p95 = statistics.quantiles(times, n=20)[-1]
+            print(f"{label:<8} | {statistics.median(times):>10.3f} | {p95:>10.3f}")
+
+        print("\nDisagreements:")
+        mismatches = 0
+        for key in QUERIES:
+            a, b = db_results[key], mem_results[key]
+            name_a = a['city_name'] if a else None
+            name_b = b['city_name'] if b else None
+            if name_a != name_b:
+                mismatches += 1
+                print(f"   {key}: db={name_a} memory={name_b}")
+        if not mismatches:
+            print("   none")
+
+
+if __name__ == "__main__":
+    main()
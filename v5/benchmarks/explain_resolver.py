@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import psycopg2.extras
+from app import create_app, get_db_connection, release_db_connection
+from app.services.geo_service import resolver_sql, resolver_params
+
+# Before/after EXPLAIN ANALYZE for the resolver query:
+#   "db"     -> similarity() > 0.4 / ILIKE ANY(alt_names) over countries, states, cities
+#   "places" -> % / <-> over the unified places table (scripts/migrate_places.sql)
+# Meaningful numbers need the full cities500 load (200k+ rows).
+
+TERMS = ["Bengaluru", "Bombay", "Banglore", "Hosur", "Karnataka", "India", "Paris"]
+MIN_CITIES = 200_000
+
+
+def collect_nodes(plan, out):
+    out.append(plan)
+    for child in plan.get("Plans", []):
+        collect_nodes(child, out)
+    return out
+
+
+def explain(cursor, mode, term):
+    sql = resolver_sql(mode)
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, resolver_params(None, term=term))
+    report = cursor.fetchone()[0]
+    if isinstance(report, str):
+        report = json.loads(report)
+    report = report[0]
+    nodes = collect_nodes(report["Plan"], [])
+    seq_scans = sorted({n.get("Relation Name") for n in nodes if n["Node Type"] == "Seq Scan"})
+    index_scans = sorted({n.get("Index Name") for n in nodes if "Index" in n["Node Type"] and n.get("Index Name")})
+    return {
+        "planning_ms": report.get("Planning Time", 0.0),
+        "execution_ms": report.get("Execution Time", 0.0),
+        "shared_hit": report["Plan"].get("Shared Hit Blocks", 0),
+        "shared_read": report["Plan"].get("Shared Read Blocks", 0),
+        "seq_scans": seq_scans,
+        "index_scans": index_scans,
+    }
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            cursor.execute("SELECT count(*) FROM cities;")
+            city_count = cursor.fetchone()[0]
+            cursor.execute("SELECT count(*) FROM places;")
+            place_count = cursor.fetchone()[0]
+            print(f"cities: {city_count:,}   places: {place_count:,}")
+            if city_count < MIN_CITIES:
+                print(f"[WARNING] Fewer than {MIN_CITIES:,} cities loaded; timings will understate the difference.")
+
+            print(f"\n{'TERM':<12} | {'MODE':<7} | {'PLAN ms':>8} | {'EXEC ms':>9} | {'BUFFERS':>9} | SCANS")
+            print("-" * 100)
+            for term in TERMS:
+                for mode in ("db", "places"):
+                    r = explain(cursor, mode, term)
+                    scans = "seq: " + ",".join(r["seq_scans"]) if r["seq_scans"] else "index: " + ",".join(r["index_scans"])
+                    buffers = r["shared_hit"] + r["shared_read"]
+                    print(f"{term:<12} | {mode:<7} | {r['planning_ms']:>8.2f} | {r['execution_ms']:>9.2f} | {buffers:>9} | {scans}")
+        finally:
+            conn.rollback()
+            cursor.close()
+            release_db_connection(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import psycopg2.extras
+from app import create_app, get_db_connection, release_db_connection
+from app.db_statements import statements
+from app.services.geo_service import NEARBY_MODES
+
+# EXPLAIN ANALYZE of the nearby-city query in each NEARBY_MODE:
+#   "cast" -> geom::geography on every row (full scan of cities)
+#   "bbox" -> degree-expanded envelope over idx_cities_geom, exact check after
+#   "geog" -> stored geography column, ST_DWithin + <-> KNN on idx_cities_geog
+# "geog" needs scripts/migrate_city_geog.sql.
+
+POINTS = [
+    ("Bengaluru", 12.9716, 77.5946),
+    ("Paris", 48.8566, 2.3522),
+    ("New York", 40.7128, -74.0060),
+    ("Reykjavik", 64.1466, -21.9426),
+]
+CASES = [
+    {"radius_km": 50, "k": 10, "min_population": 0},
+    {"radius_km": 300, "k": 10, "min_population": 100000},
+]
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            cursor.execute("SELECT count(*) FROM cities;")
+            print(f"cities: {cursor.fetchone()[0]:,}")
+            print(f"\n{'POINT':<10} | {'RADIUS':>6} | {'MIN POP':>8} | " + " | ".join(f"{m:>9}" for m in NEARBY_MODES))
+            print("-" * (34 + 12 * len(NEARBY_MODES)))
+
+            for name, lat, lon in POINTS:
+                for case in CASES:
+                    params = dict(case, lat=lat, lon=lon)
+                    cells = []
+                    for mode in NEARBY_MODES:
+                        try:
+                            r = statements.explain(cursor, f"nearby_{mode}", params)
+                            cells.append(f"{r['execution_ms']:>6.2f} ms")
+                        except Exception as e:
+                            conn.rollback()
+                            cells.append(f"{'n/a':>9}")
+                            print(f"[WARNING] {mode}: {e}".strip())
+                    print(f"{name:<10} | {case['radius_km']:>6} | {case['min_population']:>8} | " + " | ".join(cells))
+        finally:
+            conn.rollback()
+            cursor.close()
+            release_db_connection(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import os
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import psycopg2.extras
+from app import create_app, get_db_connection, release_db_connection
+from app.db_statements import statements
+from app.services.geo_service import GeoService, resolver_params
+
+# Plain SQL vs PREPARE/EXECUTE for the hot resolver statement:
+#   - EXPLAIN ANALYZE splits planning from execution time
+#   - wall-clock loop shows the per-call latency seen by the app
+# After five executions PostgreSQL may switch a prepared statement to a generic
+# plan; the later rows show whether planning time disappears.
+
+TERMS = ["Bengaluru", "Bombay", "Banglore", "Hosur", "Karnataka", "India", "Paris"]
+ROUNDS = 10
+LOOPS = 200
+
+
+def timed_loop(cursor, statement):
+    start = time.perf_counter()
+    for i in range(LOOPS):
+        statements.execute(cursor, statement, resolver_params(None, term=TERMS[i % len(TERMS)]))
+        cursor.fetchall()
+    return (time.perf_counter() - start) / LOOPS * 1000
+
+
+def main():
+    app = create_app()
+    statement = f"resolve_{GeoService._db_mode(GeoService.BACKEND)}"
+
+    with app.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            print(f"Statement: {statement}")
+            print(f"\n{'ROUND':<6} | {'MODE':<9} | {'PLAN ms':>8} | {'EXEC ms':>8}")
+            print("-" * 42)
+            for round_no in range(1, ROUNDS + 1):
+                for enabled in (False, True):
+                    statements.enabled = enabled
+                    r = statements.explain(cursor, statement, resolver_params(None, term=TERMS[round_no % len(TERMS)]))
+                    mode = "prepared" if enabled else "plain"
+                    print(f"{round_no:<6} | {mode:<9} | {r['planning_ms']:>8.3f} | {r['execution_ms']:>8.3f}")
+
+            print(f"\nWall clock over {LOOPS} calls:")
+            for enabled in (False, True):
+                statements.enabled = enabled
+                print(f"   {'prepared' if enabled else 'plain':<9} {timed_loop(cursor, statement):.3f} ms / call")
+        finally:
+            conn.rollback()
+            cursor.close()
+            release_db_connection(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import sys
+import os
+import time
+import random
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app
+from app.services.geo_service import GeoService
+
+# Reverse geocoding throughput (points / second) through GeoService.reverse_geocode_many,
+# one query per chunk, chunks spread over WORKERS pool connections.
+# Needs scripts/build_admin_subdivided.sql (run by the seed scripts).
+
+POINTS = 50_000
+CHUNK = 1000
+WORKERS = 4
+
+
+def main():
+    app = create_app()
+    random.seed(1)
+    # Mostly land: boxes over India, Europe and the continental US
+    boxes = [(8, 30, 68, 90), (36, 60, -10, 30), (26, 48, -124, -70)]
+    points = []
+    for _ in range(POINTS):
+        lat0, lat1, lon0, lon1 = random.choice(boxes)
+        points.append((random.uniform(lat0, lat1), random.uniform(lon0, lon1)))
+    chunks = [points[i:i + CHUNK] for i in range(0, len(points), CHUNK)]
+
+    with app.app_context():
+        GeoService.reverse_geocode_many(chunks[0])  # prepare + warm the cache
+
+        for workers in (1, WORKERS):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = [r for chunk in pool.map(GeoService.reverse_geocode_many, chunks) for r in (chunk or [])]
+            elapsed = time.perf_counter() - start
+            matched = sum(1 for r in results if r["country"])
+            print(f"{workers} worker(s): {len(results):,} points in {elapsed:.2f}s "
+                  f"-> {len(results) / elapsed:,.0f} points/s ({matched:,} inside a country)")
+
+
+if __name__ == "__main__":
+    main()
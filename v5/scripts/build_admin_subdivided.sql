@@ -0,0 +1,28 @@
+-- scripts/build_admin_subdivided.sql
+-- Point-in-polygon copies of the country / state boundaries for reverse
+-- geocoding (/api/reverse). ST_Subdivide cuts every boundary into pieces of at
+-- most 256 vertices, so an index hit tests a small polygon with a tight bbox
+-- instead of a whole coastline.
+-- Rebuilt from scratch; scripts/seed_countries.py and seed_states.py run it
+-- after loading.
+
+DROP TABLE IF EXISTS countries_subdivided;
+
+CREATE TABLE countries_subdivided AS
+SELECT country_id, ST_Subdivide(geom, 256) AS geom
+FROM countries
+WHERE geom IS NOT NULL;
+
+CREATE INDEX idx_countries_subdivided_geom ON countries_subdivided USING GIST(geom);
+
+DROP TABLE IF EXISTS states_subdivided;
+
+CREATE TABLE states_subdivided AS
+SELECT state_id, ST_Subdivide(geom, 256) AS geom
+FROM states
+WHERE geom IS NOT NULL;
+
+CREATE INDEX idx_states_subdivided_geom ON states_subdivided USING GIST(geom);
+
+ANALYZE countries_subdivided;
+ANALYZE states_subdivided;
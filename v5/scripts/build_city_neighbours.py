@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+
+import psycopg2
+import psycopg2.extras
+from dotenv import load_dotenv
+
+# SpatialIndex lives in the app package
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.spatial_index import SpatialIndex
+
+load_dotenv()
+
+# Precomputes every city's K nearest neighbours, once per population tier, into
+# `city_neighbours`, so NEARBY answers become a primary-key lookup
+# (GeoService.find_nearby_cities). A tier row lists the K nearest cities with at
+# least `min_population` inhabitants; `reach_km` is the distance of the K-th one
+# (NULL when the tier has no further cities), so any radius below it is answered
+# exactly from the row. Rows are keyed by GeoNames id, not city_id:
+# scripts/seed_cities.py reloads with RESTART IDENTITY, which renumbers city_id.
+#
+# Usage: python scripts/build_city_neighbours.py [--full]
+# Without --full only cities whose neighbourhood changed since the last build are
+# recomputed; scripts/seed_cities.py runs this after every reload. A failed
+# refresh empties the table (NEARBY falls back to live search) and raises.
+
+K = int(os.getenv("NEIGHBOURS_K", "25"))
+TIERS = [int(t) for t in os.getenv("NEIGHBOURS_TIERS", "0,15000,100000,1000000").split(",")]
+
+# Above this share of changed cities a full rebuild is cheaper than patching
+FULL_REBUILD_RATIO = 0.25
+
+SCHEMA_SQL = """
+    -- Tables from the first, city_id-keyed layout are rebuilt from scratch
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'city_neighbours' AND column_name = 'city_id') THEN
+            DROP TABLE city_neighbours, city_neighbours_source, city_neighbours_meta;
+        END IF;
+    END $$;
+
+    CREATE TABLE IF NOT EXISTS city_neighbours (
+        geonameid BIGINT NOT NULL,
+        min_population BIGINT NOT NULL,
+        neighbour_ids BIGINT[] NOT NULL,   -- GeoNames ids, nearest first
+        dist_km REAL[] NOT NULL,
+        reach_km REAL,
+        PRIMARY KEY (geonameid, min_population)
+    );
+    -- Finds the rows listing a moved / removed city during incremental refreshes
+    CREATE INDEX IF NOT EXISTS idx_city_neighbours_ids ON city_neighbours USING GIN(neighbour_ids);
+
+    -- Cities as they were at the last build (diffed against `cities` on refresh)
+    CREATE TABLE IF NOT EXISTS city_neighbours_source (
+        geonameid BIGINT PRIMARY KEY,
+        lat DOUBLE PRECISION NOT NULL,
+        lon DOUBLE PRECISION NOT NULL,
+        population BIGINT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS city_neighbours_meta (
+        k INTEGER NOT NULL,
+        tiers BIGINT[] NOT NULL,
+        cities INTEGER NOT NULL,
+        built_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+"""
+
+
+def get_db_connection():
+    return psycopg2.connect(
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASS", "password"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432"),
+        database=os.getenv("DB_NAME", "geospatial_db")
+    )
+
+
+def load_cities(cursor):
+    cursor.execute("""
+        SELECT geonameid, lat, lon, COALESCE(population, 0) as population
+        FROM cities
+        WHERE lat IS NOT NULL AND lon IS NOT NULL AND geonameid IS NOT NULL
+    """)
+    cities = [dict(r) for r in cursor.fetchall()]
+    if not cities:
+        raise RuntimeError("no cities with a geonameid; reload them with scripts/seed_cities.py")
+    return cities
+
+
+def neighbour_rows(index, cities):
+    """One (geonameid, min_population, ids, dists, reach_km) row per city and tier, one knn_many per tier."""
+    points = [(c["lat"], c["lon"]) for c in cities]
+    rows = []
+    for tier in TIERS:
+        # K + 1: the city itself comes back first when it belongs to the tier
+        for city, nearest in zip(cities, index.knn_many(points, k=K + 1, min_population=tier)):
+            found = [n for n in nearest if n["geonameid"] != city["geonameid"]][:K]
+            reach = found[-1]["dist_km"] if len(found) == K else None
+            rows.append((
+                city["geonameid"], tier,
+                [n["geonameid"] for n in found],
+                [round(n["dist_km"], 3) for n in found],
+                reach,
+            ))
+    return rows
+
+
+def write_rows(cursor, index, cities):
+    batch = max(1, 20000 // len(TIERS))
+    for start in range(0, len(cities), batch):
+        chunk = cities[start:start + batch]
+        psycopg2.extras.execute_values(
+            cursor,
+            "INSERT INTO city_neighbours (geonameid, min_population, neighbour_ids, dist_km, reach_km) VALUES %s",
+            neighbour_rows(index, chunk), page_size=5000
+        )
+        print(f"   {start + len(chunk)} / {len(cities)} cities")
+
+
+def write_meta(cursor, city_count):
+    cursor.execute("DELETE FROM city_neighbours_meta")
+    cursor.execute(
+        "INSERT INTO city_neighbours_meta (k, tiers, cities) VALUES (%s, %s, %s)",
+        (K, TIERS, city_count)
+    )
+
+
+def full_rebuild(cursor, index, cities):
+    print(f"[INFO] Full rebuild: {len(cities)} cities, K={K}, tiers={TIERS}")
+    cursor.execute("TRUNCATE TABLE city_neighbours, city_neighbours_source")
+    write_rows(cursor, index, cities)
+    psycopg2.extras.execute_values(
+        cursor,
+        "INSERT INTO city_neighbours_source (geonameid, lat, lon, population) VALUES %s",
+        [(c["geonameid"], c["lat"], c["lon"], c["population"]) for c in cities], page_size=10000
+    )
+    write_meta(cursor, len(cities))
+
+
+def affected_cities(cursor, index, changed, removed):
+    """
+    Cities whose stored neighbour lists may be wrong: the changed cities
+    themselves, every city listing a changed or removed one, and every city
+    a changed city now falls within reach of. The last test is per row: the
+    nearest changed city (one knn_many over an index of the changed cities)
+    against that row's own reach_km.
+    """
+    affected = {c["geonameid"] for c in changed}
+    current = {c["geonameid"]: c for c in index.rows}
+
+    moved_ids = [c["geonameid"] for c in changed] + list(removed)
+    cursor.execute("SELECT DISTINCT geonameid FROM city_neighbours WHERE neighbour_ids && %s::bigint[]", (moved_ids,))
+    affected.update(r["geonameid"] for r in cursor.fetchall())
+
+    cursor.execute("SELECT geonameid, min_population, reach_km FROM city_neighbours")
+    reach = {tier: {} for tier in TIERS}
+    for r in cursor.fetchall():
+        if r["min_population"] in reach:
+            reach[r["min_population"]][r["geonameid"]] = r["reach_km"]
+
+    changed_index = SpatialIndex(changed)
+    for tier in TIERS:
+        tier_reach = reach[tier]
+        if not any(c["population"] >= tier for c in changed):
+            continue
+        # NULL reach: the row already lists the whole tier, so any newcomer belongs in it
+        affected.update(geonameid for geonameid, r in tier_reach.items() if r is None)
+
+        bounded = [(current[geonameid], r) for geonameid, r in tier_reach.items()
+                   if r is not None and geonameid in current]
+        nearest = changed_index.knn_many([(c["lat"], c["lon"]) for c, _ in bounded], k=1, min_population=tier)
+        for (city, r), found in zip(bounded, nearest):
+            if found and found[0]["dist_km"] <= r:
+                affected.add(city["geonameid"])
+
+    return affected - set(removed)
+
+
+def refresh_city_neighbours(conn, full=False):
+    """Brings city_neighbours in line with `cities`; incremental unless `full` (or K / tiers changed)."""
+    start = time.time()
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    try:
+        cursor.execute(SCHEMA_SQL)
+        cities = load_cities(cursor)
+        index = SpatialIndex(cities)
+
+        cursor.execute("SELECT k, tiers FROM city_neighbours_meta LIMIT 1")
+        meta = cursor.fetchone()
+        if full or meta is None or meta["k"] != K or list(meta["tiers"]) != TIERS:
+            full_rebuild(cursor, index, cities)
+        else:
+            cursor.execute("SELECT geonameid, lat, lon, population FROM city_neighbours_source")
+            previous = {r["geonameid"]: (r["lat"], r["lon"], r["population"]) for r in cursor.fetchall()}
+            current = {c["geonameid"] for c in cities}
+            changed = [c for c in cities
+                       if previous.get(c["geonameid"]) != (c["lat"], c["lon"], c["population"])]
+            removed = [geonameid for geonameid in previous if geonameid not in current]
+
+            if not changed and not removed:
+                print("[INFO] city_neighbours is up to date.")
+            elif len(changed) + len(removed) > FULL_REBUILD_RATIO * max(len(cities), 1):
+                print(f"[INFO] {len(changed)} changed / {len(removed)} removed cities; rebuilding everything.")
+                full_rebuild(cursor, index, cities)
+            else:
+                affected = affected_cities(cursor, index, changed, removed)
+                print(f"[INFO] {len(changed)} changed / {len(removed)} removed cities; "
+                      f"recomputing {len(affected)} neighbourhoods.")
+                stale = list(affected) + removed
+                cursor.execute("DELETE FROM city_neighbours WHERE geonameid = ANY(%s)", (stale,))
+                write_rows(cursor, index, [c for c in cities if c["geonameid"] in affected])
+
+                cursor.execute("DELETE FROM city_neighbours_source WHERE geonameid = ANY(%s)",
+                               ([c["geonameid"] for c in changed] + removed,))
+                psycopg2.extras.execute_values(
+                    cursor,
+                    "INSERT INTO city_neighbours_source (geonameid, lat, lon, population) VALUES %s",
+                    [(c["geonameid"], c["lat"], c["lon"], c["population"]) for c in changed], page_size=10000
+                )
+                write_meta(cursor, len(cities))
+
+        conn.commit()
+        cursor.execute("ANALYZE city_neighbours")
+        conn.commit()
+        print(f"[SUCCESS] city_neighbours refreshed in {time.time() - start:.1f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] city_neighbours refresh failed: {e}")
+        # Never leave neighbourhoods from an older load behind: empty the tables
+        # (NEARBY falls back to live search) and force a full rebuild next time
+        try:
+            cursor.execute("""
+                DO $$
+                BEGIN
+                    IF to_regclass('city_neighbours') IS NOT NULL THEN
+                        TRUNCATE TABLE city_neighbours, city_neighbours_source, city_neighbours_meta;
+                    END IF;
+                END $$;
+            """)
+            conn.commit()
+        except Exception as cleanup_err:
+            conn.rollback()
+            print(f"[ERROR] Could not empty city_neighbours: {cleanup_err}")
+        raise
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    conn = get_db_connection()
+    try:
+        refresh_city_neighbours(conn, full="--full" in sys.argv)
+    finally:
+        conn.close()
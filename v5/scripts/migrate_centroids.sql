@@ -0,0 +1,29 @@
+-- scripts/migrate_centroids.sql
+-- Adds and backfills the denormalized centroid / parent-country columns on an
+-- existing database. Fresh loads get them from the seed scripts.
+
+ALTER TABLE countries ADD COLUMN IF NOT EXISTS centroid_lat DOUBLE PRECISION;
+ALTER TABLE countries ADD COLUMN IF NOT EXISTS centroid_lon DOUBLE PRECISION;
+ALTER TABLE countries ADD COLUMN IF NOT EXISTS parent_country_name TEXT;
+
+ALTER TABLE states ADD COLUMN IF NOT EXISTS centroid_lat DOUBLE PRECISION;
+ALTER TABLE states ADD COLUMN IF NOT EXISTS centroid_lon DOUBLE PRECISION;
+ALTER TABLE states ADD COLUMN IF NOT EXISTS parent_country_name TEXT;
+
+ALTER TABLE cities ADD COLUMN IF NOT EXISTS centroid_lat DOUBLE PRECISION;
+ALTER TABLE cities ADD COLUMN IF NOT EXISTS centroid_lon DOUBLE PRECISION;
+ALTER TABLE cities ADD COLUMN IF NOT EXISTS parent_country_name TEXT;
+
+-- 1. Centroids (computed once here instead of on every lookup)
+UPDATE countries SET centroid_lat = ST_Y(ST_Centroid(geom)), centroid_lon = ST_X(ST_Centroid(geom));
+UPDATE states SET centroid_lat = ST_Y(ST_Centroid(geom)), centroid_lon = ST_X(ST_Centroid(geom));
+UPDATE cities SET centroid_lat = ST_Y(geom), centroid_lon = ST_X(geom);
+
+-- 2. Parent country names
+UPDATE countries SET parent_country_name = country_name;
+UPDATE states s SET parent_country_name = c.country_name FROM countries c WHERE c.iso_code = s.country_code;
+UPDATE cities ci SET parent_country_name = c.country_name FROM countries c WHERE c.iso_code = ci.country_code;
+
+ANALYZE countries;
+ANALYZE states;
+ANALYZE cities;
@@ -0,0 +1,26 @@
+-- scripts/migrate_city_aliases.sql
+-- Backfills city_aliases from cities.alt_names on an existing database.
+-- New loads get the table from scripts/seed_cities.py directly.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS city_aliases (
+    city_id INTEGER NOT NULL REFERENCES cities(city_id) ON DELETE CASCADE,
+    alias TEXT NOT NULL,
+    alias_norm TEXT NOT NULL
+);
+
+TRUNCATE TABLE city_aliases;
+
+INSERT INTO city_aliases (city_id, alias, alias_norm)
+SELECT DISTINCT ON (c.city_id, lower(regexp_replace(btrim(a.alias), '\s+', ' ', 'g')))
+       c.city_id, btrim(a.alias), lower(regexp_replace(btrim(a.alias), '\s+', ' ', 'g'))
+FROM cities c
+CROSS JOIN LATERAL unnest(c.alt_names) AS a(alias)
+WHERE btrim(a.alias) <> '';
+
+CREATE INDEX IF NOT EXISTS idx_city_aliases_norm ON city_aliases(alias_norm);
+CREATE INDEX IF NOT EXISTS idx_city_aliases_trgm ON city_aliases USING GIN(alias_norm gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_city_aliases_city ON city_aliases(city_id);
+
+ANALYZE city_aliases;
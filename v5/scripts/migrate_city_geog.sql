@@ -0,0 +1,14 @@
+-- scripts/migrate_city_geog.sql
+-- Adds the stored geography column used by NEARBY_MODE=geog on an existing
+-- database. `geom::geography` inside ST_DWithin / ST_Distance cannot use
+-- idx_cities_geom, so every nearby search used to scan all cities.
+-- New loads get the column from scripts/setup_full_db.sql.
+
+ALTER TABLE cities
+    ADD COLUMN IF NOT EXISTS geog GEOGRAPHY(Point, 4326)
+    GENERATED ALWAYS AS (geom::geography) STORED;
+
+-- Serves both ST_DWithin(geog, ...) and ORDER BY geog <-> point (KNN)
+CREATE INDEX IF NOT EXISTS idx_cities_geog ON cities USING GIST(geog);
+
+ANALYZE cities;
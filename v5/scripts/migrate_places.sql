@@ -0,0 +1,59 @@
+-- scripts/migrate_places.sql
+-- Builds the unified `places` table used by GEO_RESOLVER_BACKEND=places.
+-- One row per country / state / city, plus one row per city alias.
+-- Re-run after seeding (it rebuilds the table from scratch).
+-- Requires the centroid / parent-country columns (scripts/migrate_centroids.sql).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DROP TABLE IF EXISTS places;
+
+CREATE TABLE places (
+    place_id BIGSERIAL PRIMARY KEY,
+    place_type TEXT NOT NULL,        -- 'country' | 'state' | 'city'
+    source_id INTEGER NOT NULL,      -- country_id / state_id / city_id
+    name TEXT NOT NULL,              -- searchable string (canonical name or alias)
+    canonical_name TEXT NOT NULL,
+    is_alias BOOLEAN NOT NULL DEFAULT FALSE,
+    code TEXT,                       -- iso_code / state_code
+    population BIGINT,
+    lat DOUBLE PRECISION,
+    lon DOUBLE PRECISION,
+    parent_country TEXT
+);
+
+-- 1. COUNTRIES
+INSERT INTO places (place_type, source_id, name, canonical_name, code, population, lat, lon, parent_country)
+SELECT 'country', country_id, country_name, country_name, iso_code, population,
+       centroid_lat, centroid_lon, parent_country_name
+FROM countries
+WHERE country_name IS NOT NULL;
+
+-- 2. STATES
+INSERT INTO places (place_type, source_id, name, canonical_name, code, population, lat, lon, parent_country)
+SELECT 'state', s.state_id, s.state_name, s.state_name, s.state_code, 0,
+       s.centroid_lat, s.centroid_lon, s.parent_country_name
+FROM states s
+WHERE s.state_name IS NOT NULL;
+
+-- 3. CITIES
+INSERT INTO places (place_type, source_id, name, canonical_name, population, lat, lon, parent_country)
+SELECT 'city', ci.city_id, ci.city_name, ci.city_name, ci.population,
+       ci.centroid_lat, ci.centroid_lon, ci.parent_country_name
+FROM cities ci
+WHERE ci.city_name IS NOT NULL;
+
+-- 4. CITY ALIASES (from city_aliases, skipping the canonical name itself)
+INSERT INTO places (place_type, source_id, name, canonical_name, is_alias, population, lat, lon, parent_country)
+SELECT 'city', p.source_id, a.alias, p.canonical_name, TRUE, p.population, p.lat, p.lon, p.parent_country
+FROM city_aliases a
+JOIN places p ON p.place_type = 'city' AND p.source_id = a.city_id AND NOT p.is_alias
+WHERE a.alias_norm <> lower(p.canonical_name);
+
+-- 5. INDEXES
+-- GiST (not GIN) so the same index serves both `name % term` and `ORDER BY name <-> term`
+CREATE INDEX idx_places_name_trgm ON places USING GIST (name gist_trgm_ops);
+CREATE INDEX idx_places_name_lower ON places (lower(name));
+CREATE INDEX idx_places_code_lower ON places (lower(code)) WHERE code IS NOT NULL;
+
+ANALYZE places;
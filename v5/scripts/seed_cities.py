@@ -1,5 +1,6 @@
 import requests
 import psycopg2
+import psycopg2.extras
 import os
 import io
 import zipfile
@@ -20,6 +21,15 @@ def get_db_connection():
         database=os.getenv("DB_NAME", "geospatial_db")
     )
 
+def flush_aliases(cursor, query, template, rows):
+    """Bulk-inserts buffered alias rows and clears the buffer."""
+    if not rows:
+        return 0
+    psycopg2.extras.execute_values(cursor, query, rows, template=template, page_size=5000)
+    inserted = len(rows)
+    rows.clear()
+    return inserted
+
 def seed_cities_geonames():
     print(f"[INFO] Downloading GeoNames archive...")
     print(f"   Source: {URL}")
@@ -38,18 +48,29 @@ def seed_cities_geonames():
     print("[INFO] Inserting cities into database...")
     
     # 1. WIPE OLD DATA
-    cursor.execute("TRUNCATE TABLE cities RESTART IDENTITY;")
+    # geonameid is the stable key (city_id is renumbered on every reload)
+    cursor.execute("ALTER TABLE cities ADD COLUMN IF NOT EXISTS geonameid BIGINT;")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cities_geonameid ON cities(geonameid);")
+    cursor.execute("TRUNCATE TABLE city_aliases, cities RESTART IDENTITY;")
     conn.commit()
 
     count = 0
     skipped = 0
+    alias_count = 0
+    pending_aliases = []
     
     # Query structure matching the table schema
     query = """
-        INSERT INTO cities (city_name, country_code, population, lat, lon, geom, alt_names)
-        VALUES (%s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s)
+        INSERT INTO cities (geonameid, city_name, country_code, population, lat, lon, geom, alt_names,
+                            centroid_lat, centroid_lon)
+        VALUES (%s, %s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s)
+        RETURNING city_id
     """
 
+    # Normalized alias rows (alias_norm must match GeoService's lookup normalization)
+    alias_query = "INSERT INTO city_aliases (city_id, alias, alias_norm) VALUES %s"
+    alias_template = "(%s, %s, lower(regexp_replace(btrim(%s), '\\s+', ' ', 'g')))"
+
     try:
         with zipfile.ZipFile(io.BytesIO(response.content)) as z:
             with z.open('cities15000.txt') as f:
@@ -59,6 +80,9 @@ def seed_cities_geonames():
                         row = line.decode('utf-8').strip().split('\t')
                         
                         # Mapping
+                        # Index 0: GeoNames id
+                        geonameid = int(row[0])
+
                         # Index 1: Name
                         name = row[1]
                         
@@ -82,10 +106,21 @@ def seed_cities_geonames():
                             alt_names.extend(row[3].split(','))
                         
                         # Execute Insert
-                        cursor.execute(query, (name, country_code, population, lat, lon, lon, lat, alt_names))
+                        cursor.execute(query, (geonameid, name, country_code, population, lat, lon, lon, lat, alt_names, lat, lon))
+                        city_id = cursor.fetchone()[0]
+
+                        # One alias row per distinct normalized spelling
+                        seen = set()
+                        for alias in alt_names:
+                            alias = alias.strip()
+                            key = " ".join(alias.lower().split())
+                            if alias and key not in seen:
+                                seen.add(key)
+                                pending_aliases.append((city_id, alias, alias))
                         
                         count += 1
                         if count % 5000 == 0:
+                            alias_count += flush_aliases(cursor, alias_query, alias_template, pending_aliases)
                             print(f"   Inserted {count} / 25,000+ cities")
                             conn.commit() # Commit periodically
                             
@@ -94,8 +129,17 @@ def seed_cities_geonames():
                         skipped += 1
                         continue
 
+        alias_count += flush_aliases(cursor, alias_query, alias_template, pending_aliases)
+        conn.commit()
+
+        # Denormalize the parent country name in one set-based pass
+        print("[INFO] Materializing parent country names...")
+        cursor.execute("""
+            UPDATE cities ci SET parent_country_name = c.country_name
+            FROM countries c WHERE c.iso_code = ci.country_code;
+        """)
         conn.commit()
-        print(f"[SUCCESS] Database populated with {count} cities. (Skipped {skipped})")
+        print(f"[SUCCESS] Database populated with {count} cities and {alias_count} aliases. (Skipped {skipped})")
 
     except Exception as e:
         print(f"[ERROR] Error processing zip/file: {e}")
@@ -103,5 +147,14 @@ def seed_cities_geonames():
         cursor.close()
         conn.close()
 
+    # Precomputed NEARBY neighbourhoods (only cities that actually changed are
+    # recomputed). Not caught: a failed refresh empties the table and must fail the run.
+    from build_city_neighbours import refresh_city_neighbours
+    conn = get_db_connection()
+    try:
+        refresh_city_neighbours(conn)
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     seed_cities_geonames()
\ No newline at end of file
@@ -51,23 +51,51 @@ def seed_countries():
         population = props.get('pop_est', 0)
 
         # SQL Query for your NEW Schema
+        # Centroid and parent name are materialized here so lookups never touch geom
         query = """
-            INSERT INTO countries (country_name, iso_code, continent, population, geom)
-            VALUES (%s, %s, %s, %s, ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326))
+            INSERT INTO countries (country_name, iso_code, continent, population, geom,
+                                   centroid_lat, centroid_lon, parent_country_name)
+            SELECT %s, %s, %s, %s, g, ST_Y(ST_Centroid(g)), ST_X(ST_Centroid(g)), %s
+            FROM (SELECT ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326) as g) src
             ON CONFLICT (country_name) DO NOTHING;
         """
         
         try:
-            cursor.execute(query, (country_name, iso_code, continent, population, json.dumps(geom)))
+            cursor.execute(query, (country_name, iso_code, continent, population, country_name, json.dumps(geom)))
             count += 1
         except Exception as e:
             print(f"Error inserting {country_name}: {e}")
             conn.rollback()
 
     conn.commit()
+
+    # States / cities may have been loaded first: refresh their denormalized parent names
+    refresh_parent_country_names(cursor)
+    conn.commit()
+
+    print("[INFO] Subdividing boundaries for reverse geocoding...")
+    build_subdivided_boundaries(cursor)
+    conn.commit()
+
     cursor.close()
     conn.close()
     print(f"Success! Loaded {count} countries.")
 
+def refresh_parent_country_names(cursor):
+    cursor.execute("""
+        UPDATE states s SET parent_country_name = c.country_name
+        FROM countries c WHERE c.iso_code = s.country_code;
+    """)
+    cursor.execute("""
+        UPDATE cities ci SET parent_country_name = c.country_name
+        FROM countries c WHERE c.iso_code = ci.country_code;
+    """)
+
+def build_subdivided_boundaries(cursor):
+    # Point-in-polygon tables behind /api/reverse
+    path = os.path.join(os.path.dirname(__file__), "build_admin_subdivided.sql")
+    with open(path) as f:
+        cursor.execute(f.read())
+
 if __name__ == "__main__":
     seed_countries()
\ No newline at end of file
@@ -3,6 +3,7 @@ import json
 import psycopg2
 import os
 from dotenv import load_dotenv
+from seed_countries import build_subdivided_boundaries
 
 load_dotenv()
 
@@ -40,9 +41,13 @@ def seed_states():
     count = 0
     skipped = 0
     
+    # Centroids of the 10m polygons are expensive: compute them once, at load time
     query = """
-        INSERT INTO states (state_name, state_code, country_code, geonameid, geom)
-        VALUES (%s, %s, %s, %s, ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326))
+        INSERT INTO states (state_name, state_code, country_code, geonameid, geom,
+                            centroid_lat, centroid_lon, parent_country_name)
+        SELECT %s, %s, %s, %s, g, ST_Y(ST_Centroid(g)), ST_X(ST_Centroid(g)),
+               (SELECT country_name FROM countries WHERE countries.iso_code = %s LIMIT 1)
+        FROM (SELECT ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326) as g) src
     """
     
     for feature in data['features']:
@@ -68,7 +73,7 @@ def seed_states():
             # Create a checkpoint before inserting
             cursor.execute("SAVEPOINT sp_state_insert")
             
-            cursor.execute(query, (state_name, state_code, country_code, geonameid, json.dumps(geom)))
+            cursor.execute(query, (state_name, state_code, country_code, geonameid, country_code, json.dumps(geom)))
             
             # If successful, release the checkpoint (saves memory)
             cursor.execute("RELEASE SAVEPOINT sp_state_insert")
@@ -85,6 +90,11 @@ def seed_states():
             # print(f"Skipped {state_name} due to error.")
 
     conn.commit()
+
+    print("[INFO] Subdividing boundaries for reverse geocoding...")
+    build_subdivided_boundaries(cursor)
+    conn.commit()
+
     cursor.close()
     conn.close()
     print(f"🚀 Success! Loaded {count} global states. (Skipped {skipped})")
@@ -5,6 +5,7 @@ CREATE EXTENSION IF NOT EXISTS postgis;
 CREATE EXTENSION IF NOT EXISTS pg_trgm; -- Required for gin_trgm_ops
 
 -- 2. Clean Slate (Drop existing tables)
+DROP TABLE IF EXISTS city_aliases CASCADE;
 DROP TABLE IF EXISTS cities CASCADE;
 DROP TABLE IF EXISTS states CASCADE;
 DROP TABLE IF EXISTS countries CASCADE;
@@ -19,7 +20,11 @@ CREATE TABLE countries (
     population BIGINT,
     area_sq_km DOUBLE PRECISION,
     currency TEXT,
-    geom GEOMETRY(MultiPolygon, 4326)
+    geom GEOMETRY(MultiPolygon, 4326),
+    -- Materialized at load time (seed scripts) so the resolver never touches geom
+    centroid_lat DOUBLE PRECISION,
+    centroid_lon DOUBLE PRECISION,
+    parent_country_name TEXT
 );
 -- Indexes
 CREATE INDEX idx_countries_geom ON countries USING GIST(geom);
@@ -32,7 +37,10 @@ CREATE TABLE states (
     state_code VARCHAR(50),
     state_name TEXT NOT NULL,
     geonameid BIGINT,
-    geom GEOMETRY(MultiPolygon, 4326)
+    geom GEOMETRY(MultiPolygon, 4326),
+    centroid_lat DOUBLE PRECISION,
+    centroid_lon DOUBLE PRECISION,
+    parent_country_name TEXT
 );
 -- Indexes
 CREATE INDEX idx_state_country ON states(country_code);
@@ -42,6 +50,7 @@ CREATE INDEX idx_states_name ON states USING GIN(state_name gin_trgm_ops);
 -- 5. Create CITIES Table
 CREATE TABLE cities (
     city_id SERIAL PRIMARY KEY,
+    geonameid BIGINT,
     city_name TEXT,
     alt_names TEXT[], -- Array of strings for aliases like 'NYC', 'Bombay'
     country_code VARCHAR(10),
@@ -49,9 +58,27 @@ CREATE TABLE cities (
     lat DOUBLE PRECISION,
     lon DOUBLE PRECISION,
     population BIGINT,
-    geom GEOMETRY(Point, 4326)
+    geom GEOMETRY(Point, 4326),
+    geog GEOGRAPHY(Point, 4326) GENERATED ALWAYS AS (geom::geography) STORED,
+    centroid_lat DOUBLE PRECISION,
+    centroid_lon DOUBLE PRECISION,
+    parent_country_name TEXT
 );
 -- Indexes
 CREATE INDEX idx_cities_geom ON cities USING GIST(geom);
+CREATE INDEX idx_cities_geog ON cities USING GIST(geog);
 CREATE INDEX idx_cities_name ON cities USING GIN(city_name gin_trgm_ops);
-CREATE INDEX idx_city_country ON cities(country_code);
\ No newline at end of file
+CREATE INDEX idx_city_country ON cities(country_code);
+CREATE UNIQUE INDEX idx_cities_geonameid ON cities(geonameid);
+
+-- 6. Create CITY_ALIASES Table (normalized copy of cities.alt_names)
+-- alias_norm = lower(trimmed alias, inner whitespace collapsed)
+CREATE TABLE city_aliases (
+    city_id INTEGER NOT NULL REFERENCES cities(city_id) ON DELETE CASCADE,
+    alias TEXT NOT NULL,
+    alias_norm TEXT NOT NULL
+);
+-- Indexes
+CREATE INDEX idx_city_aliases_norm ON city_aliases(alias_norm);
+CREATE INDEX idx_city_aliases_trgm ON city_aliases USING GIN(alias_norm gin_trgm_ops);
+CREATE INDEX idx_city_aliases_city ON city_aliases(city_id);
@@ -0,0 +1,111 @@
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.cache_service import QueryCache, TieredCache, MemoryCacheBackend
+
+failures = 0
+
+def check(label, ok):
+    global failures
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} {label}")
+
+# --- L1: LRU by entry count ---
+cache = QueryCache(max_entries=3)
+for key in ("a", "b", "c"):
+    cache.set(key, key)
+cache.get("a")          # a is now most recently used, b the oldest
+cache.set("d", "d")
+check("LRU evicts the least recently used entry", cache.get("b") is None)
+check("LRU keeps recently read entries", cache.get("a") == "a" and cache.get("d") == "d")
+check("entry count stays at max_entries", cache.stats()["entries"] == 3 and cache.stats()["evictions"] == 1)
+
+# --- L1: byte budget ---
+# Sizes are JSON lengths: "x" * 40 -> 42 bytes
+cache = QueryCache(max_entries=100, max_bytes=100)
+cache.set("one", "x" * 40)
+cache.set("two", "x" * 40)
+cache.set("three", "x" * 40)
+stats = cache.stats()
+check(f"byte budget evicts oldest ({stats['bytes']} bytes kept)",
+      cache.get("one") is None and cache.get("three") is not None and stats["bytes"] <= 100)
+check("oversized value is rejected, not cached", cache.set("huge", "x" * 500) is False and cache.get("huge") is None)
+check("oversized value leaves the rest of the cache alone", cache.get("two") is not None)
+
+# --- L1: TTL expiry ---
+cache = QueryCache(ttl_seconds=0.2)
+cache.set("short", 1)
+cache.set("long", 2, ttl=60)
+time.sleep(0.3)
+check("L1 entry expires after its TTL", cache.get("short") is None)
+check("L1 per-entry TTL overrides the default", cache.get("long") == 2)
+cache.set("sweepme", 3, ttl=0.1)
+time.sleep(0.2)
+check("sweep drops expired entries", cache.sweep() == 1 and cache.stats()["entries"] == 1)
+
+# --- L2: TTL expiry ---
+l2 = MemoryCacheBackend()
+l2.set("k", "1", 0.2)
+payload, remaining = l2.get("k")
+check("L2 returns payload and remaining TTL", payload == "1" and 0 < remaining <= 0.2)
+time.sleep(0.3)
+check("L2 entry expires after its TTL", l2.get("k") is None and l2.stats()["entries"] == 0)
+
+# --- Tiered: promotion and per-namespace TTLs ---
+l2 = MemoryCacheBackend()
+ttls = {"nlp": 60, "response": 0.3}
+writer = TieredCache(QueryCache(), l2, ttls=ttls)
+reader = TieredCache(QueryCache(), l2, ttls=ttls)
+
+writer.set("nlp", "q", {"intent": "WEATHER"})
+check("writer fills both tiers", writer.l1.get("nlp:q") is not None and l2.get("nlp:q") is not None)
+check("reader gets an L2 hit", reader.get("nlp", "q") == {"intent": "WEATHER"} and reader.l2_hits == 1)
+check("L2 hit is promoted into L1", reader.l1.get("nlp:q") == {"intent": "WEATHER"})
+reader.get("nlp", "q")
+check("promoted entry is served from L1", reader.l2_hits == 1)
+
+# Promotion never outlives the shared entry: 0.3s left in L2, namespace TTL 60s
+writer.set("nlp", "brief", "x", ttl=0.3)
+time.sleep(0.1)
+reader.get("nlp", "brief")
+time.sleep(0.3)
+check("promoted copy expires with the L2 entry, not the namespace TTL", reader.l1.get("nlp:brief") is None)
+check("and the next read misses both tiers", reader.get("nlp", "brief") is None)
+
+writer.set("response", "r", "cached")
+time.sleep(0.4)
+check("namespace TTL applies in L1", writer.l1.get("response:r") is None)
+check("namespace TTL applies in L2", l2.get("response:r") is None)
+check("other namespaces keep their TTL", writer.get("nlp", "q") is not None)
+
+# --- Tiered: l1=False ---
+reader.l1.clear()
+writer.set("nlp", "bulk", "v", l1=False)
+check("l1=False writes skip L1", writer.l1.get("nlp:bulk") is None and l2.get("nlp:bulk") is not None)
+check("l1=False reads skip promotion", reader.get("nlp", "bulk", l1=False) == "v" and reader.l1.get("nlp:bulk") is None)
+
+# --- Tiered: L2 counters under concurrency ---
+counted = TieredCache(QueryCache(), MemoryCacheBackend(), ttls={"geo": 60})
+counted.set("geo", "hot", 1, l1=False)
+threads = [threading.Thread(target=lambda: [counted.get("geo", key, l1=False) for key in ("hot", "cold") * 2000])
+           for _ in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+l2_stats = counted.stats()["l2"]
+check(f"L2 counters exact under 8 threads (hits={l2_stats['hits']}, misses={l2_stats['misses']})",
+      l2_stats["hits"] == 16000 and l2_stats["misses"] == 16000)
+
+# --- Tiered without L2 ---
+local = TieredCache(QueryCache(), None, ttls={"geo": 60})
+local.set("geo", "g", 1, l1=False)
+check("without L2, l1=False still caches locally", local.get("geo", "g", l1=False) == 1)
+
+print("\nCache working" if not failures else f"\nCache FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
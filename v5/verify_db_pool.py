@@ -0,0 +1,98 @@
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import psycopg2
+from dotenv import load_dotenv
+from app.db_pool import BlockingConnectionPool, PoolTimeout
+
+load_dotenv()
+
+# Runs against the database configured in .env (any PostgreSQL will do)
+DB_CONFIG = {
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASS", "password"),
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": os.getenv("DB_PORT", "5432"),
+    "database": os.getenv("DB_NAME", "geospatial_db"),
+}
+
+failures = 0
+
+def check(label, ok):
+    global failures
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} {label}")
+
+
+# --- Checkout timeout ---
+pool = BlockingConnectionPool(1, 2, timeout=0.5, **DB_CONFIG)
+first, second = pool.getconn(), pool.getconn()
+start = time.monotonic()
+try:
+    pool.getconn()
+    check("third checkout of a 2-connection pool raises PoolTimeout", False)
+except PoolTimeout as e:
+    elapsed = time.monotonic() - start
+    check(f"third checkout raises PoolTimeout after {elapsed:.2f}s ({e})", 0.4 <= elapsed < 2.0)
+check("timeout is counted", pool.stats()["timeouts"] == 1)
+
+# A waiter is handed the connection as soon as one comes back
+threading.Timer(0.2, pool.putconn, args=(first,)).start()
+start = time.monotonic()
+conn = pool.getconn(timeout=2.0)
+elapsed = time.monotonic() - start
+check(f"waiting checkout succeeds once a connection is returned ({elapsed:.2f}s)", conn is first and elapsed < 1.0)
+check("wait is counted", pool.stats()["waits"] == 1)
+pool.putconn(conn)
+pool.putconn(second)
+pool.closeall()
+
+# --- Stale connection is validated and replaced ---
+pool = BlockingConnectionPool(1, 2, timeout=2.0, validate_after=0.1,
+                              session_params={"application_name": "verify_db_pool"}, **DB_CONFIG)
+conn = pool.getconn()
+with conn.cursor() as cursor:
+    cursor.execute("SELECT pg_backend_pid(), current_setting('application_name')")
+    old_pid, app_name = cursor.fetchone()
+check("session_params are applied to new connections", app_name == "verify_db_pool")
+pool.putconn(conn)
+
+# Kill the idle backend from outside, as a DB restart or idle timeout would
+killer = psycopg2.connect(**DB_CONFIG)
+killer.autocommit = True
+with killer.cursor() as cursor:
+    cursor.execute("SELECT pg_terminate_backend(%s)", (old_pid,))
+killer.close()
+
+time.sleep(0.2)   # past validate_after: the next checkout pings before handing out
+created = pool.stats()["created"]
+conn = pool.getconn()
+try:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid(), current_setting('application_name')")
+        new_pid, app_name = cursor.fetchone()
+    check("checkout after the backend died hands out a working connection", True)
+    check("the dead connection was replaced or skipped", new_pid != old_pid)
+    check("replacement gets session_params too", app_name == "verify_db_pool")
+except Exception as e:
+    check(f"checkout after the backend died hands out a working connection ({e})", False)
+stats = pool.stats()
+check(f"stale connection discarded (discarded={stats['discarded']}, created {created} -> {stats['created']})",
+      stats["discarded"] >= 1)
+pool.putconn(conn)
+
+# --- putconn rolls back open transactions ---
+conn = pool.getconn()
+with conn.cursor() as cursor:
+    cursor.execute("SELECT 1")
+pool.putconn(conn)
+check("returned connection is idle (no open transaction)", conn.info.transaction_status == 0)
+pool.closeall()
+
+print("\nConnection pool working" if not failures else f"\nConnection pool FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,88 @@
+import sys
+import os
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import psycopg2
+import psycopg2.extras
+from dotenv import load_dotenv
+from app.db_statements import PreparedConnection, Statement, StatementRegistry
+
+load_dotenv()
+
+failures = 0
+
+def check(label, ok):
+    global failures
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} {label}")
+
+
+# --- %(name)s -> $n conversion (no database needed) ---
+s = Statement("verify_sim", "SELECT name FROM t WHERE name %% %(term)s AND pop >= %(min_pop)s "
+                            "ORDER BY similarity(name, %(term)s) DESC LIMIT %(limit)s",
+              types={"term": "text", "min_pop": "bigint", "limit": "integer"})
+check("arguments numbered in first-use order", s.args == ["term", "min_pop", "limit"])
+check("repeated argument reuses its number",
+      s.prepare_sql == "PREPARE verify_sim (text, bigint, integer) AS SELECT name FROM t WHERE name % $1 "
+                       "AND pop >= $2 ORDER BY similarity(name, $1) DESC LIMIT $3")
+check("%% becomes a literal %", "%%" not in s.prepare_sql)
+check("EXECUTE passes one %s per argument", s.execute_sql == "EXECUTE verify_sim(%s, %s, %s)")
+check("values follow argument order", s.values({"limit": 5, "term": "hosur", "min_pop": 0}) == ["hosur", 0, 5])
+check("untyped arguments are declared unknown", Statement("t", "SELECT %(x)s").prepare_sql == "PREPARE t (unknown) AS SELECT $1")
+check("statement without arguments", Statement("n", "SELECT 1").execute_sql == "EXECUTE n")
+
+# --- Against the database configured in .env ---
+conn = psycopg2.connect(
+    user=os.getenv("DB_USER", "postgres"),
+    password=os.getenv("DB_PASS", "password"),
+    host=os.getenv("DB_HOST", "localhost"),
+    port=os.getenv("DB_PORT", "5432"),
+    database=os.getenv("DB_NAME", "geospatial_db"),
+    connection_factory=PreparedConnection,
+)
+registry = StatementRegistry(enabled=True)
+registry.register("verify_add", "SELECT %(a)s + %(b)s AS total, %(a)s AS a, '100%%' AS pct",
+                  types={"a": "integer", "b": "integer"})
+cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+registry.execute(cursor, "verify_add", {"a": 2, "b": 3})
+row = cursor.fetchone()
+check("prepared statement returns the right row", dict(row) == {"total": 5, "a": 2, "pct": "100%"})
+check("statement is recorded as prepared on the connection", "verify_add" in conn.prepared)
+
+registry.execute(cursor, "verify_add", {"a": 10, "b": 1})
+check("second call reuses the prepared statement", cursor.fetchone()["total"] == 11)
+stats = registry.stats()["statements"]["verify_add"]
+check(f"prepared once for two calls (prepares={stats['prepares']})", stats["prepares"] == 1 and stats["calls"] == 2)
+check(f"prepare and execute time reported separately ({stats['prepare_ms']} / {stats['execute_avg_ms']} ms)",
+      stats["prepare_ms"] > 0 and stats["execute_avg_ms"] > 0)
+
+# Session loses its prepared statements (DISCARD ALL, proxy switched the backend...)
+conn.commit()
+cursor.execute("DEALLOCATE ALL")
+conn.commit()
+try:
+    registry.execute(cursor, "verify_add", {"a": 4, "b": 4})
+    check("call after DEALLOCATE ALL succeeds", cursor.fetchone()["total"] == 8)
+except Exception as e:
+    check(f"call after DEALLOCATE ALL succeeds ({e})", False)
+stats = registry.stats()["statements"]["verify_add"]
+check(f"statement was re-prepared (reprepares={stats['reprepares']})", stats["reprepares"] == 1)
+
+# Fallback paths send the plain SQL
+plain = StatementRegistry(enabled=False)
+plain.register("verify_add", "SELECT %(a)s + %(b)s AS total", types={"a": "integer", "b": "integer"})
+conn.prepared.clear()
+plain.execute(cursor, "verify_add", {"a": 1, "b": 1})
+check("DB_PREPARED_STATEMENTS=false runs plain SQL", cursor.fetchone()["total"] == 2 and not conn.prepared)
+
+report = registry.explain(cursor, "verify_add", {"a": 1, "b": 2})
+check(f"explain reports planning/execution ms ({report})", set(report) == {"planning_ms", "execution_ms"})
+
+cursor.close()
+conn.close()
+
+print("\nPrepared statements working" if not failures else f"\nPrepared statements FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
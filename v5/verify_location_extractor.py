@@ -0,0 +1,72 @@
+import sys
+import os
+import time
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.gazetteer import Gazetteer, COUNTRY, STATE, CITY
+from app.services.location_extractor import LocationExtractor
+from app.services.nlp_service import NLPService
+
+# Small hand-made gazetteer (the real one is loaded from the DB at startup)
+gaz = Gazetteer()
+gaz.add(COUNTRY, 1, "India", 1400000000, 22.0, 79.0, "India", code="IN")
+gaz.add(COUNTRY, 2, "United States", 330000000, 39.8, -98.6, "United States", code="US")
+gaz.add(STATE, 10, "Tamil Nadu", 0, 11.1, 78.6, "India", code="TN")
+gaz.add(STATE, 11, "Texas", 0, 31.0, -100.0, "United States", code="TX")
+gaz.add(STATE, 12, "New York", 0, 43.0, -75.0, "United States", code="NY")
+gaz.add(CITY, 100, "Hosur", 245000, 12.74, 77.83, "India")
+gaz.add(CITY, 101, "Mumbai", 12400000, 19.07, 72.87, "India", aliases=["Bombay"])
+gaz.add(CITY, 102, "New York City", 8300000, 40.71, -74.0, "United States")
+gaz.add(CITY, 103, "New York", 8300000, 40.71, -74.0, "United States")
+gaz.add(CITY, 104, "Paris", 2100000, 48.85, 2.35, "France")
+gaz.add(CITY, 105, "Paris", 25000, 33.66, -95.55, "United States")
+gaz.add(CITY, 106, "Of", 100, 40.0, 40.0, "Turkey")
+gaz.add(CITY, 107, "Weather", 50, 0.0, 0.0, "Nowhere")
+gaz.add(CITY, 108, "Nice", 340000, 43.70, 7.27, "France")
+
+extractor = LocationExtractor.from_gazetteer(gaz)
+
+cases = [
+    ("weather in hosur", [("Hosur", 100)]),
+    ("Route from Bombay to New York City via Texas", [("Mumbai", 101), ("New York City", 102), ("Texas", 11)]),
+    ("new york weather", [("New York", 103)]),
+    ("tell me about paris in texas", [("Paris", 104), ("Texas", 11)]),
+    ("capital of tamil nadu, india", [("Tamil Nadu", 10), ("India", 1)]),
+    ("what is the weather", []),
+    ("weather in nice", [("Nice", 108)]),
+    ("is Nice sunny", [("Nice", 108)]),
+    ("Nice weather in hosur", [("Hosur", 100)]),
+    ("is it nice in hosur", [("Hosur", 100)]),
+]
+
+failures = 0
+for text, expected in cases:
+    got = [(m["name"], m["id"]) for m in extractor.extract(text)]
+    ok = got == expected
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} {text!r} -> {got}")
+
+# Rule stage (no LLM): intent, context fusion and route order
+NLPService.extractor = extractor
+rule_cases = [
+    ("Route from Bombay to New York City via Texas", "ROUTE", ["Mumbai", "Texas", "New York City"]),
+    ("How far is Hosur from Mumbai", "ROUTE", ["Mumbai", "Hosur"]),
+    ("distance to Hosur from Mumbai", "ROUTE", ["Mumbai", "Hosur"]),
+    ("Hosur to Mumbai route", "ROUTE", ["Hosur", "Mumbai"]),
+    ("weather in paris in texas", "WEATHER", ["Paris, Texas"]),
+]
+for text, intent, expected in rule_cases:
+    result, _ = NLPService._rule_stage(text)
+    ok = result["intent"] == intent and result["locations"] == expected
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} rule stage {text!r} -> {result['intent']} {result['locations']}")
+
+start = time.perf_counter()
+for _ in range(10000):
+    extractor.extract("route from bombay to new york city via texas and paris")
+print(f"\n{(time.perf_counter() - start) / 10000 * 1000:.3f} ms per query")
+
+print("\nLocation extractor working" if not failures else f"\nLocation extractor FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,92 @@
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.singleflight import SingleFlight
+
+failures = 0
+
+def check(label, ok):
+    global failures
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} {label}")
+
+
+def run_concurrently(flight, key, fn, callers=8):
+    """Starts `callers` threads on flight.do(key, fn) together; returns [(result, error)]."""
+    outcomes = [None] * callers
+    barrier = threading.Barrier(callers)
+
+    def caller(i):
+        barrier.wait()
+        try:
+            outcomes[i] = (flight.do(key, fn), None)
+        except Exception as e:
+            outcomes[i] = (None, e)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+# --- Concurrent callers share one call ---
+flight = SingleFlight()
+calls = []
+
+def slow_lookup():
+    calls.append(1)
+    time.sleep(0.3)
+    return {"city": "Hosur"}
+
+outcomes = run_concurrently(flight, "geo:hosur", slow_lookup)
+results = [r for r, _ in outcomes]
+check(f"8 concurrent callers ran the function {len(calls)} time(s)", len(calls) == 1)
+check("every caller got the result", all(r == {"city": "Hosur"} for r in results))
+check("every caller got the same object", all(r is results[0] for r in results))
+stats = flight.stats()
+check(f"stats: executed={stats['executed']} coalesced={stats['coalesced']}",
+      stats["executed"] == 1 and stats["coalesced"] == 7 and stats["in_flight"] == 0)
+
+# --- Concurrent callers see the same exception ---
+flight = SingleFlight()
+calls.clear()
+
+def failing_lookup():
+    calls.append(1)
+    time.sleep(0.3)
+    raise RuntimeError("database unavailable")
+
+outcomes = run_concurrently(flight, "geo:down", failing_lookup)
+errors = [e for _, e in outcomes]
+check(f"failing function ran {len(calls)} time(s)", len(calls) == 1)
+check("every caller saw the exception", all(isinstance(e, RuntimeError) for e in errors))
+check("every caller saw the same exception", all(e is errors[0] for e in errors))
+check("failed key is not kept", flight.stats()["in_flight"] == 0)
+
+# --- Nothing is cached once the call finishes ---
+calls.clear()
+flight.do("geo:again", lambda: calls.append(1))
+flight.do("geo:again", lambda: calls.append(1))
+check("sequential calls both run", len(calls) == 2)
+
+# --- Different keys do not wait on each other ---
+flight = SingleFlight()
+calls.clear()
+threads = [threading.Thread(target=flight.do, args=(f"geo:{i}", slow_lookup)) for i in range(4)]
+start = time.monotonic()
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+elapsed = time.monotonic() - start
+check(f"4 distinct keys ran in parallel ({elapsed:.2f}s)", len(calls) == 4 and elapsed < 1.0)
+
+print("\nSingleflight working" if not failures else f"\nSingleflight FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,87 @@
+import sys
+import os
+import time
+import random
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import numpy as np
+from app.services.spatial_index import SpatialIndex, haversine_km
+
+# Random points (the real index is built from cities / airports at startup),
+# checked against a brute-force haversine scan
+rng = np.random.default_rng(7)
+N = 100_000
+lats = np.degrees(np.arcsin(rng.uniform(-1, 1, N)))
+lons = rng.uniform(-180, 180, N)
+pops = rng.integers(0, 1_000_000, N)
+rows = [{"city_id": i, "lat": float(lats[i]), "lon": float(lons[i]), "population": int(pops[i])} for i in range(N)]
+
+index = SpatialIndex(rows)
+print(f"Built: {index.stats()}")
+
+
+def brute(lat, lon, k=None, radius_km=None, min_population=0):
+    dist = haversine_km(lat, lon, lats, lons)
+    mask = pops >= min_population
+    if radius_km is not None:
+        mask &= dist <= radius_km
+    hits = np.flatnonzero(mask)
+    hits = hits[np.argsort(dist[hits], kind="stable")]
+    return [int(i) for i in (hits[:k] if k else hits)]
+
+
+random.seed(7)
+failures = 0
+queries = [(random.uniform(-90, 90), random.uniform(-180, 180)) for _ in range(100)]
+queries += [(89.99, 10.0), (0.0, 179.99), (0.0, -179.99)]  # pole and antimeridian
+for lat, lon in queries:
+    checks = [
+        ([r["city_id"] for r in index.knn(lat, lon, k=10)], brute(lat, lon, k=10)),
+        ([r["city_id"] for r in index.radius(lat, lon, 150)], brute(lat, lon, radius_km=150)),
+        ([r["city_id"] for r in index.radius(lat, lon, 500, k=5, min_population=800_000)],
+         brute(lat, lon, k=5, radius_km=500, min_population=800_000)),
+    ]
+    for got, expected in checks:
+        if got != expected:
+            failures += 1
+            print(f"BAD ({lat:.2f}, {lon:.2f}): {got[:5]} != {expected[:5]}")
+
+# Batch queries must match the single-point ones exactly
+batch_checks = [
+    (index.knn_many(queries, k=1), lambda lat, lon: index.knn(lat, lon, k=1)),
+    (index.knn_many(queries, k=40), lambda lat, lon: index.knn(lat, lon, k=40)),
+    (index.knn_many(queries, k=3, min_population=990_000), lambda lat, lon: index.knn(lat, lon, k=3, min_population=990_000)),
+    (index.radius_many(queries, 150), lambda lat, lon: index.radius(lat, lon, 150)),
+    (index.radius_many(queries, 500, k=5, min_population=800_000),
+     lambda lat, lon: index.radius(lat, lon, 500, k=5, min_population=800_000)),
+]
+for batch, single in batch_checks:
+    for got, (lat, lon) in zip(batch, queries):
+        expected = single(lat, lon)
+        if [r["city_id"] for r in got] != [r["city_id"] for r in expected] or \
+                any(abs(g["dist_km"] - e["dist_km"]) > 1e-6 for g, e in zip(got, expected)):
+            failures += 1
+            print(f"BAD batch ({lat:.2f}, {lon:.2f}): {[r['city_id'] for r in got][:5]}")
+failures += SpatialIndex([]).knn_many(queries[:2]) != [[], []]
+
+start = time.perf_counter()
+for lat, lon in queries * 20:
+    index.knn(lat, lon, k=1)
+print(f"\nknn(k=1):     {(time.perf_counter() - start) / (len(queries) * 20) * 1e6:.1f} us per query")
+start = time.perf_counter()
+for lat, lon in queries * 20:
+    index.radius(lat, lon, 50, k=10)
+print(f"radius(50km): {(time.perf_counter() - start) / (len(queries) * 20) * 1e6:.1f} us per query")
+
+many = [(random.uniform(-90, 90), random.uniform(-180, 180)) for _ in range(20_000)]
+start = time.perf_counter()
+index.knn_many(many, k=1)
+print(f"knn_many(k=1): {(time.perf_counter() - start) / len(many) * 1e6:.1f} us per query ({len(many)} points)")
+start = time.perf_counter()
+index.radius_many(many, 50, k=10)
+print(f"radius_many(50km): {(time.perf_counter() - start) / len(many) * 1e6:.1f} us per query")
+
+print("\nSpatial index working" if not failures else f"\nSpatial index FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
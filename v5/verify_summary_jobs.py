@@ -0,0 +1,81 @@
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app
+from app import routes
+from app.services.cache_service import QueryCache, TieredCache, MemoryCacheBackend
+
+# Two workers (two TieredCache instances, each with its own L1) sharing one L2:
+# worker A runs the summary job, worker B answers the polls.
+shared_l2 = MemoryCacheBackend()
+ttls = {"summary": 3600}
+worker_a = TieredCache(QueryCache(), shared_l2, ttls=ttls)
+worker_b = TieredCache(QueryCache(), shared_l2, ttls=ttls)
+
+app = create_app()
+routes.shared_cache = worker_b
+client = app.test_client()
+
+failures = 0
+
+def check(label, ok):
+    global failures
+    failures += not ok
+    print(f"{'OK ' if ok else 'BAD'} {label}")
+
+job_id = "verifyjob0001"
+worker_a.set("summary", job_id, {"status": "pending"}, ttl=120, l1=False)
+
+resp = client.get(f"/api/summaries/{job_id}")
+check("worker B sees pending", resp.status_code == 200 and resp.json["status"] == "pending")
+
+worker_a.set("summary", job_id, {"status": "done", "summaries": {"Hosur": {"summary": "ok"}}}, l1=False)
+resp = client.get(f"/api/summaries/{job_id}")
+check("worker B sees done right after worker A finishes", resp.json["status"] == "done")
+check("job state never enters worker B's L1", worker_b.l1.stats()["entries"] == 0)
+
+# Long-poll path used by the stream endpoint: finishes as soon as A writes "done"
+job_id = "verifyjob0002"
+worker_a.set("summary", job_id, {"status": "pending"}, ttl=120, l1=False)
+finisher = threading.Timer(0.5, lambda: worker_a.set("summary", job_id, {"status": "done", "summaries": {}}, l1=False))
+finisher.start()
+start = time.monotonic()
+state = routes._wait_for_summaries(job_id, timeout=5.0, interval=0.1)
+elapsed = time.monotonic() - start
+check(f"_wait_for_summaries returns done after {elapsed:.2f}s", state["status"] == "done" and elapsed < 2.0)
+
+# Pending marker expired while the job waited for a free summary worker
+job_id = "verifyjob0003"
+worker_b.set("summary", job_id, {"status": "pending"}, ttl=0.1, l1=False)
+with routes._summary_lock:
+    routes._summary_running.add(job_id)
+time.sleep(0.2)
+resp = client.get(f"/api/summaries/{job_id}")
+check("queued job with an expired marker still reports pending",
+      resp.status_code == 200 and resp.json["status"] == "pending")
+
+# The worker renews the marker when it picks the job up
+seen = {}
+def fake_summarize(user_query, places):
+    seen["state"] = shared_l2.get(f"summary:{job_id}")
+    return {"Hosur": {"summary": "ok"}}
+original = routes.NLPService.__dict__["summarize_locations"]
+routes.NLPService.summarize_locations = staticmethod(fake_summarize)
+try:
+    routes._run_summary_job(job_id, "weather in hosur", [{"city_name": "Hosur"}])
+finally:
+    routes.NLPService.summarize_locations = original
+check("marker is renewed when the job starts", seen.get("state") is not None)
+check("finished job is no longer tracked as running", job_id not in routes._summary_running)
+check("and reports done", client.get(f"/api/summaries/{job_id}").json["status"] == "done")
+
+resp = client.get("/api/summaries/unknownjob")
+check("unknown job -> 404", resp.status_code == 404)
+
+print("\nSummary jobs working" if not failures else f"\nSummary jobs FAILED ({failures} checks)")
+sys.exit(1 if failures else 0)
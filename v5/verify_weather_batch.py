@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import tempfile
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Add the current directory to sys.path to make app module importable
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.weather_service import WeatherService
+from app.services.rainfall_store import RainfallStore
+
+# --- FAKE OPEN-METEO ---
+# Answers like the real API: an object for one location, a list for several.
+request_log = []
+
+class FakeOpenMeteo(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        request_log.append(params)
+        lats = [float(v) for v in params["latitude"][0].split(",")]
+        lons = [float(v) for v in params["longitude"][0].split(",")]
+
+        items = []
+        for lat, lon in zip(lats, lons):
+            item = {"latitude": lat, "longitude": lon}
+            if "current_weather" in params:
+                item["current_weather"] = {"temperature": round(lat, 1), "windspeed": round(lon, 1), "weathercode": 0}
+            if "daily" in params:
+                start = date.fromisoformat(params["start_date"][0])
+                end = date.fromisoformat(params["end_date"][0])
+                days = [start + timedelta(days=d) for d in range((end - start).days + 1)]
+                item["daily"] = {
+                    "time": [d.isoformat() for d in days],
+                    "precipitation_sum": [round(lat / 10, 1)] * len(days)
+                }
+            items.append(item)
+
+        body = json.dumps(items if len(items) > 1 else items[0]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def run_checks():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenMeteo)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    WeatherService.BASE_URL = f"http://127.0.0.1:{server.server_port}/v1/forecast"
+    WeatherService.rainfall_store = RainfallStore(os.path.join(tempfile.mkdtemp(), "rainfall.sqlite3"))
+
+    points = [(12.97, 77.59), (19.07, 72.87), (None, None), (28.61, 77.20)]
+    failures = 0
+
+    try:
+        print("--- Current weather (batched) ---")
+        request_log.clear()
+        weather = WeatherService.get_current_weather_many(points)
+        print(f"HTTP calls: {len(request_log)}")
+        failures += len(request_log) != 1
+        for (lat, lon), w in zip(points, weather):
+            ok = (w is None) if lat is None else (w and w["temperature"] == round(lat, 1) and w["windspeed"] == round(lon, 1))
+            failures += not ok
+            print(f"   {'OK ' if ok else 'BAD'} ({lat}, {lon}) -> {w}")
+
+        print("\n--- Rainfall history (batched) ---")
+        request_log.clear()
+        rain = WeatherService.get_rainfall_history_many(points)
+        print(f"HTTP calls: {len(request_log)}")
+        failures += len(request_log) != 1
+        for (lat, lon), r in zip(points, rain):
+            ok = (r is None) if lat is None else (r and len(r["dates"]) == 12 and r["values"][0] == round(lat / 10, 1))
+            failures += not ok
+            print(f"   {'OK ' if ok else 'BAD'} ({lat}, {lon}) -> {r}")
+
+        print("\n--- Rainfall history (30-day window, past days from the local store) ---")
+        request_log.clear()
+        rain = WeatherService.get_rainfall_history_many(points, past_days=30)
+        first_start = request_log[0]["start_date"][0] if request_log else None
+        request_log.clear()
+        WeatherService.cache = type(WeatherService.cache)()  # drop cached windows, keep the store
+        rain = WeatherService.get_rainfall_history_many(points, past_days=30)
+        second_start = request_log[0]["start_date"][0] if request_log else None
+        expected = (date.today() - timedelta(days=1)).isoformat()
+        ok = len(request_log) == 1 and second_start and second_start > first_start and rain[0] and len(rain[0]["dates"]) == 37
+        failures += not ok
+        print(f"   {'OK ' if ok else 'BAD'} first fetch from {first_start}, refetch from {second_start} (expected ~{expected}), {len(rain[0]['dates']) if rain[0] else 0} days")
+
+        print("\n--- Single point (object response) ---")
+        request_log.clear()
+        single = WeatherService.get_current_weather_many([(51.5, -0.12)])
+        ok = single[0] and single[0]["temperature"] == 51.5
+        failures += not ok
+        print(f"   {'OK ' if ok else 'BAD'} {single}")
+    finally:
+        server.shutdown()
+
+    print("\nWeather batching working" if not failures else f"\nWeather batching FAILED ({failures} checks)")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if run_checks() else 0)